@@ -69,6 +69,10 @@ def exitHandler(rebootData, storage):
 
     anaconda.dbus_launcher.stop()
 
+    # Write the queued logs before the system goes down.
+    from pyanaconda import anaconda_logging
+    anaconda_logging.flush()
+
     if conf.system.can_reboot:
         from pykickstart.constants import KS_SHUTDOWN, KS_WAIT
 
@@ -257,7 +261,8 @@ if __name__ == "__main__":
     # Set up logging as early as possible.
     from pyanaconda import anaconda_logging
     from pyanaconda import anaconda_loggers
-    anaconda_logging.init(write_to_journal=conf.target.is_hardware)
+    anaconda_logging.init(write_to_journal=conf.target.is_hardware,
+                          asynchronous=conf.anaconda.asynchronous_logging)
     anaconda_logging.logger.setupVirtio(opts.virtiolog)
 
     # Load the remaining configuration after a logging is set up.
@@ -661,6 +666,10 @@ if __name__ == "__main__":
                                      args=(timezone_proxy,
                                            anaconda.storage)))
 
+    # precompute the localization data used by the language spokes
+    threadMgr.add(AnacondaThread(name=constants.THREAD_LOCALIZATION_CACHE,
+                                 target=localization.localization_cache.warm_up))
+
     if flags.rescue_mode:
         rescue.start_rescue_mode_ui(anaconda)
     else:
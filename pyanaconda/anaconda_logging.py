@@ -19,11 +19,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import atexit
+import copy
 import logging
 from logging.handlers import SysLogHandler, SocketHandler
 from systemd.journal import JournalHandler
 import os
+import queue
 import sys
+import threading
 import warnings
 
 from pyanaconda.core import constants
@@ -48,6 +52,18 @@ ANACONDA_SYSLOG_IDENTIFIER = "anaconda"
 from threading import Lock
 program_log_lock = Lock()
 
+# the maximal number of records waiting for the log writer
+LOG_QUEUE_SIZE = 10000
+
+# the maximal number of records written to a sink at once
+LOG_QUEUE_BATCH_SIZE = 500
+
+# overflow policies of the log queue:
+# wait for a free slot in the full queue
+LOG_QUEUE_BLOCK = "block"
+# drop debug and info records if the queue is full, wait with the others
+LOG_QUEUE_DROP = "drop"
+
 logLevelMap = {"debug": logging.DEBUG,
                "info": logging.INFO,
                "warning": logging.WARNING,
@@ -145,6 +161,296 @@ class AnacondaStreamHandler(_AnacondaLogFixer, logging.StreamHandler):
     pass
 
 
+class AnacondaLogWriter(object):
+    """A writer of log records in a dedicated thread.
+
+    Queue handlers enqueue the records and the writer writes them to
+    the wrapped handlers in batches. Records for one log file are joined
+    and written with one write call, so the threads that produce the
+    records don't have to wait for the disk, the journal or the network.
+    """
+
+    def __init__(self, size=LOG_QUEUE_SIZE, overflow=LOG_QUEUE_BLOCK,
+                 batch_size=LOG_QUEUE_BATCH_SIZE):
+        """Create a new log writer.
+
+        :param int size: a maximal number of queued records
+        :param str overflow: LOG_QUEUE_BLOCK or LOG_QUEUE_DROP
+        :param int batch_size: a maximal number of records written at once
+        """
+        self._queue = queue.Queue(maxsize=size)
+        self._overflow = overflow
+        self._batch_size = batch_size
+        self._handlers = []
+        self._lock = Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        """Is the writer thread running?"""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def in_writer_thread(self):
+        """Is it called from the writer thread?"""
+        return self._thread is threading.current_thread()
+
+    @property
+    def dropped(self):
+        """The number of records dropped because the queue was full."""
+        return sum(handler.dropped for handler in self._handlers)
+
+    def register(self, handler):
+        """Register a queue handler of this writer."""
+        with self._lock:
+            self._handlers.append(handler)
+
+    def start(self):
+        """Start the writer thread.
+
+        The queued records are written when Python exits.
+        """
+        if self.running:
+            return
+
+        self._thread = threading.Thread(name="AnaLogWriter", target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=None):
+        """Write the queued records and stop the writer thread.
+
+        :param timeout: a number of seconds to wait or None
+        """
+        if not self.running or self.in_writer_thread:
+            return
+
+        self._queue.put((None, None))
+        self._thread.join(timeout)
+
+    def flush(self, timeout=None):
+        """Wait until the records queued so far are written.
+
+        :param timeout: a number of seconds to wait or None
+        :return: True if the records were written, otherwise False
+        """
+        if not self.running or self.in_writer_thread:
+            return False
+
+        written = threading.Event()
+        self._queue.put((None, written))
+        return written.wait(timeout)
+
+    def put(self, handler, record):
+        """Queue a record for the given handler.
+
+        If the queue is full, the record is dropped or the caller waits
+        for a free slot depending on the overflow policy. Warnings and
+        errors are never dropped.
+
+        :param handler: a queue handler
+        :param record: a prepared log record
+        :return: False if the record was dropped, otherwise True
+        """
+        block = self._overflow == LOG_QUEUE_BLOCK or record.levelno >= logging.WARNING
+
+        try:
+            self._queue.put((handler, record), block=block)
+        except queue.Full:
+            return False
+
+        return True
+
+    def _run(self):
+        """Write the queued records until the writer is stopped."""
+        while True:
+            batch = [self._queue.get()]
+
+            while len(batch) < self._batch_size and batch[-1][0] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            handler, marker = batch[-1]
+
+            if handler is None:
+                batch.pop()
+
+            self._write_batch(batch)
+
+            if handler is not None:
+                continue
+
+            if marker is None:
+                return
+
+            marker.set()
+
+    def _write_batch(self, batch):
+        """Write a batch of records.
+
+        The records are grouped by their sinks. Records for one file
+        keep their order even if they come from different handlers.
+        """
+        groups = {}
+
+        for handler, record in batch:
+            groups.setdefault(handler.sink, []).append((handler, record))
+
+        for items in groups.values():
+            try:
+                self._write_group(items)
+            except Exception:  # pylint: disable=broad-except
+                # The writer thread must never die.
+                items[-1][0].target.handleError(items[-1][1])
+
+    def _write_group(self, items):
+        """Write records of one sink."""
+        handlers = list(dict.fromkeys(handler for handler, _record in items))
+
+        for handler in handlers:
+            missing = handler.take_dropped()
+
+            if missing:
+                items.insert(0, (handler, handler.make_dropped_record(missing)))
+
+        target = items[0][0].target
+
+        if not isinstance(target, logging.StreamHandler) or target.stream is None:
+            for handler, record in items:
+                handler.target.handle(record)
+            return
+
+        messages = []
+
+        for handler, record in items:
+            if not handler.target.filter(record):
+                continue
+
+            try:
+                messages.append(handler.target.format(record) + handler.target.terminator)
+            except Exception:  # pylint: disable=broad-except
+                handler.target.handleError(record)
+
+        if not messages:
+            return
+
+        target.acquire()
+        try:
+            target.stream.write("".join(messages))
+            target.flush()
+        except Exception:  # pylint: disable=broad-except
+            target.handleError(items[-1][1])
+        finally:
+            target.release()
+
+
+class AnacondaQueueHandler(logging.Handler):
+    """A handler that passes the records to the log writer.
+
+    The wrapped handler is used by the writer thread. The level and
+    the autoSetLevel attribute are moved to the queue handler, so the
+    level can be changed with setHandlersLevel.
+    """
+
+    # used to format the exceptions before the records are queued
+    _formatter = logging.Formatter()
+
+    def __init__(self, target, writer):
+        """Create a new queue handler.
+
+        :param target: a handler that should write the records
+        :param writer: an instance of AnacondaLogWriter
+        """
+        super().__init__(level=target.level)
+        self.target = target
+        self.target.setLevel(logging.NOTSET)
+        autoSetLevel(self, getattr(target, "autoSetLevel", False))
+        self._writer = writer
+        self._writer.register(self)
+        self._dropped = 0
+        self._reported = 0
+
+    @property
+    def sink(self):
+        """A key of the destination of the wrapped handler."""
+        return getattr(self.target, "baseFilename", None) or self.target
+
+    @property
+    def dropped(self):
+        """The number of records dropped because the queue was full."""
+        return self._dropped
+
+    def take_dropped(self):
+        """Get the number of dropped records that were not reported yet."""
+        with self.lock:
+            missing = self._dropped - self._reported
+            self._reported = self._dropped
+
+        return missing
+
+    def make_dropped_record(self, count):
+        """Create a record about dropped records."""
+        return logging.LogRecord(
+            name="anaconda", level=logging.WARNING, pathname=__file__, lineno=0,
+            msg="%d log messages were dropped, because the log queue was full."
+                % count,
+            args=None, exc_info=None
+        )
+
+    def prepare(self, record):
+        """Prepare the record for the writer thread.
+
+        The arguments of the message are merged into the message
+        and the exception is formatted, because they might change
+        before the record is written. The record is copied, because
+        other handlers might use the original record.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._formatter.formatException(record.exc_info)
+
+            record.exc_info = None
+
+        return record
+
+    def emit(self, record):
+        # Don't wait for the writer thread in the writer thread.
+        if not self._writer.running or self._writer.in_writer_thread:
+            self.target.handle(record)
+            return
+
+        try:
+            record = self.prepare(record)
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+
+        if not self._writer.put(self, record):
+            with self.lock:
+                self._dropped += 1
+
+    # Don't serialize the producers, the queue is thread-safe.
+    def handle(self, record):
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        self._writer.stop()
+        self.target.close()
+        super().close()
+
+
 class AnacondaPrefixFilter(logging.Filter):
     """Add a log_prefix field, which is based on the name property,
     but without the "anaconda." prefix.
@@ -168,10 +474,17 @@ class AnacondaPrefixFilter(logging.Filter):
 class AnacondaLog(object):
     SYSLOG_CFGFILE = "/etc/rsyslog.conf"
 
-    def __init__(self, write_to_journal=False):
+    def __init__(self, write_to_journal=False, asynchronous=False):
         self.loglevel = DEFAULT_LEVEL
         self.remote_syslog = None
         self.write_to_journal = write_to_journal
+
+        # Write the logs in a dedicated thread.
+        self.writer = None
+        if asynchronous:
+            self.writer = AnacondaLogWriter()
+            self.writer.start()
+
         # Rename the loglevels so they are the same as in syslog.
         logging.addLevelName(logging.CRITICAL, "CRT")
         logging.addLevelName(logging.ERROR, "ERR")
@@ -271,7 +584,12 @@ class AnacondaLog(object):
             logfile_handler.setLevel(minLevel)
             logfile_handler.setFormatter(logging.Formatter(fmtStr, DATE_FORMAT))
             autoSetLevel(logfile_handler, autoLevel)
-            addToLogger.addHandler(logfile_handler)
+
+            # Keep the console output in sync with the other output.
+            if isinstance(dest, str):
+                self.addHandler(addToLogger, logfile_handler)
+            else:
+                addToLogger.addHandler(logfile_handler)
         except IOError:
             pass
 
@@ -293,7 +611,26 @@ class AnacondaLog(object):
             journal_handler.addFilter(log_filter)
         if log_formatter:
             journal_handler.setFormatter(log_formatter)
-        logr.addHandler(journal_handler)
+        self.addHandler(logr, journal_handler)
+
+    def addHandler(self, logr, handler):
+        """Add the handler to the logger.
+
+        If the logs are written asynchronously, the handler is wrapped
+        with a queue handler.
+        """
+        if self.writer:
+            handler = AnacondaQueueHandler(handler, self.writer)
+
+        logr.addHandler(handler)
+
+    def flush(self, timeout=None):
+        """Wait until the queued log records are written.
+
+        :param timeout: a number of seconds to wait or None
+        """
+        if self.writer:
+            self.writer.flush(timeout)
 
     # pylint: disable=redefined-builtin
     def showwarning(self, message, category, filename, lineno,
@@ -310,7 +647,7 @@ class AnacondaLog(object):
         remotelog = AnacondaSocketHandler(host, port)
         remotelog.setFormatter(logging.Formatter(ENTRY_FORMAT, DATE_FORMAT))
         remotelog.setLevel(logging.DEBUG)
-        logging.getLogger().addHandler(remotelog)
+        self.addHandler(logging.getLogger(), remotelog)
 
     def restartSyslog(self):
         # Import here instead of at the module level to avoid an import loop
@@ -344,9 +681,21 @@ class AnacondaLog(object):
         self.restartSyslog()
 
 
-def init(write_to_journal=False):
+def init(write_to_journal=False, asynchronous=False):
     global logger
-    logger = AnacondaLog(write_to_journal=write_to_journal)
+    logger = AnacondaLog(write_to_journal=write_to_journal, asynchronous=asynchronous)
+
+
+def flush(timeout=None):
+    """Wait until the queued log records are written.
+
+    Call it before the logs are read, for example before an exception
+    is dumped or the system is rebooted.
+
+    :param timeout: a number of seconds to wait or None
+    """
+    if logger:
+        logger.flush(timeout)
 
 
 logger = None
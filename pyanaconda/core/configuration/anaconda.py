@@ -55,6 +55,16 @@ class AnacondaSection(Section):
         """List of enabled kickstart modules."""
         return self._get_option("kickstart_modules").split()
 
+    @property
+    def asynchronous_logging(self):
+        """Write the logs in a dedicated thread.
+
+        The logging is set up before the product configuration
+        is loaded, so only the default configuration file
+        is taken into account.
+        """
+        return self._get_option("asynchronous_logging", bool)
+
 
 class AnacondaConfiguration(Configuration):
     """Representation of the Anaconda configuration."""
@@ -80,6 +80,15 @@ class PayloadSection(Section):
         """
         return self._get_option("check_supported_locales", bool)
 
+    @property
+    def package_cache_directories(self):
+        """List of local directories with packages.
+
+        Packages found in these directories are used instead of
+        downloading them, if their checksums match the metadata.
+        """
+        return self._get_option("package_cache_directories", str).split()
+
     @property
     def verify_ssl(self):
         """Global option if the ssl verification is enabled.
@@ -134,6 +134,7 @@ THREAD_KEYBOARD_INIT = "AnaKeyboardThread"
 THREAD_ADD_LAYOUTS_INIT = "AnaAddLayoutsInitThread"
 THREAD_NTP_SERVER_CHECK = "AnaNTPserver"
 THREAD_DBUS_TASK = "AnaTaskThread"
+THREAD_LOCALIZATION_CACHE = "AnaLocalizationCacheThread"
 
 # Geolocation constants
 
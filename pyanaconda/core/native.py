@@ -0,0 +1,488 @@
+#
+# In-process equivalents of common system tools
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+
+"""
+This module provides in-process equivalents of systemctl, restorecon,
+df and cp for the cases the installer needs most often.
+
+The functions handle only the common cases. If a function can't do
+the job the same way as the tool would do it, it returns False or
+raises an OSError, so the caller can run the tool instead.
+
+"""
+
+import os
+import shutil
+import time
+from stat import S_IMODE
+from threading import Lock
+
+from pyanaconda.anaconda_loggers import get_module_logger
+log = get_module_logger(__name__)
+
+__all__ = ["SYSTEMD_UNIT_PATHS", "SYSTEMD_CONFIG_PATH", "mangle_unit_name",
+           "enable_unit", "disable_unit",
+           "relabel", "get_free_space_map", "copy_tree"]
+
+# The directories with systemd system units in the order of priority.
+SYSTEMD_UNIT_PATHS = (
+    "/etc/systemd/system",
+    "/run/systemd/system",
+    "/usr/local/lib/systemd/system",
+    "/usr/lib/systemd/system",
+    "/lib/systemd/system",
+)
+
+# The directory with the configuration created by systemctl enable.
+SYSTEMD_CONFIG_PATH = "/etc/systemd/system"
+
+# The suffixes of valid unit names.
+SYSTEMD_UNIT_TYPES = (
+    "service", "socket", "target", "device", "mount", "automount",
+    "swap", "timer", "path", "slice", "scope"
+)
+
+# How long is the free space map valid (in seconds).
+FREE_SPACE_CACHE_TIMEOUT = 2
+
+# The keys of the [Install] section with their symlink directory suffixes.
+SYSTEMD_DEPENDENCY_KEYS = {
+    "WantedBy": ".wants",
+    "RequiredBy": ".requires",
+    "UpheldBy": ".upholds",
+}
+
+
+def mangle_unit_name(name):
+    """Add the .service suffix to a unit name without a valid suffix."""
+    if name.rsplit(".", 1)[-1] in SYSTEMD_UNIT_TYPES and "." in name:
+        return name
+
+    return name + ".service"
+
+
+def _is_simple_unit_name(name):
+    """Is it a unit name that can be handled without systemctl?"""
+    return bool(name) \
+        and "/" not in name \
+        and "@" not in name \
+        and "%" not in name \
+        and "." in name \
+        and name.rsplit(".", 1)[-1] in SYSTEMD_UNIT_TYPES
+
+
+def _find_unit_file(root, name):
+    """Find a unit file in the unit paths.
+
+    :return: a path relative to the root or None
+    """
+    for directory in SYSTEMD_UNIT_PATHS:
+        path = os.path.join(directory, name)
+
+        if os.path.lexists(root + path):
+            return path
+
+    return None
+
+
+def _read_install_section(path):
+    """Read the [Install] section of a unit file.
+
+    :param str path: a path to the unit file
+    :return: a dictionary of keys and lists of values
+    """
+    install = {}
+    section = None
+
+    with open(path, "r") as f:
+        lines = f.read().splitlines()
+
+    # Join continued lines.
+    logical_lines = []
+    continued = ""
+
+    for line in lines:
+        stripped = line.strip()
+
+        if not continued and stripped.startswith(("#", ";")):
+            continue
+
+        if stripped.endswith("\\"):
+            continued += stripped[:-1] + " "
+            continue
+
+        logical_lines.append(continued + stripped)
+        continued = ""
+
+    if continued:
+        logical_lines.append(continued)
+
+    for line in logical_lines:
+        if not line or line.startswith(("#", ";")):
+            continue
+
+        if line.startswith("[") and line.endswith("]"):
+            section = line[1:-1]
+            continue
+
+        if section != "Install" or "=" not in line:
+            continue
+
+        key, value = line.split("=", 1)
+        key = key.strip()
+        values = value.split()
+
+        # An empty assignment resets the list.
+        if not values:
+            install[key] = []
+            continue
+
+        install.setdefault(key, []).extend(values)
+
+    return install
+
+
+class _UnitInstallPlan(object):
+    """Symlinks that enable a set of units."""
+
+    def __init__(self, root):
+        self.root = root
+        self.units = {}
+        self.symlinks = {}
+
+    def add_unit(self, name):
+        """Add the unit and the units from its Also setting.
+
+        :return: False if the unit can't be handled without systemctl
+        """
+        if name in self.units:
+            return True
+
+        if not _is_simple_unit_name(name):
+            return False
+
+        unit_path = _find_unit_file(self.root, name)
+
+        # The unit doesn't exist, it is masked or it is an alias.
+        if not unit_path or os.path.islink(self.root + unit_path):
+            return False
+
+        try:
+            install = _read_install_section(self.root + unit_path)
+        except (OSError, UnicodeDecodeError):
+            return False
+
+        if install.get("DefaultInstance"):
+            return False
+
+        self.units[name] = (unit_path, install)
+        suffix = "." + name.rsplit(".", 1)[-1]
+
+        for key, directory_suffix in SYSTEMD_DEPENDENCY_KEYS.items():
+            for target in install.get(key, []):
+                if not _is_simple_unit_name(target):
+                    return False
+
+                link = os.path.join(SYSTEMD_CONFIG_PATH, target + directory_suffix, name)
+                self.symlinks[link] = unit_path
+
+        for alias in install.get("Alias", []):
+            if not _is_simple_unit_name(alias) or not alias.endswith(suffix):
+                return False
+
+            self.symlinks[os.path.join(SYSTEMD_CONFIG_PATH, alias)] = unit_path
+
+        return all(self.add_unit(other) for other in install.get("Also", []))
+
+    def check_symlinks(self):
+        """Check that the symlinks can be created.
+
+        :return: False if a different file exists in place of a symlink
+        """
+        for link, target in self.symlinks.items():
+            path = self.root + link
+
+            if not os.path.lexists(path):
+                continue
+
+            if not os.path.islink(path) or os.readlink(path) != target:
+                return False
+
+        return True
+
+
+def enable_unit(name, root="/"):
+    """Enable a systemd unit by creating the symlinks from its [Install] section.
+
+    Only plain units are supported. Templates, masked or aliased units,
+    units with specifiers and conflicting symlinks are left to systemctl.
+
+    :param str name: a name of the unit
+    :param str root: a path to the system root
+    :return: True if the unit was enabled, False if systemctl should be used
+    """
+    try:
+        return _enable_unit(name, root.rstrip("/"))
+    except OSError as e:
+        log.debug("Failed to enable %s in the process: %s", name, e)
+        return False
+
+
+def _enable_unit(name, root):
+    """Enable a systemd unit.
+
+    :raise: OSError if the symlinks can't be created
+    """
+    plan = _UnitInstallPlan(root)
+
+    if not plan.add_unit(mangle_unit_name(name)) or not plan.check_symlinks():
+        return False
+
+    for link, target in sorted(plan.symlinks.items()):
+        path = root + link
+
+        if os.path.lexists(path):
+            continue
+
+        os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+        os.symlink(target, path)
+        log.debug("Created symlink %s -> %s.", link, target)
+
+    return True
+
+
+def disable_unit(name, root="/"):
+    """Disable a systemd unit by removing its symlinks from the configuration.
+
+    All symlinks in the configuration directory that are named after
+    the unit, the units from its Also setting or their aliases or that
+    point to these units are removed. Masks are kept.
+
+    :param str name: a name of the unit
+    :param str root: a path to the system root
+    :return: True if the unit was disabled, False if systemctl should be used
+    """
+    try:
+        return _disable_unit(name, root.rstrip("/"))
+    except OSError as e:
+        log.debug("Failed to disable %s in the process: %s", name, e)
+        return False
+
+
+def _disable_unit(name, root):
+    """Disable a systemd unit.
+
+    :raise: OSError if the symlinks can't be removed
+    """
+    plan = _UnitInstallPlan(root)
+
+    if not plan.add_unit(mangle_unit_name(name)):
+        return False
+
+    names = set(plan.units)
+
+    for _unit_path, install in plan.units.values():
+        names.update(install.get("Alias", []))
+
+    for directory, _dirnames, filenames in os.walk(root + SYSTEMD_CONFIG_PATH):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+
+            if not os.path.islink(path):
+                continue
+
+            target = os.readlink(path)
+
+            if target == "/dev/null":
+                continue
+
+            if filename in names or os.path.basename(target) in names:
+                os.unlink(path)
+                log.debug("Removed %s.", path[len(root):])
+
+    return True
+
+
+def relabel(paths, recursive=True):
+    """Restore the default SELinux contexts of the given paths.
+
+    The Python bindings of libselinux are used if they are available
+    and SELinux is enabled.
+
+    :param paths: a list of paths
+    :param bool recursive: should the directories be relabeled recursively?
+    :return: True if the paths were relabeled, False if restorecon should be used
+    """
+    try:
+        import selinux
+    except ImportError:
+        return False
+
+    if not selinux.is_selinux_enabled():
+        return False
+
+    for path in paths:
+        if os.path.lexists(path):
+            selinux.restorecon(path, recursive=recursive)
+
+    return True
+
+
+def _unescape_mountinfo(value):
+    """Decode the octal escapes of a mountinfo field."""
+    return value.encode("utf-8").decode("unicode_escape").encode("latin-1").decode("utf-8")
+
+
+def _read_mount_points(mountinfo):
+    """Read the visible mount points and their devices from mountinfo.
+
+    If a mount point is mounted over, the last mount is visible.
+
+    :param str mountinfo: a content of the mountinfo file
+    :return: a dictionary of mount points and device numbers
+    """
+    mount_points = {}
+
+    for line in mountinfo.splitlines():
+        fields = line.split()
+
+        if len(fields) < 5:
+            continue
+
+        mount_point = _unescape_mountinfo(fields[4])
+        mount_points.pop(mount_point, None)
+        mount_points[mount_point] = fields[2]
+
+    return mount_points
+
+
+class _FreeSpaceCache(object):
+    """The last free space maps of mountinfo files."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._maps = {}
+
+    def get(self, path, mountinfo, max_age):
+        """Get a valid free space map or None."""
+        with self._lock:
+            timestamp, cached_mountinfo, free_space = self._maps.get(path, (0, None, None))
+
+        if time.monotonic() - timestamp > max_age or cached_mountinfo != mountinfo:
+            return None
+
+        return dict(free_space)
+
+    def set(self, path, mountinfo, free_space):
+        """Remember the free space map."""
+        with self._lock:
+            self._maps[path] = (time.monotonic(), mountinfo, dict(free_space))
+
+    def clear(self):
+        """Forget all free space maps."""
+        with self._lock:
+            self._maps.clear()
+
+
+_free_space_cache = _FreeSpaceCache()
+
+
+def get_free_space_map(mountinfo_path="/proc/self/mountinfo",
+                       max_age=FREE_SPACE_CACHE_TIMEOUT):
+    """Get the space available to unprivileged users on the mounted filesystems.
+
+    Pseudo filesystems without any blocks are skipped like df does it.
+    Bind mounts of a filesystem share the result of one statvfs call.
+    Overlay mounts report the space of their upper layer.
+
+    The map is cached for a short time. It is created again if any
+    filesystem is mounted or unmounted.
+
+    :param str mountinfo_path: a path to the mountinfo file
+    :param float max_age: a maximal age of the cached map in seconds
+    :return: a dictionary of mount points and available space in bytes
+    """
+    with open(mountinfo_path, "r") as f:
+        mountinfo = f.read()
+
+    free_space = _free_space_cache.get(mountinfo_path, mountinfo, max_age)
+
+    if free_space is not None:
+        return free_space
+
+    free_space = {}
+    devices = {}
+
+    for mount_point, device in _read_mount_points(mountinfo).items():
+        if device not in devices:
+            try:
+                stat = os.statvfs(mount_point)
+            except OSError:
+                continue
+
+            devices[device] = stat.f_bavail * stat.f_frsize if stat.f_blocks else None
+
+        if devices[device] is not None:
+            free_space[mount_point] = devices[device]
+
+    _free_space_cache.set(mountinfo_path, mountinfo, free_space)
+    return free_space
+
+
+def copy_tree(source, target):
+    """Copy a file or a directory tree like cp -r -p does it.
+
+    The modes, owners and times are preserved and symlinks are copied
+    as symlinks. If the target is an existing directory, the source is
+    copied into it.
+
+    :param str source: a path to the source
+    :param str target: a path to the target
+    :raise: OSError if the copy fails
+    """
+    if os.path.isdir(target):
+        target = os.path.join(target, os.path.basename(source.rstrip("/")))
+
+    _copy_entry(source, target)
+
+
+def _copy_entry(source, target):
+    """Copy a file or a directory with its metadata."""
+    stat = os.lstat(source)
+
+    if os.path.islink(source):
+        os.symlink(os.readlink(source), target)
+        os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns), follow_symlinks=False)
+    elif os.path.isdir(source):
+        if not os.path.isdir(target):
+            os.mkdir(target, 0o700)
+
+        for name in os.listdir(source):
+            _copy_entry(os.path.join(source, name), os.path.join(target, name))
+
+        shutil.copystat(source, target)
+    else:
+        shutil.copy2(source, target)
+
+    os.lchown(target, stat.st_uid, stat.st_gid)
+
+    # Changing the owner might have cleared the setuid and setgid bits.
+    if not os.path.islink(target):
+        os.chmod(target, S_IMODE(stat.st_mode))
@@ -18,9 +18,15 @@
 #
 
 # Used for ascii_letters and digits constants
+import datetime
+import fcntl
 import os
 import os.path
+import shutil
+import stat
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from pyanaconda.core import util
 from pyanaconda.core.configuration.anaconda import conf
@@ -168,6 +174,101 @@ def guess_username(fullname):
     username = strip_accents(username)
     return username
 
+class AccountsDatabase(object):
+    """A cached database of the account files of the target system.
+
+    The passwd, group and shadow files are loaded to memory and indexed
+    by names and IDs on the first lookup. The loaded files are reused
+    as long as their modification time, size and inode don't change.
+    The installer invalidates the database after it modifies the files.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = {}
+
+    @staticmethod
+    def _get_stamp(path):
+        """Get a stamp of the file that changes when the file is modified."""
+        stats = os.stat(path)
+        return stats.st_ino, stats.st_size, stats.st_mtime_ns, stats.st_ctime_ns
+
+    @staticmethod
+    def _load_file(path):
+        """Load the file and create the name and ID indexes."""
+        names = {}
+        ids = {}
+
+        with open(path, "r") as f:
+            for line in f:
+                fields = line.rstrip("\n").split(":")
+                names.setdefault(fields[0], fields)
+
+                if len(fields) > 2:
+                    ids.setdefault(fields[2], fields)
+
+        return names, ids
+
+    def _get_indexes(self, root, name):
+        """Get the indexes of the given account file."""
+        path = os.path.normpath(root + "/etc/" + name)
+        stamp = self._get_stamp(path)
+
+        with self._lock:
+            cached = self._files.get(path)
+
+            if cached and cached[0] == stamp:
+                return cached[1]
+
+        indexes = self._load_file(path)
+
+        with self._lock:
+            self._files[path] = (stamp, indexes)
+
+        return indexes
+
+    def get_by_name(self, root, name, entry_name):
+        """Get fields of an entry with the given name.
+
+        :param str root: filesystem root for the operation
+        :param str name: a name of the account file (passwd, group or shadow)
+        :param str entry_name: a name of the user or group
+        :return: a list of fields or None
+        """
+        fields = self._get_indexes(root, name)[0].get(entry_name)
+        return list(fields) if fields else None
+
+    def get_by_id(self, root, name, entry_id):
+        """Get fields of an entry with the given ID.
+
+        :param str root: filesystem root for the operation
+        :param str name: a name of the account file (passwd or group)
+        :param entry_id: a UID or GID
+        :return: a list of fields or None
+        """
+        fields = self._get_indexes(root, name)[1].get(str(entry_id))
+        return list(fields) if fields else None
+
+    def invalidate(self, root=None):
+        """Drop the loaded files.
+
+        :param str root: drop only the files of this root or all files if None
+        """
+        with self._lock:
+            if root is None:
+                self._files.clear()
+                return
+
+            prefix = os.path.normpath(root + "/etc") + "/"
+
+            for path in list(self._files):
+                if path.startswith(prefix):
+                    del self._files[path]
+
+
+accounts_database = AccountsDatabase()
+
+
 def _getpwnam(user_name, root):
     """Like pwd.getpwnam, but is able to use a different root.
 
@@ -176,13 +277,7 @@ def _getpwnam(user_name, root):
     :param str user_name: user name
     :param str root: filesystem root for the operation
     """
-    with open(root + "/etc/passwd", "r") as f:
-        for line in f:
-            fields = line.split(":")
-            if fields[0] == user_name:
-                return fields
-
-    return None
+    return accounts_database.get_by_name(root, "passwd", user_name)
 
 def _getgrnam(group_name, root):
     """Like grp.getgrnam, but able to use a different root.
@@ -192,13 +287,7 @@ def _getgrnam(group_name, root):
     :param str group_name: group name
     :param str root: filesystem root for the operation
     """
-    with open(root + "/etc/group", "r") as f:
-        for line in f:
-            fields = line.split(":")
-            if fields[0] == group_name:
-                return fields
-
-    return None
+    return accounts_database.get_by_name(root, "group", group_name)
 
 def _getgrgid(gid, root):
     """Like grp.getgrgid, but able to use a different root.
@@ -208,16 +297,17 @@ def _getgrgid(gid, root):
     :param int git: group id
     :param str root: filesystem root for the operation
     """
-    # Convert the probably-int GID to a string
-    gid = str(gid)
+    return accounts_database.get_by_id(root, "group", gid)
 
-    with open(root + "/etc/group", "r") as f:
-        for line in f:
-            fields = line.split(":")
-            if fields[2] == gid:
-                return fields
+def _getspnam(user_name, root):
+    """Like spwd.getspnam, but able to use a different root.
 
-    return None
+    Just returns the fields as a list of strings.
+
+    :param str user_name: user name
+    :param str root: filesystem root for the operation
+    """
+    return accounts_database.get_by_name(root, "shadow", user_name)
 
 @contextmanager
 def _ensure_login_defs(root):
@@ -264,6 +354,8 @@ def create_group(group_name, gid=None, root=None):
     with _ensure_login_defs(root):
         status = util.execWithRedirect("groupadd", args)
 
+    accounts_database.invalidate(root)
+
     if status == 4:
         raise ValueError("GID %s already exists" % gid)
     elif status == 9:
@@ -388,6 +480,8 @@ def create_user(username, password=False, is_crypted=False, lock=False,
     with _ensure_login_defs(root):
         status = util.execWithRedirect("useradd", args)
 
+    accounts_database.invalidate(root)
+
     if status == 4:
         raise ValueError("UID %s already exists" % uid)
     elif status == 6:
@@ -412,7 +506,7 @@ def create_user(username, password=False, is_crypted=False, lock=False,
             util.chown_dir_tree(root + homedir,
                                 int(pwent[2]), int(pwent[3]),
                                 orig_uid, orig_gid)
-            util.execWithRedirect("restorecon", ["-r", root + homedir])
+            util.restorecon([root + homedir])
         except OSError as e:
             log.critical("Unable to change owner of existing home directory: %s", e.strerror)
             raise
@@ -457,6 +551,7 @@ def set_user_password(username, password, is_crypted, lock, root="/"):
 
         proc = util.startProgram(["chpasswd", "-R", root, "-e"], stdin=subprocess.PIPE)
         proc.communicate(("%s:%s\n" % (username, password)).encode("utf-8"))
+        accounts_database.invalidate(root)
         if proc.returncode != 0:
             raise OSError("Unable to set password for new user: status=%s" % proc.returncode)
 
@@ -464,6 +559,7 @@ def set_user_password(username, password, is_crypted, lock, root="/"):
     # field can be set to 0, which has a special meaning that the password
     # must be reset on the next login.
     util.execWithRedirect("chage", ["-R", root, "-d", "", username])
+    accounts_database.invalidate(root)
 
 def set_root_password(password, is_crypted=False, lock=False, root="/"):
     """Set root password.
@@ -510,4 +606,767 @@ def set_user_ssh_key(username, key, root=None):
     # Only change ownership if we created it
     if not authfile_existed:
         os.chown(authfile, int(uid), int(gid))
-        util.execWithRedirect("restorecon", ["-r", sshdir])
+        util.restorecon([sshdir])
+
+
+# Default values of the login.defs settings used by useradd and groupadd.
+LOGIN_DEFS_DEFAULTS = {
+    "UID_MIN": "1000",
+    "UID_MAX": "60000",
+    "GID_MIN": "1000",
+    "GID_MAX": "60000",
+    "PASS_MIN_DAYS": "-1",
+    "PASS_MAX_DAYS": "-1",
+    "PASS_WARN_AGE": "-1",
+    "UMASK": "022",
+    "MAIL_DIR": "/var/mail",
+    "SUB_UID_MIN": "100000",
+    "SUB_UID_MAX": "600100000",
+    "SUB_UID_COUNT": "65536",
+    "SUB_GID_MIN": "100000",
+    "SUB_GID_MAX": "600100000",
+    "SUB_GID_COUNT": "65536",
+}
+
+# Default values of the /etc/default/useradd settings.
+USERADD_DEFAULTS = {
+    "SHELL": "/bin/bash",
+    "SKEL": "/etc/skel",
+    "INACTIVE": "-1",
+    "EXPIRE": "",
+    "CREATE_MAIL_SPOOL": "no",
+}
+
+# The password of a new account without a password. It is the value
+# set by useradd of Fedora and RHEL.
+NEW_ACCOUNT_PASSWORD = "!!"
+
+# The maximal number of home directories created at the same time.
+HOME_CREATION_WORKERS = 8
+
+
+def _parse_number(value, default=-1):
+    """Parse a number of a shadow-utils configuration file.
+
+    The numbers are parsed the same way as strtol with the base 0 does it,
+    so 022 is an octal number and 0x10 is a hexadecimal number.
+
+    :param str value: a string with a number
+    :param int default: a value returned for an empty or invalid string
+    :return: a number
+    """
+    value = (value or "").strip()
+    number = value.lstrip("+-")
+    sign = -1 if value.startswith("-") else 1
+
+    try:
+        if number[:2].lower() == "0x":
+            return sign * int(number[2:], 16)
+        elif number.startswith("0") and len(number) > 1:
+            return sign * int(number[1:], 8)
+        else:
+            return sign * int(number, 10)
+    except ValueError:
+        return default
+
+
+def _read_login_defs(root):
+    """Read the login.defs file of the given root.
+
+    :param str root: filesystem root for the operation
+    :return: a dictionary of settings
+    """
+    settings = dict(LOGIN_DEFS_DEFAULTS)
+
+    try:
+        with open(root + "/etc/login.defs", "r") as f:
+            for line in f:
+                fields = line.strip().split(None, 1)
+
+                if len(fields) != 2 or fields[0].startswith("#"):
+                    continue
+
+                settings[fields[0]] = fields[1].strip().strip('"')
+    except FileNotFoundError:
+        pass
+
+    return settings
+
+
+def _read_useradd_defaults(root):
+    """Read the /etc/default/useradd file of the given root.
+
+    :param str root: filesystem root for the operation
+    :return: a dictionary of settings
+    """
+    settings = dict(USERADD_DEFAULTS)
+
+    try:
+        with open(root + "/etc/default/useradd", "r") as f:
+            for line in f:
+                line = line.strip()
+
+                if not line or line.startswith("#") or "=" not in line:
+                    continue
+
+                key, value = line.split("=", 1)
+                settings[key.strip()] = value.strip().strip('"')
+    except FileNotFoundError:
+        pass
+
+    return settings
+
+
+def _find_free_id(used_ids, id_min, id_max, preferred=None):
+    """Find a free ID the same way as useradd and groupadd do it.
+
+    The preferred ID is used if it is free and in the range. Otherwise,
+    the ID after the highest used ID in the range is used. If it is not
+    possible, the lowest free ID in the range is used.
+
+    :param used_ids: a set of used IDs
+    :param int id_min: the lowest ID of the range
+    :param int id_max: the highest ID of the range
+    :param int preferred: a preferred ID or None
+    :return: a free ID
+    :raise: ValueError if there are no free IDs
+    """
+    if preferred is not None and id_min <= preferred <= id_max and preferred not in used_ids:
+        return preferred
+
+    highest = max((i for i in used_ids if id_min <= i <= id_max), default=None)
+
+    if highest is None:
+        return id_min
+
+    if highest < id_max:
+        return highest + 1
+
+    for i in range(id_min, id_max + 1):
+        if i not in used_ids:
+            return i
+
+    raise ValueError("No free ID in the range %s-%s" % (id_min, id_max))
+
+
+def _format_number(number):
+    """Format a number of a shadow entry. Negative numbers are empty."""
+    return str(number) if number >= 0 else ""
+
+
+class _AccountsFile(object):
+    """A passwd-like file with colon-separated entries.
+
+    The file is loaded to memory and written back only if it was
+    modified, the same way the shadow-utils tools do it. New entries
+    are added before the first NIS entry.
+    """
+
+    def __init__(self, path):
+        """Load the file.
+
+        :param str path: a path to the file
+        """
+        self.path = path
+        self.exists = os.path.exists(path)
+        self.modified = False
+        self._lines = []
+        self._nis_lines = []
+        self._index = {}
+        self._ids = {}
+        self._used_ids = set()
+
+        if not self.exists:
+            return
+
+        with open(path, "r") as f:
+            lines = f.read().splitlines()
+
+        for line in lines:
+            if self._nis_lines or line.startswith(("+", "-")):
+                self._nis_lines.append(line)
+                continue
+
+            self._add_to_index(line.split(":"), len(self._lines))
+            self._lines.append(line)
+
+    def _add_to_index(self, fields, position):
+        """Index the entry by its name and ID."""
+        self._index.setdefault(fields[0], position)
+
+        if len(fields) > 2:
+            self._ids.setdefault(fields[2], position)
+
+            if fields[2].isdigit():
+                self._used_ids.add(int(fields[2]))
+
+    def get(self, name):
+        """Get fields of the entry with the given name or None."""
+        position = self._index.get(name)
+
+        if position is None:
+            return None
+
+        return self._lines[position].split(":")
+
+    def get_by_id(self, entry_id):
+        """Get fields of the entry with the given ID or None."""
+        position = self._ids.get(str(entry_id))
+
+        if position is None:
+            return None
+
+        return self._lines[position].split(":")
+
+    def get_used_ids(self):
+        """Get a frozen set of numeric IDs of all entries."""
+        return frozenset(self._used_ids)
+
+    def entries(self):
+        """Iterate over fields of all entries."""
+        for line in self._lines:
+            yield line.split(":")
+
+    def add(self, fields):
+        """Add a new entry."""
+        self._add_to_index(fields, len(self._lines))
+        self._lines.append(":".join(fields))
+        self.modified = True
+
+    def update(self, fields):
+        """Replace the entry with the same name."""
+        self._lines[self._index[fields[0]]] = ":".join(fields)
+        self.modified = True
+
+    def sort(self, key):
+        """Sort the entries with the given key function of fields."""
+        self._lines.sort(key=lambda line: key(line.split(":")))
+        self._index = {}
+        self._ids = {}
+
+        for position, line in enumerate(self._lines):
+            self._add_to_index(line.split(":"), position)
+
+    def write(self):
+        """Write the file if it was modified.
+
+        A backup of the original file is kept in the file with the '-'
+        suffix. The new content is written to the file with the '+'
+        suffix and renamed, so the file is replaced atomically.
+        """
+        if not self.modified:
+            return
+
+        stats = os.stat(self.path)
+        backup_path = self.path + "-"
+        new_path = self.path + "+"
+
+        for path in (backup_path, new_path):
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.fchown(fd, stats.st_uid, stats.st_gid)
+            os.fchmod(fd, stat.S_IMODE(stats.st_mode))
+            os.close(fd)
+
+        shutil.copyfile(self.path, backup_path)
+        os.utime(backup_path, ns=(stats.st_atime_ns, stats.st_mtime_ns))
+
+        with open(new_path, "w") as f:
+            for line in self._lines + self._nis_lines:
+                f.write(line + "\n")
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.rename(new_path, self.path)
+        self.modified = False
+
+
+class AccountsTransaction(object):
+    """Create many users and groups in one transaction.
+
+    The transaction does the same changes as the create_group and
+    create_user functions, but it doesn't run groupadd, useradd,
+    chpasswd and chage for every account. The account files are
+    locked and loaded once, the entries are computed in memory and
+    the modified files are written on commit. The home directories
+    are created concurrently and relabeled with one call of restorecon.
+
+    Use the transaction as a context manager. The changes are committed
+    at the end of the block unless an exception is raised:
+
+        with AccountsTransaction(root) as transaction:
+            transaction.create_group("wheel2")
+            transaction.create_user("user", groups=["wheel2"])
+
+    The lastlog and faillog records of the new users are not reset.
+    """
+
+    ACCOUNT_FILES = ["passwd", "shadow", "group", "gshadow", "subuid", "subgid"]
+
+    def __init__(self, root=None):
+        """Create a new transaction.
+
+        :param str root: The directory of the system to create the accounts in.
+                         Defaults to conf.target.system_root.
+        """
+        if root is None:
+            root = conf.target.system_root
+
+        self._root = root
+        self._files = {}
+        self._locks = []
+        self._global_lock = None
+        self._login_defs = {}
+        self._useradd_defaults = {}
+        self._homes = []
+        self._mail_spools = []
+
+    def __enter__(self):
+        self.lock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self.unlock()
+
+    def lock(self):
+        """Lock and load the account files."""
+        etc = self._root + "/etc"
+
+        # Lock the files the same way as lckpwdf.
+        self._global_lock = os.open(etc + "/.pwd.lock", os.O_WRONLY | os.O_CREAT, 0o600)
+        fcntl.lockf(self._global_lock, fcntl.LOCK_EX)
+
+        try:
+            for name in self.ACCOUNT_FILES:
+                path = os.path.join(etc, name)
+
+                if not os.path.exists(path):
+                    continue
+
+                self._lock_file(path)
+                self._files[name] = _AccountsFile(path)
+
+            if "passwd" not in self._files or "group" not in self._files:
+                raise OSError("Unable to find the account files in %s" % etc)
+        except Exception:
+            self.unlock()
+            raise
+
+        self._login_defs = _read_login_defs(self._root)
+        self._useradd_defaults = _read_useradd_defaults(self._root)
+
+    def _lock_file(self, path):
+        """Create a lock file of the given account file."""
+        lock_path = path + ".lock"
+
+        try:
+            fd = os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            raise OSError("Unable to lock %s" % path)
+
+        os.write(fd, str(os.getpid()).encode("utf-8"))
+        os.close(fd)
+        self._locks.append(lock_path)
+
+    def unlock(self):
+        """Unlock the account files."""
+        while self._locks:
+            os.unlink(self._locks.pop())
+
+        if self._global_lock is not None:
+            os.close(self._global_lock)
+            self._global_lock = None
+
+    def _get_file(self, name):
+        """Get the loaded account file or None if it doesn't exist."""
+        return self._files.get(name)
+
+    def _get_number(self, key):
+        """Get a number from login.defs."""
+        return _parse_number(self._login_defs.get(key))
+
+    def _get_used_ids(self, name):
+        """Get a set of IDs used in the passwd or group file."""
+        return self._files[name].get_used_ids()
+
+    def check_user_exists(self, username):
+        """Check if the user exists in this transaction."""
+        return self._files["passwd"].get(username) is not None
+
+    def create_group(self, group_name, gid=None):
+        """Create a new group.
+
+        See the create_group function for the description of the arguments.
+        """
+        group_file = self._files["group"]
+
+        if group_file.get(group_name):
+            raise ValueError("Group %s already exists" % group_name)
+
+        used_gids = self._get_used_ids("group")
+
+        if gid is not None:
+            gid = int(gid)
+
+            if gid in used_gids:
+                raise ValueError("GID %s already exists" % gid)
+        else:
+            gid = _find_free_id(used_gids,
+                                self._get_number("GID_MIN"),
+                                self._get_number("GID_MAX"))
+
+        self._add_group(group_name, gid)
+        return gid
+
+    def _add_group(self, group_name, gid, members=()):
+        """Add entries of a new group."""
+        self._files["group"].add([group_name, "x", str(gid), ",".join(members)])
+
+        gshadow_file = self._get_file("gshadow")
+        if gshadow_file:
+            gshadow_file.add([group_name, "!", "", ",".join(members)])
+
+    def _add_group_member(self, group_name, username):
+        """Add the user to members of the group."""
+        for name in ("group", "gshadow"):
+            accounts_file = self._get_file(name)
+
+            if not accounts_file:
+                continue
+
+            fields = accounts_file.get(group_name)
+
+            if not fields or len(fields) < 4:
+                continue
+
+            members = [member for member in fields[3].split(",") if member]
+
+            if username in members:
+                continue
+
+            members.append(username)
+            fields[3] = ",".join(members)
+            accounts_file.update(fields)
+
+    def create_user(self, username, password=False, is_crypted=False, lock=False,
+                    homedir=None, uid=None, gid=None, groups=None, shell=None, gecos=""):
+        """Create a new user.
+
+        See the create_user function for the description of the arguments.
+        """
+        if not homedir:
+            homedir = "/home/" + username
+
+        if groups is None:
+            groups = []
+
+        if self.check_user_exists(username):
+            raise ValueError("User %s already exists" % username)
+
+        # Split the groups argument into a list of (username, gid or None) tuples.
+        group_gids = [GROUPLIST_FANCY_PARSE.match(group).groups() for group in groups]
+
+        # Handle the requested GID the same way as create_user does.
+        if gid:
+            if not self._get_group_by_gid(gid) \
+                    and not any(one_gid[1] == str(gid) for one_gid in group_gids):
+                self.create_group(username, gid=gid)
+
+        # If any requested groups do not exist, create them.
+        group_list = []
+        for group_name, group_gid in group_gids:
+            existing_group = self._files["group"].get(group_name)
+
+            # Check for a bad GID request
+            if group_gid and existing_group and group_gid != existing_group[2]:
+                raise ValueError("Group %s already exists with GID %s" % (group_name, group_gid))
+
+            # Otherwise, create the group if it does not already exist
+            if not existing_group:
+                self.create_group(group_name, gid=group_gid)
+            group_list.append(group_name)
+
+        # Check the account the same way as useradd does.
+        used_uids = self._get_used_ids("passwd")
+
+        if uid:
+            uid = int(uid)
+
+            if uid in used_uids:
+                raise ValueError("UID %s already exists" % uid)
+        else:
+            uid = _find_free_id(used_uids,
+                                self._get_number("UID_MIN"),
+                                self._get_number("UID_MAX"))
+
+        if gid:
+            gid = int(gid)
+
+            if not self._get_group_by_gid(gid):
+                raise ValueError("Invalid groups %s" % groups)
+        else:
+            if self._files["group"].get(username):
+                raise ValueError("User %s already exists" % username)
+
+            gid = _find_free_id(self._get_used_ids("group"),
+                                self._get_number("GID_MIN"),
+                                self._get_number("GID_MAX"),
+                                preferred=uid)
+            self._add_group(username, gid)
+
+        for group_name in group_list:
+            self._add_group_member(group_name, username)
+
+        # Add the user.
+        shell = shell or self._useradd_defaults["SHELL"]
+        password_entry = self._get_password_entry(username, password, is_crypted, lock)
+        shadow_file = self._get_file("shadow")
+
+        self._files["passwd"].add([
+            username, "x" if shadow_file else password_entry, str(uid), str(gid),
+            gecos, homedir, shell
+        ])
+
+        if shadow_file:
+            shadow_file.add([
+                username,
+                password_entry,
+                "",
+                _format_number(self._get_number("PASS_MIN_DAYS")),
+                _format_number(self._get_number("PASS_MAX_DAYS")),
+                _format_number(self._get_number("PASS_WARN_AGE")),
+                _format_number(_parse_number(self._useradd_defaults["INACTIVE"])),
+                _format_number(self._get_expiration_date()),
+                ""
+            ])
+
+        self._add_subordinate_ids(username, uid)
+
+        # Schedule the creation of the home directory.
+        parent_dir = util.parent_dir(self._root + homedir)
+
+        if parent_dir:
+            util.mkdirChain(parent_dir)
+
+        self._homes.append((homedir, uid, gid, not os.path.exists(self._root + homedir)))
+
+        if self._useradd_defaults["CREATE_MAIL_SPOOL"].lower() == "yes":
+            self._mail_spools.append((username, uid, gid))
+
+        return uid, gid
+
+    def _get_group_by_gid(self, gid):
+        """Get fields of the group with the given GID or None."""
+        return self._files["group"].get_by_id(gid)
+
+    def _get_password_entry(self, username, password, is_crypted, lock):
+        """Get the password field of a new user."""
+        if not password and password != "":
+            return NEW_ACCOUNT_PASSWORD
+
+        if password == "":
+            log.info("user account %s setup with no password", username)
+        elif not is_crypted:
+            password = crypt_password(password)
+
+        if lock:
+            password = "!" + password
+            log.info("user account %s locked", username)
+
+        return password
+
+    def _get_expiration_date(self):
+        """Get the default account expiration date in days since the epoch."""
+        value = self._useradd_defaults["EXPIRE"].strip()
+
+        if not value or value == "-1":
+            return -1
+
+        try:
+            date = datetime.datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            log.warning("Invalid default expiration date: %s", value)
+            return -1
+
+        return (date - datetime.datetime(1970, 1, 1)).days
+
+    def _add_subordinate_ids(self, username, uid):
+        """Allocate subordinate UIDs and GIDs of a new user."""
+        for name, prefix, id_min, id_max in (("subuid", "SUB_UID", "UID_MIN", "UID_MAX"),
+                                              ("subgid", "SUB_GID", "UID_MIN", "UID_MAX")):
+            accounts_file = self._get_file(name)
+            count = self._get_number(prefix + "_COUNT")
+
+            if not accounts_file or count <= 0:
+                continue
+
+            if not self._get_number(id_min) <= uid <= self._get_number(id_max):
+                continue
+
+            start = self._find_free_range(accounts_file,
+                                          self._get_number(prefix + "_MIN"),
+                                          self._get_number(prefix + "_MAX"),
+                                          count)
+
+            if start is None:
+                log.warning("Unable to allocate %s ranges for the user %s", name, username)
+                continue
+
+            accounts_file.add([username, str(start), str(count)])
+
+    @staticmethod
+    def _find_free_range(accounts_file, range_min, range_max, count):
+        """Find a free range of subordinate IDs the same way as useradd does."""
+        def get_range(fields):
+            try:
+                return int(fields[1]), int(fields[2])
+            except (IndexError, ValueError):
+                return 0, 0
+
+        accounts_file.sort(key=get_range)
+        low = range_min
+
+        for fields in accounts_file.entries():
+            first, length = get_range(fields)
+            high = min(first, range_max + 1)
+
+            if high > low and high - low >= count:
+                return low
+
+            low = max(low, first + length)
+
+            if low > range_max:
+                return None
+
+        if range_max - low + 1 >= count:
+            return low
+
+        return None
+
+    def commit(self):
+        """Write the account files and create the home directories."""
+        for name in self.ACCOUNT_FILES:
+            accounts_file = self._get_file(name)
+
+            if accounts_file:
+                accounts_file.write()
+
+        accounts_database.invalidate(self._root)
+
+        relabel_paths = [f.path for f in self._files.values() if f.exists]
+        relabel_paths.extend(self._create_homes())
+        relabel_paths.extend(self._create_mail_spools())
+
+        if self._homes or self._mail_spools:
+            util.restorecon(relabel_paths)
+
+        self._homes = []
+        self._mail_spools = []
+
+    def _create_homes(self):
+        """Create the home directories concurrently.
+
+        :return: a list of paths that should be relabeled
+        """
+        if not self._homes:
+            return []
+
+        umask = _parse_number(self._login_defs.get("UMASK"), 0o022)
+        home_mode = _parse_number(self._login_defs.get("HOME_MODE"), 0o777 & ~umask)
+        skel = self._useradd_defaults["SKEL"]
+
+        def create_home(home):
+            homedir, uid, gid, mk_homedir = home
+            path = self._root + homedir
+
+            if mk_homedir:
+                os.mkdir(path, 0)
+                os.chown(path, uid, gid)
+                os.chmod(path, home_mode)
+
+                if os.path.isdir(self._root + skel):
+                    _copy_skel(self._root, skel, homedir, uid, gid)
+            else:
+                stats = os.stat(path)
+                log.info("Home directory %s already existed, "
+                         "fixing the owner and SELinux context.", homedir)
+                util.chown_dir_tree(path, uid, gid, stats.st_uid, stats.st_gid)
+
+            return path
+
+        workers = min(HOME_CREATION_WORKERS, len(self._homes))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(create_home, home) for home in self._homes]
+
+        paths = []
+        for future in futures:
+            try:
+                paths.append(future.result())
+            except OSError as e:
+                log.critical("Unable to create the home directory: %s", e.strerror)
+                raise
+
+        return paths
+
+    def _create_mail_spools(self):
+        """Create the mail spools of the new users.
+
+        :return: a list of paths that should be relabeled
+        """
+        paths = []
+        mail_group = self._files["group"].get("mail")
+
+        for username, uid, gid in self._mail_spools:
+            path = os.path.join(self._root + self._login_defs["MAIL_DIR"], username)
+
+            if mail_group:
+                group, mode = int(mail_group[2]), 0o660
+            else:
+                group, mode = gid, 0o600
+
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC | os.O_EXCL, 0)
+            except OSError as e:
+                log.warning("Unable to create the mailbox file %s: %s", path, e.strerror)
+                continue
+
+            os.fchown(fd, uid, group)
+            os.fchmod(fd, mode)
+            os.close(fd)
+            paths.append(path)
+
+        return paths
+
+
+def _copy_skel(root, source, target, uid, gid):
+    """Copy the content of the skeleton directory to a new home directory.
+
+    :param str root: filesystem root for the operation
+    :param str source: a path to the skeleton directory relative to the root
+    :param str target: a path to the home directory relative to the root
+    :param int uid: the owner of the copied files
+    :param int gid: the group of the copied files
+    """
+    for entry in os.scandir(root + source):
+        target_path = os.path.join(target, entry.name)
+
+        if entry.is_symlink():
+            link = os.readlink(entry.path)
+
+            # Links to the skeleton directory point to the home directory.
+            if link.startswith(source + "/"):
+                link = target + link[len(source):]
+
+            os.symlink(link, root + target_path)
+        elif entry.is_dir():
+            os.mkdir(root + target_path)
+            _copy_skel(root, os.path.join(source, entry.name), target_path, uid, gid)
+            shutil.copystat(entry.path, root + target_path)
+        else:
+            shutil.copy2(entry.path, root + target_path)
+
+        os.lchown(root + target_path, uid, gid)
@@ -36,6 +36,8 @@ import imp
 import types
 import inspect
 import functools
+import threading
+from collections import deque
 
 import requests
 from requests_file import FileAdapter
@@ -43,6 +45,7 @@ from requests_ftp import FTPAdapter
 
 from pyanaconda.core.configuration.anaconda import conf
 from pyanaconda.flags import flags
+from pyanaconda.core import native
 from pyanaconda.core.process_watchers import WatchProcesses
 from pyanaconda.core.constants import DRACUT_SHUTDOWN_EJECT, TRANSLATIONS_UPDATE_DIR, \
     IPMI_ABORTED, X_TIMEOUT, TAINT_HARDWARE_UNSUPPORTED, TAINT_SUPPORT_REMOVED, \
@@ -62,6 +65,10 @@ from pykickstart.constants import KS_SCRIPT_ONERROR
 
 _child_env = {}
 
+# The maximal number of lines of a streamed program output
+# returned to the caller. Older lines are only logged.
+PROGRAM_OUTPUT_TAIL_LINES = 1000
+
 
 def setenv(name, value):
     """ Set an environment variable to be used by child processes.
@@ -264,8 +271,60 @@ def startX(argv, output_redirect=None, timeout=X_TIMEOUT):
         signal.signal(signal.SIGALRM, old_sigalrm_handler)
 
 
+def _log_program_line(line):
+    """Log one line of a program output.
+
+    :param bytes line: a line of the output
+    """
+    with program_log_lock:
+        program_log.info(line.decode("utf-8", "replace").strip())
+
+
+def _stream_program_output(proc, stdout=None, log_output=True, binary_output=False):
+    """Log and redirect the output of a running program line by line.
+
+    The output is processed as soon as the program writes it. Only the
+    last PROGRAM_OUTPUT_TAIL_LINES lines are kept in memory and returned,
+    so the memory usage stays bounded even for very long outputs.
+
+    :param proc: a running process with piped stdout and optionally stderr
+    :param stdout: Optional file object to write the output to.
+    :param log_output: whether to log the output of command
+    :param binary_output: whether to treat the output of command as binary data
+    :return: the last lines of the output
+    """
+    tail = deque(maxlen=PROGRAM_OUTPUT_TAIL_LINES)
+    stderr_reader = None
+
+    # The filtered stderr is only logged. Read it in another
+    # thread, so the program is not blocked by a full pipe.
+    if proc.stderr:
+        def _read_stderr():
+            for err_line in proc.stderr:
+                if log_output:
+                    _log_program_line(err_line)
+
+        stderr_reader = threading.Thread(target=_read_stderr, daemon=True)
+        stderr_reader.start()
+
+    for line in proc.stdout:
+        tail.append(line)
+
+        if log_output:
+            _log_program_line(line)
+
+        if stdout:
+            stdout.write(line if binary_output else line.decode("utf-8", "replace"))
+
+    if stderr_reader:
+        stderr_reader.join()
+
+    proc.wait()
+    return b"".join(tail)
+
+
 def _run_program(argv, root='/', stdin=None, stdout=None, env_prune=None, log_output=True,
-                 binary_output=False, filter_stderr=False):
+                 binary_output=False, filter_stderr=False, stream_output=False):
     """ Run an external program, log the output and return it to the caller
 
         NOTE/WARNING: UnicodeDecodeError will be raised if the output of the of the
@@ -279,6 +338,9 @@ def _run_program(argv, root='/', stdin=None, stdout=None, env_prune=None, log_ou
         :param log_output: whether to log the output of command
         :param binary_output: whether to treat the output of command as binary data
         :param filter_stderr: whether to exclude the contents of stderr from the returned output
+        :param stream_output: whether to log and redirect the output while the command
+                              runs; only the last PROGRAM_OUTPUT_TAIL_LINES lines of the
+                              output are returned in this mode
         :return: The return code of the command and the output
     """
     try:
@@ -290,38 +352,16 @@ def _run_program(argv, root='/', stdin=None, stdout=None, env_prune=None, log_ou
         proc = startProgram(argv, root=root, stdin=stdin, stdout=subprocess.PIPE, stderr=stderr,
                             env_prune=env_prune)
 
-        (output_string, err_string) = proc.communicate()
-        if not binary_output:
-            output_string = output_string.decode("utf-8")
-            if output_string and output_string[-1] != "\n":
-                output_string = output_string + "\n"
+        if stream_output:
+            output_string = _stream_program_output(proc, stdout, log_output, binary_output)
 
-        if log_output:
-            with program_log_lock:
-                if binary_output:
-                    # try to decode as utf-8 and replace all undecodable data by
-                    # "safe" printable representations when logging binary output
-                    decoded_output_lines = output_string.decode("utf-8", "replace")
-                else:
-                    # output_string should already be a Unicode string
-                    decoded_output_lines = output_string.splitlines(True)
-
-                for line in decoded_output_lines:
-                    program_log.info(line.strip())
-
-        if stdout:
-            stdout.write(output_string)
-
-        # If stderr was filtered, log it separately
-        if filter_stderr and err_string and log_output:
-            # try to decode as utf-8 and replace all undecodable data by
-            # "safe" printable representations when logging binary output
-            decoded_err_string = err_string.decode("utf-8", "replace")
-            err_lines = decoded_err_string.splitlines(True)
-
-            with program_log_lock:
-                for line in err_lines:
-                    program_log.info(line.strip())
+            if not binary_output:
+                output_string = output_string.decode("utf-8", "replace")
+                if output_string and output_string[-1] != "\n":
+                    output_string = output_string + "\n"
+        else:
+            output_string = _capture_program_output(proc, stdout, log_output, binary_output,
+                                                    filter_stderr)
 
     except OSError as e:
         with program_log_lock:
@@ -334,6 +374,53 @@ def _run_program(argv, root='/', stdin=None, stdout=None, env_prune=None, log_ou
     return (proc.returncode, output_string)
 
 
+def _capture_program_output(proc, stdout=None, log_output=True, binary_output=False,
+                            filter_stderr=False):
+    """Capture the whole output of a program and log it when the program finishes.
+
+    :param proc: a running process with piped stdout and optionally stderr
+    :param stdout: Optional file object to write the output to.
+    :param log_output: whether to log the output of command
+    :param binary_output: whether to treat the output of command as binary data
+    :param filter_stderr: whether stderr was excluded from the output
+    :return: the output of the program
+    """
+    (output_string, err_string) = proc.communicate()
+    if not binary_output:
+        output_string = output_string.decode("utf-8")
+        if output_string and output_string[-1] != "\n":
+            output_string = output_string + "\n"
+
+    if log_output:
+        with program_log_lock:
+            if binary_output:
+                # try to decode as utf-8 and replace all undecodable data by
+                # "safe" printable representations when logging binary output
+                decoded_output_lines = output_string.decode("utf-8", "replace")
+            else:
+                # output_string should already be a Unicode string
+                decoded_output_lines = output_string.splitlines(True)
+
+            for line in decoded_output_lines:
+                program_log.info(line.strip())
+
+    if stdout:
+        stdout.write(output_string)
+
+    # If stderr was filtered, log it separately
+    if filter_stderr and err_string and log_output:
+        # try to decode as utf-8 and replace all undecodable data by
+        # "safe" printable representations when logging binary output
+        decoded_err_string = err_string.decode("utf-8", "replace")
+        err_lines = decoded_err_string.splitlines(True)
+
+        with program_log_lock:
+            for line in err_lines:
+                program_log.info(line.strip())
+
+    return output_string
+
+
 def execInSysroot(command, argv, stdin=None, root=None):
     """ Run an external program in the target root.
         :param command: The command to run
@@ -361,10 +448,13 @@ def execWithRedirect(command, argv, stdin=None, stdout=None,
         :param log_output: whether to log the output of command
         :param binary_output: whether to treat the output of command as binary data
         :return: The return code of the command
+
+        The output is logged and redirected while the command runs.
     """
     argv = [command] + argv
     return _run_program(argv, stdin=stdin, stdout=stdout, root=root, env_prune=env_prune,
-                        log_output=log_output, binary_output=binary_output)[0]
+                        log_output=log_output, binary_output=binary_output,
+                        stream_output=True)[0]
 
 
 def execWithCapture(command, argv, stdin=None, root='/', log_output=True, filter_stderr=False):
@@ -610,6 +700,38 @@ def _run_systemctl(command, service, root="/"):
     return ret
 
 
+def _run_systemctl_batch(command, services, root="/"):
+    """Run 'systemctl command' for multiple services at once.
+
+    The failed services are found in the combined output of systemctl.
+
+    :param str command: a command of systemctl
+    :param services: a list of services
+    :param str root: path to the sysroot
+    :return: exit status of the systemctl and a list of failed services
+    """
+    args = [command] + list(services)
+    if root != "/":
+        args += ["--root", root]
+
+    ret, output = _run_program(["systemctl"] + args, stream_output=True)
+    failed = []
+
+    for service in services:
+        unit = re.escape(native.mangle_unit_name(service))
+        pattern = re.compile(r"^Failed to .*(^|[\s/\"']){}($|[\s.,:\"'])".format(unit),
+                             re.MULTILINE)
+
+        if pattern.search(output):
+            failed.append(service)
+
+    # We can't tell which services failed.
+    if ret != 0 and not failed:
+        failed = list(services)
+
+    return ret, failed
+
+
 def start_service(service):
     return _run_systemctl("start", service)
 
@@ -637,12 +759,46 @@ def enable_service(service, root=None):
     if root is None:
         root = conf.target.system_root
 
+    if native.enable_unit(service, root=root):
+        return
+
     ret = _run_systemctl("enable", service, root=root)
 
     if ret != 0:
         raise ValueError("Error enabling service %s: %s" % (service, ret))
 
 
+def enable_services(services, root=None):
+    """ Enable systemd services in the sysroot.
+
+    The services that can't be enabled in the process are enabled by
+    a single call of systemctl. If the call fails, the failed services
+    are enabled one by one to report the errors.
+
+    :param services: a list of names of the services to enable
+    :param str root: path to the sysroot or None to use default sysroot path
+    """
+    if root is None:
+        root = conf.target.system_root
+
+    remaining = [service for service in services if not native.enable_unit(service, root=root)]
+
+    if not remaining:
+        return
+
+    ret, failed = _run_systemctl_batch("enable", remaining, root=root)
+
+    # Nothing was enabled by the failed call. Try again without the failed services.
+    if ret != 0:
+        others = [service for service in remaining if service not in failed]
+
+        if others and _run_systemctl_batch("enable", others, root=root)[0] != 0:
+            failed = remaining
+
+    for service in failed:
+        enable_service(service, root=root)
+
+
 def disable_service(service, root=None):
     """ Disable a systemd service in the sysroot.
 
@@ -652,6 +808,9 @@ def disable_service(service, root=None):
     if root is None:
         root = conf.target.system_root
 
+    if native.disable_unit(service, root=root):
+        return
+
     # we ignore the error so we can disable services even if they don't
     # exist, because that's effectively disabled
     ret = _run_systemctl("disable", service, root=root)
@@ -660,6 +819,87 @@ def disable_service(service, root=None):
         log.warning("Disabling %s failed. It probably doesn't exist", service)
 
 
+def restorecon(paths, recursive=True):
+    """Restore the default SELinux contexts of the given paths.
+
+    The contexts are restored in the process if possible. Otherwise,
+    the restorecon tool is used.
+
+    :param paths: a list of paths
+    :param bool recursive: should the directories be relabeled recursively?
+    """
+    paths = list(paths)
+
+    if not paths:
+        return
+
+    try:
+        if native.relabel(paths, recursive=recursive):
+            return
+    except OSError as e:
+        log.debug("Failed to relabel %s in the process: %s", paths, e)
+
+    args = ["-r"] if recursive else []
+    execWithRedirect("restorecon", args + paths)
+
+
+def copy_tree(source, target):
+    """Copy a file or a directory tree like cp -r -p does it.
+
+    The tree is copied in the process if possible. Otherwise, the cp
+    tool is used.
+
+    :param str source: a path to the source
+    :param str target: a path to the target
+    :return: the return code of cp or 0
+    """
+    destination = target
+
+    if os.path.isdir(target):
+        destination = os.path.join(target, os.path.basename(source.rstrip("/")))
+
+    existed = os.path.lexists(destination)
+
+    try:
+        native.copy_tree(source, target)
+        return 0
+    except OSError as e:
+        log.debug("Failed to copy %s to %s in the process: %s", source, target, e)
+
+    # Remove the partial copy, so cp doesn't copy the source into it.
+    if not existed and os.path.lexists(destination):
+        if os.path.isdir(destination) and not os.path.islink(destination):
+            shutil.rmtree(destination, ignore_errors=True)
+        else:
+            os.unlink(destination)
+
+    return execWithRedirect("cp", ["-r", "-p", source, target])
+
+
+def disable_services(services, root=None):
+    """ Disable systemd services in the sysroot.
+
+    The services that can't be disabled in the process are disabled by
+    a single call of systemctl. If the call fails, the failed services
+    are disabled one by one to report the errors.
+
+    :param services: a list of names of the services to disable
+    :param str root: path to the sysroot or None to use default sysroot path
+    """
+    if root is None:
+        root = conf.target.system_root
+
+    remaining = [service for service in services if not native.disable_unit(service, root=root)]
+
+    if not remaining:
+        return
+
+    _ret, failed = _run_systemctl_batch("disable", remaining, root=root)
+
+    for service in failed:
+        disable_service(service, root=root)
+
+
 def dracut_eject(device):
     """
     Use dracut shutdown hook to eject media after the system is shutdown.
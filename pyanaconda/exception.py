@@ -33,6 +33,7 @@ from meh import Config
 from meh.dump import ReverseExceptionDump
 from meh.handler import ExceptionHandler
 
+from pyanaconda import anaconda_logging
 from pyanaconda import kickstart
 from pyanaconda.core import util
 from pyanaconda import product
@@ -50,6 +51,9 @@ from simpleline.event_loop.signals import ExceptionSignal
 from pyanaconda.anaconda_loggers import get_module_logger
 log = get_module_logger(__name__)
 
+# how many seconds to wait for the queued logs before the exception is dumped
+EXCEPTION_LOG_FLUSH_TIMEOUT = 10
+
 
 class AnacondaReverseExceptionDump(ReverseExceptionDump):
 
@@ -133,6 +137,9 @@ class AnacondaExceptionHandler(ExceptionHandler):
         exception_lines = traceback.format_exception(*dump_info.exc_info)
         log.critical("\n".join(exception_lines))
 
+        # Make sure the logs are complete before they are dumped.
+        anaconda_logging.flush(EXCEPTION_LOG_FLUSH_TIMEOUT)
+
         ty = dump_info.exc_info.type
         value = dump_info.exc_info.value
 
@@ -24,6 +24,7 @@ import shutil
 import langtable
 import locale as locale_mod
 import glob
+import threading
 from collections import namedtuple
 
 from pyanaconda.core import constants, util
@@ -51,6 +52,123 @@ class InvalidLocaleSpec(LocalizationConfigError):
 
     pass
 
+# statistics of the localization cache
+LocalizationCacheStatistics = namedtuple("LocalizationCacheStatistics",
+                                         ["hits", "misses", "size"])
+
+class LocalizationCache(object):
+    """
+    Thread-safe cache of parsed langcodes and langtable lookups.
+
+    The language spokes call the localization helpers for every available
+    locale on every refresh, but the results never change. The cached values
+    are shared, so they shouldn't be modified by the callers.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._values = dict()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def statistics(self):
+        """Statistics of the cache.
+
+        :return: an instance of LocalizationCacheStatistics
+        """
+        with self._lock:
+            return LocalizationCacheStatistics(self._hits, self._misses, len(self._values))
+
+    def get(self, kind, key, compute):
+        """
+        Get a cached value or compute and cache a new one.
+
+        Exceptions raised by the compute function are propagated and
+        nothing is cached.
+
+        :param kind: a kind of the value (e.g. 'english_name')
+        :type kind: str
+        :param key: a hashable key of the value (e.g. a locale)
+        :param compute: a function with no arguments returning the value
+        :return: the cached value
+
+        """
+
+        with self._lock:
+            try:
+                value = self._values[(kind, key)]
+            except KeyError:
+                self._misses += 1
+            else:
+                self._hits += 1
+                return value
+
+        value = compute()
+
+        with self._lock:
+            return self._values.setdefault((kind, key), value)
+
+    def clear(self):
+        """Drop all cached values and reset the statistics."""
+
+        with self._lock:
+            self._values.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def warm_up(self, locales=None):
+        """
+        Precompute the values for the given locales.
+
+        :param locales: a list of locales or None for all locales known to langtable
+        :type locales: list(str) or None
+
+        """
+
+        if locales is None:
+            locales = langtable.list_all_locales()
+
+        langs = set()
+
+        for locale in locales:
+            parts = _get_langcode_parts(locale)
+            if not parts:
+                log.debug("Skipping invalid locale %s in cache warm-up.", locale)
+                continue
+
+            get_english_name(locale)
+            get_native_name(locale)
+
+            lang = parts["language"]
+            if lang not in langs:
+                langs.add(lang)
+                get_english_name(lang)
+                get_native_name(lang)
+                get_language_locales(lang)
+
+        log.debug("Localization cache warmed up: %s", self.statistics)
+
+localization_cache = LocalizationCache()
+
+def _match_langcode(langcode):
+    """Parse the langcode with LANGCODE_RE (see parse_langcode)."""
+
+    if not langcode:
+        return None
+
+    match = LANGCODE_RE.match(langcode)
+    if match:
+        return match.groupdict()
+    else:
+        return None
+
+def _get_langcode_parts(langcode):
+    """Return cached and shared result of parse_langcode."""
+
+    return localization_cache.get("langcode", langcode, lambda: _match_langcode(langcode))
+
 def parse_langcode(langcode):
     """
     For a given langcode (e.g. 'SR_RS.UTF-8@latin') returns a dictionary
@@ -65,15 +183,13 @@ def parse_langcode(langcode):
 
     """
 
-    if not langcode:
-        return None
+    parts = _get_langcode_parts(langcode)
 
-    match = LANGCODE_RE.match(langcode)
-    if match:
-        return match.groupdict()
-    else:
+    if parts is None:
         return None
 
+    return dict(parts)
+
 def is_supported_locale(locale):
     """
     Function that tells if the given locale is supported by the Anaconda or
@@ -123,8 +239,8 @@ def langcode_matches_locale(langcode, locale):
 
     """
 
-    langcode_parts = parse_langcode(langcode)
-    locale_parts = parse_langcode(locale)
+    langcode_parts = _get_langcode_parts(langcode)
+    locale_parts = _get_langcode_parts(locale)
 
     if not langcode_parts or not locale_parts:
         # to match, both need to be valid langcodes (need to have at least
@@ -160,11 +276,13 @@ def find_best_locale_match(locale, langcodes):
                  "script"   :   10,
                  "encoding" :    1}
 
-    def get_match_score(locale, langcode):
+    # the locale is the same for all langcodes, parse it only once
+    locale_parts = _get_langcode_parts(locale)
+
+    def get_match_score(locale_parts, langcode):
         score = 0
 
-        locale_parts = parse_langcode(locale)
-        langcode_parts = parse_langcode(langcode)
+        langcode_parts = _get_langcode_parts(langcode)
         if not locale_parts or not langcode_parts:
             return score
 
@@ -186,7 +304,7 @@ def find_best_locale_match(locale, langcodes):
 
     # get score for each langcode
     for langcode in langcodes:
-        scores.append((langcode, get_match_score(locale, langcode)))
+        scores.append((langcode, get_match_score(locale_parts, langcode)))
 
     # find the best one
     sorted_langcodes = sorted(scores, key=lambda item_score: item_score[1], reverse=True)
@@ -301,16 +419,19 @@ def get_english_name(locale):
 
     """
 
-    parts = parse_langcode(locale)
+    parts = _get_langcode_parts(locale)
     if "language" not in parts:
         raise InvalidLocaleSpec("'%s' is not a valid locale" % locale)
 
-    name = langtable.language_name(languageId=parts["language"],
-                                   territoryId=parts.get("territory", ""),
-                                   scriptId=parts.get("script", ""),
-                                   languageIdQuery="en")
+    def _get_name():
+        name = langtable.language_name(languageId=parts["language"],
+                                       territoryId=parts.get("territory", ""),
+                                       scriptId=parts.get("script", ""),
+                                       languageIdQuery="en")
+
+        return upcase_first_letter(name)
 
-    return upcase_first_letter(name)
+    return localization_cache.get("english_name", locale, _get_name)
 
 def get_native_name(locale):
     """
@@ -324,18 +445,21 @@ def get_native_name(locale):
 
     """
 
-    parts = parse_langcode(locale)
+    parts = _get_langcode_parts(locale)
     if "language" not in parts:
         raise InvalidLocaleSpec("'%s' is not a valid locale" % locale)
 
-    name = langtable.language_name(languageId=parts["language"],
-                                   territoryId=parts.get("territory", ""),
-                                   scriptId=parts.get("script", ""),
-                                   languageIdQuery=parts["language"],
-                                   territoryIdQuery=parts.get("territory", ""),
-                                   scriptIdQuery=parts.get("script", ""))
+    def _get_name():
+        name = langtable.language_name(languageId=parts["language"],
+                                       territoryId=parts.get("territory", ""),
+                                       scriptId=parts.get("script", ""),
+                                       languageIdQuery=parts["language"],
+                                       territoryIdQuery=parts.get("territory", ""),
+                                       scriptIdQuery=parts.get("script", ""))
+
+        return upcase_first_letter(name)
 
-    return upcase_first_letter(name)
+    return localization_cache.get("native_name", locale, _get_name)
 
 def get_available_translations(localedir=None):
     """
@@ -381,13 +505,18 @@ def get_language_locales(lang):
 
     """
 
-    parts = parse_langcode(lang)
+    parts = _get_langcode_parts(lang)
     if "language" not in parts:
         raise InvalidLocaleSpec("'%s' is not a valid language" % lang)
 
-    return langtable.list_locales(languageId=parts["language"],
-                                  territoryId=parts.get("territory", ""),
-                                  scriptId=parts.get("script", ""))
+    locales = localization_cache.get(
+        "language_locales", lang,
+        lambda: langtable.list_locales(languageId=parts["language"],
+                                       territoryId=parts.get("territory", ""),
+                                       scriptId=parts.get("script", ""))
+    )
+
+    return list(locales)
 
 def get_territory_locales(territory):
     """
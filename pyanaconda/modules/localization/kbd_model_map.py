@@ -0,0 +1,278 @@
+#
+# In-process conversion between VConsole keymaps and X11 layouts
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import os
+import threading
+from collections import namedtuple
+
+from pyanaconda.keyboard import join_layout_variant, parse_layout_variant
+
+from pyanaconda.anaconda_loggers import get_module_logger
+log = get_module_logger(__name__)
+
+__all__ = ["KBD_MODEL_MAP", "KBD_KEYMAP_DIRS", "KeyboardMapping", "KeyboardConverter",
+           "read_kbd_model_map", "keyboard_converter"]
+
+# The mapping table used by systemd-localed.
+KBD_MODEL_MAP = "/usr/share/systemd/kbd-model-map"
+
+# The directories with keymaps. The keymaps converted from
+# X11 layouts are stored in the xkb subdirectory.
+KBD_KEYMAP_DIRS = ("/usr/share/keymaps/", "/usr/share/kbd/keymaps/", "/usr/lib/kbd/keymaps/")
+
+KeyboardMapping = namedtuple("KeyboardMapping", ["keymap", "layout", "model", "variant",
+                                                 "options"])
+
+
+def read_kbd_model_map(path):
+    """Read the mapping table of systemd-localed.
+
+    Every line of the table has five columns: a VConsole keymap,
+    X11 layouts, a X11 model, X11 variants and X11 options. Empty
+    values are represented by a dash.
+
+    :param str path: a path to the kbd-model-map file
+    :return: a list of keyboard mappings in the order of the file
+    """
+    mappings = []
+
+    with open(path, "r") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+
+            if not line or line.startswith(("#", ";")):
+                continue
+
+            fields = line.split()
+
+            if len(fields) != 5:
+                log.warning("Invalid line %d in %s: %s", number, path, line)
+                continue
+
+            mappings.append(KeyboardMapping(*(f if f != "-" else "" for f in fields)))
+
+    return mappings
+
+
+def _startswith_comma(layouts, prefix):
+    """Do the comma separated layouts start with the given prefix?"""
+    return layouts == prefix or layouts.startswith(prefix + ",")
+
+
+def _join_layouts(layouts_variants):
+    """Return X11 layouts and variants as strings used by localed."""
+    layouts = []
+    variants = []
+
+    for layout_variant in (nonempty for nonempty in layouts_variants if nonempty):
+        (layout, variant) = parse_layout_variant(layout_variant)
+        layouts.append(layout)
+        variants.append(variant)
+
+    return ",".join(layouts), ",".join(variants)
+
+
+def _split_layouts(layouts, variants):
+    """Return a list of 'layout (variant)' or 'layout' specifications."""
+    layouts = layouts.split(",") if layouts else []
+    variants = variants.split(",") if variants else []
+
+    # if there are more layouts than variants, empty strings should be appended
+    diff = len(layouts) - len(variants)
+    variants.extend(diff * [""])
+
+    return [join_layout_variant(layout, variant) for layout, variant in zip(layouts, variants)]
+
+
+class KeyboardConverter(object):
+    """Convert VConsole keymaps and X11 layouts without systemd-localed.
+
+    The converter follows the rules of systemd-localed. The mapping
+    table and the list of converted keymaps are loaded only once on
+    the first use, so the conversions are answered from memory.
+
+    The conversion methods return None if there is no answer, so the
+    caller can fall back to systemd-localed.
+    """
+
+    def __init__(self, map_path=KBD_MODEL_MAP, keymap_dirs=KBD_KEYMAP_DIRS):
+        """Create a new converter.
+
+        :param str map_path: a path to the kbd-model-map file
+        :param keymap_dirs: a list of directories with keymaps
+        """
+        self._map_path = map_path
+        self._keymap_dirs = keymap_dirs
+        self._lock = threading.Lock()
+        self._mappings = None
+        self._keymaps = None
+        self._converted_keymaps = None
+        self._layouts_cache = {}
+
+    def reload(self):
+        """Drop the loaded tables, so they are loaded again on the next use."""
+        with self._lock:
+            self._mappings = None
+            self._keymaps = None
+            self._converted_keymaps = None
+            self._layouts_cache = {}
+
+    def _load(self):
+        """Load the tables if they are not loaded yet."""
+        with self._lock:
+            if self._mappings is not None:
+                return
+
+            try:
+                mappings = read_kbd_model_map(self._map_path)
+            except OSError as e:
+                log.debug("Can't read keyboard mapping table: %s", e)
+                mappings = []
+
+            keymaps = {}
+
+            for mapping in mappings:
+                keymaps.setdefault(mapping.keymap, mapping)
+
+            converted_keymaps = set()
+
+            for keymap_dir in self._keymap_dirs:
+                try:
+                    names = os.listdir(os.path.join(keymap_dir, "xkb"))
+                except OSError:
+                    continue
+
+                for name in names:
+                    for suffix in (".map", ".map.gz"):
+                        if name.endswith(suffix):
+                            converted_keymaps.add(name[:-len(suffix)])
+
+            log.debug("Loaded %d keyboard mappings and %d converted keymaps.",
+                      len(mappings), len(converted_keymaps))
+
+            self._keymaps = keymaps
+            self._converted_keymaps = converted_keymaps
+            self._mappings = mappings
+
+    def convert_keymap(self, keymap):
+        """Get X11 layouts and variants by converting VConsole keymap.
+
+        :param str keymap: VConsole keymap
+        :return: a list of "layout (variant)" or "layout" layout specifications
+                 or None if the keymap can't be converted
+        """
+        if not keymap:
+            return []
+
+        self._load()
+        mapping = self._keymaps.get(keymap)
+
+        if not mapping:
+            return None
+
+        return _split_layouts(mapping.layout, mapping.variant)
+
+    def convert_layouts(self, layouts_variants, options=None):
+        """Get VConsole keymap by converting X11 layouts and variants.
+
+        :param layouts_variants: list of 'layout (variant)' or 'layout'
+                                 specifications of layouts and variants
+        :param options: list of X11 options
+        :return: a VConsole keymap or None if the layouts can't be converted
+        """
+        layout, variant = _join_layouts(layouts_variants)
+        options = ",".join(options) if options else ""
+
+        if not layout:
+            return ""
+
+        self._load()
+        key = (layout, variant, options)
+
+        with self._lock:
+            if key in self._layouts_cache:
+                return self._layouts_cache[key]
+
+        keymap = self._find_converted_keymap(layout, variant) \
+            or self._find_legacy_keymap(layout, variant, options)
+
+        with self._lock:
+            self._layouts_cache[key] = keymap
+
+        return keymap
+
+    def _find_converted_keymap(self, layout, variant):
+        """Find a keymap converted from the given X11 layout."""
+        name = "{}-{}".format(layout, variant) if variant else layout
+
+        if name in self._converted_keymaps:
+            return name
+
+        return None
+
+    def _find_legacy_keymap(self, layout, variant, options):
+        """Find the best matching keymap in the mapping table.
+
+        The mappings are scored the same way systemd-localed does it.
+        """
+        first_layout = layout.split(",")[0]
+        best_keymap = None
+        best_matching = 0
+
+        for mapping in self._mappings:
+            if layout == mapping.layout:
+                # If we got an exact match, this is the best.
+                matching = 10
+            elif layout == ",".join(reversed(mapping.layout.split(","))):
+                # We got an exact match with the order reversed.
+                matching = 9
+            elif _startswith_comma(layout, mapping.layout):
+                # The layouts start with the whole entry.
+                matching = 5
+            elif _startswith_comma(layout, mapping.layout.split(",")[0]):
+                # The layouts start with the first layout of the entry.
+                matching = 1
+            else:
+                continue
+
+            # The model is never set, so it always matches.
+            matching += 1
+
+            if variant == mapping.variant or (not variant.strip(",") and not mapping.variant):
+                matching += 1
+
+                if options and options == mapping.options:
+                    matching += 1
+
+            if matching > best_matching:
+                best_matching = matching
+                best_keymap = mapping.keymap
+
+        if best_matching < 10:
+            # The best match is only the first part of the X11 layouts.
+            # Check if we have a converted keymap of the first layout.
+            converted = self._find_converted_keymap(first_layout, variant.split(",")[0])
+
+            if converted:
+                return converted
+
+        return best_keymap
+
+
+keyboard_converter = KeyboardConverter()
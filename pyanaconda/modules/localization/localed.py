@@ -20,6 +20,7 @@ from pyanaconda.modules.common.constants.services import LOCALED
 from pyanaconda.core.configuration.anaconda import conf
 from pyanaconda.keyboard import join_layout_variant, parse_layout_variant
 from pyanaconda.core.constants import DEFAULT_KEYBOARD
+from pyanaconda.modules.localization.kbd_model_map import keyboard_converter
 
 from pyanaconda.anaconda_loggers import get_module_logger
 log = get_module_logger(__name__)
@@ -32,8 +33,9 @@ LOCALED_IFACE = "org.freedesktop.locale1"
 class LocaledWrapper(object):
     """Class wrapping systemd-localed daemon functionality."""
 
-    def __init__(self):
+    def __init__(self, converter=keyboard_converter):
         self._localed_proxy = None
+        self._converter = converter
 
         if not conf.system.provides_system_bus:
             log.debug("Not using localed service: "
@@ -111,9 +113,10 @@ class LocaledWrapper(object):
     def convert_keymap(self, keymap):
         """Get X11 layouts and variants by converting VConsole keymap.
 
-        NOTE: Systemd-localed performs the conversion. Current VConsole keymap
-        and X11 layouts are set temporarily to the converted values in the
-        process of conversion.
+        NOTE: The conversion is done in process with the mapping table of
+        systemd-localed. If the table has no answer, systemd-localed performs
+        the conversion. Current VConsole keymap and X11 layouts are set
+        temporarily to the converted values in the process of conversion.
 
         :param keymap: VConsole keymap
         :type keymap: str
@@ -121,6 +124,11 @@ class LocaledWrapper(object):
                  obtained by conversion of VConsole keymap
         :rtype: list(str)
         """
+        converted_layouts = self._converter.convert_keymap(keymap)
+
+        if converted_layouts is not None:
+            return converted_layouts
+
         if not self._localed_proxy:
             return []
 
@@ -200,9 +208,10 @@ class LocaledWrapper(object):
     def convert_layouts(self, layouts_variants):
         """Get VConsole keymap by converting X11 layouts and variants.
 
-        NOTE: Systemd-localed performs the conversion. Current VConsole keymap
-        and X11 layouts are set temporarily to the converted values in the
-        process of conversion.
+        NOTE: The conversion is done in process with the mapping table of
+        systemd-localed. If the table has no answer, systemd-localed performs
+        the conversion. Current VConsole keymap and X11 layouts are set
+        temporarily to the converted values in the process of conversion.
 
         :param layouts_variants: list of 'layout (variant)' or 'layout'
                                  specifications of layouts and variants
@@ -210,6 +219,11 @@ class LocaledWrapper(object):
         :return: a VConsole keymap obtained by conversion from X11 layouts
         :rtype: str
         """
+        converted_keymap = self._converter.convert_layouts(layouts_variants)
+
+        if converted_keymap is not None:
+            return converted_keymap
+
         if not self._localed_proxy:
             return ""
 
@@ -19,6 +19,8 @@
 #
 
 import os
+import threading
+from collections import namedtuple
 
 # TODO move to anaconda.core
 from pyanaconda.simpleconfig import SimpleConfigFile
@@ -36,6 +38,9 @@ log = get_module_logger(__name__)
 
 IFCFG_DIR = "/etc/sysconfig/network-scripts"
 
+# Settings indexed by the ifcfg index.
+IFCFG_INDEXED_KEYS = ("DEVICE", "HWADDR", "UUID")
+
 
 class IfcfgFile(SimpleConfigFile):
     """Stores settings of ifcfg configuration file."""
@@ -70,6 +75,19 @@ class IfcfgFile(SimpleConfigFile):
         self._loaded = True
         self._dirty = False
 
+    def copy(self):
+        """Create a copy of the ifcfg file object.
+
+        :returns: a new ifcfg file object
+        :rtype: IfcfgFile
+        """
+        ifcfg = IfcfgFile(self.path)
+        ifcfg._lines = list(self._lines)
+        ifcfg.info = dict(self.info)
+        ifcfg._loaded = self._loaded
+        ifcfg._dirty = self._dirty
+        return ifcfg
+
     def write(self, filename=None, use_tmp=False):
         """Write the settings into the ifcfg file."""
         if self._dirty or filename:
@@ -77,6 +95,7 @@ class IfcfgFile(SimpleConfigFile):
             # temporary file for new configuration
             super().write(filename, use_tmp=use_tmp)
             self._dirty = False
+            ifcfg_index.invalidate(filename or self.path)
 
     def set(self, *args):
         """Set values of given settings of the ifcfg file.
@@ -123,6 +142,157 @@ def get_ifcfg_files_paths(directory):
     return rv
 
 
+_IfcfgEntry = namedtuple("_IfcfgEntry", ["stamp", "ifcfg"])
+
+
+def _get_file_stamp(path):
+    """Get a stamp identifying the version of the file."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class IfcfgIndex(object):
+    """In-memory index of parsed ifcfg files.
+
+    The ifcfg files are parsed only once and kept in memory until
+    their modification time, size or inode change. The files are
+    also invalidated when they are written by IfcfgFile. Files of
+    every directory are indexed by IFCFG_INDEXED_KEYS.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._directories = {}
+        self._indexes = {}
+
+    def invalidate(self, path=None):
+        """Invalidate the given ifcfg file or the whole index.
+
+        :param path: a path to the ifcfg file or None
+        :type path: str
+        """
+        with self._lock:
+            if not path:
+                self._entries.clear()
+                self._directories.clear()
+                self._indexes.clear()
+                return
+
+            path = os.path.normpath(path)
+            self._entries.pop(path, None)
+            self._directories.pop(os.path.dirname(path), None)
+            self._indexes.pop(os.path.dirname(path), None)
+
+    def get_files(self, root_path=""):
+        """Get ifcfg files of the given root path.
+
+        The returned objects are not shared, so they can be modified.
+
+        :param root_path: search in the filesystem specified by root path
+        :type root_path: str
+        :returns: a list of ifcfg files in the order of the directory
+        :rtype: list(IfcfgFile)
+        """
+        with self._lock:
+            directory = os.path.normpath(root_path + IFCFG_DIR)
+            paths = self._update_directory(directory)
+            return [self._create_file(path) for path in paths]
+
+    def find_files(self, key, value, root_path=""):
+        """Find ifcfg files with the given value of an indexed setting.
+
+        :param key: one of IFCFG_INDEXED_KEYS
+        :type key: str
+        :param value: a value of the setting
+        :type value: str
+        :param root_path: search in the filesystem specified by root path
+        :type root_path: str
+        :returns: a list of ifcfg files in the order of the directory
+        :rtype: list(IfcfgFile)
+        """
+        if key not in IFCFG_INDEXED_KEYS:
+            raise ValueError("The setting {} is not indexed.".format(key))
+
+        with self._lock:
+            directory = os.path.normpath(root_path + IFCFG_DIR)
+            self._update_directory(directory)
+            index = self._indexes[directory][key]
+            paths = index.get(self._get_index_value(key, value), [])
+            return [self._create_file(path) for path in paths]
+
+    def _get_index_value(self, key, value):
+        """Get a normalized value of the indexed setting."""
+        if key == "HWADDR":
+            return value.upper()
+
+        return value
+
+    def _create_file(self, path):
+        """Create a new ifcfg file object from the cached entry."""
+        return self._entries[path].ifcfg.copy()
+
+    def _update_directory(self, directory):
+        """Update the cached entries of the directory.
+
+        :returns: paths of the ifcfg files in the directory
+        """
+        stamp = _get_file_stamp(directory)
+        cached = self._directories.get(directory)
+
+        if cached and cached[0] == stamp:
+            paths = cached[1]
+        else:
+            paths = get_ifcfg_files_paths(directory)
+
+        changed = not cached or cached[1] != paths
+
+        for path in paths:
+            changed |= self._update_entry(path)
+
+        self._directories[directory] = (stamp, paths)
+
+        if changed or directory not in self._indexes:
+            self._indexes[directory] = self._create_indexes(paths)
+
+        return paths
+
+    def _update_entry(self, path):
+        """Update the cached entry of the ifcfg file.
+
+        :returns: True if the entry has changed, otherwise False
+        """
+        stamp = _get_file_stamp(path)
+        entry = self._entries.get(path)
+
+        if entry and entry.stamp == stamp:
+            return False
+
+        ifcfg = IfcfgFile(path)
+        ifcfg.read()
+        self._entries[path] = _IfcfgEntry(stamp, ifcfg)
+        return True
+
+    def _create_indexes(self, paths):
+        """Create indexes of the ifcfg files."""
+        indexes = {key: {} for key in IFCFG_INDEXED_KEYS}
+
+        for path in paths:
+            info = self._entries[path].ifcfg.info
+
+            for key in IFCFG_INDEXED_KEYS:
+                value = info.get(key)
+
+                if value:
+                    value = self._get_index_value(key, value)
+                    indexes[key].setdefault(value, []).append(path)
+
+        return indexes
+
+
+ifcfg_index = IfcfgIndex()
+
+
 def get_ifcfg_file(values, root_path=""):
     """Get ifcfg file specified by values.
 
@@ -132,9 +302,14 @@ def get_ifcfg_file(values, root_path=""):
     :param root_path: search in the filesystem specified by root path
     :type root_path: str
     """
-    for file_path in get_ifcfg_files_paths(os.path.normpath(root_path + IFCFG_DIR)):
-        ifcfg = IfcfgFile(file_path)
-        ifcfg.read()
+    indexed = [(key, value) for key, value in values if key in IFCFG_INDEXED_KEYS and value]
+
+    if indexed:
+        ifcfgs = ifcfg_index.find_files(*indexed[0], root_path=root_path)
+    else:
+        ifcfgs = ifcfg_index.get_files(root_path)
+
+    for ifcfg in ifcfgs:
         for key, value in values:
             if ifcfg.get(key) != value:
                 break
@@ -180,9 +355,8 @@ def get_ifcfg_file_of_device(nm_client, device_name, device_hwaddr=None, root_pa
     """
     # hwaddr is supplementary (--bindto=mac)
     ifcfgs = []
-    for file_path in get_ifcfg_files_paths(os.path.normpath(root_path + IFCFG_DIR)):
-        ifcfg = IfcfgFile(file_path)
-        ifcfg.read()
+    ifaces = {}
+    for ifcfg in ifcfg_index.get_files(root_path):
         device_type = ifcfg.get("TYPE") or ifcfg.get("DEVICETYPE")
         if device_type == "Wireless":
             # TODO check ESSID against active ssid of the device
@@ -218,8 +392,9 @@ def get_ifcfg_file_of_device(nm_client, device_name, device_hwaddr=None, root_pa
                     if device_hwaddr.upper() == hwaddr.upper():
                         ifcfgs.append(ifcfg)
                 else:
-                    iface = get_iface_from_hwaddr(nm_client, hwaddr)
-                    if iface == device_name:
+                    if hwaddr not in ifaces:
+                        ifaces[hwaddr] = get_iface_from_hwaddr(nm_client, hwaddr)
+                    if ifaces[hwaddr] == device_name:
                         ifcfgs.append(ifcfg)
             elif is_s390():
                 # s390 setting generated in dracut with net.ifnames=0
@@ -253,9 +428,7 @@ def get_slaves_from_ifcfgs(nm_client, master_option, master_specs, root_path="")
     """
     slaves = set()
 
-    for file_path in get_ifcfg_files_paths(os.path.normpath(root_path + IFCFG_DIR)):
-        ifcfg = IfcfgFile(file_path)
-        ifcfg.read()
+    for ifcfg in ifcfg_index.get_files(root_path):
         master = ifcfg.get(master_option)
         if master in master_specs:
             iface = ifcfg.get("DEVICE")
@@ -455,9 +628,7 @@ def get_master_slaves_from_ifcfgs(nm_client, master_devname, root_path="", uuid=
     # Master can be identified by devname or uuid, try to find master uuid
     if not uuid:
         uuid = find_ifcfg_uuid_of_device(nm_client, master_devname, root_path=root_path)
-    for ifcfg_path in get_ifcfg_files_paths(os.path.normpath(root_path + IFCFG_DIR)):
-        ifcfg = IfcfgFile(ifcfg_path)
-        ifcfg.read()
+    for ifcfg in ifcfg_index.get_files(root_path):
         master = ifcfg.get("MASTER") or ifcfg.get("TEAM_MASTER") or ifcfg.get("BRIDGE")
         if master and master in (master_devname, uuid):
             slaves.append((ifcfg.get("NAME"), ifcfg.get("UUID")))
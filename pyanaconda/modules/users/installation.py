@@ -83,28 +83,34 @@ class CreateUsersTask(Task):
         self._create_users()
 
     def _create_users(self):
-        for user_data in self._user_data_list:
-            # UserData uses -1 for not-set uid/gid while the function takes None for not-set
-            uid = None
-            if user_data.uid != USER_UID_NOT_SET:
-                uid = user_data.uid
-            gid = None
-            if user_data.gid != USER_GID_NOT_SET:
-                gid = user_data.gid
-
-            try:
-                users.create_user(username=user_data.name,
-                                  password=user_data.password,
-                                  is_crypted=user_data.is_crypted,
-                                  lock=user_data.lock,
-                                  homedir=user_data.homedir,
-                                  uid=uid, gid=gid,
-                                  groups=user_data.groups,
-                                  shell=user_data.shell,
-                                  gecos=user_data.gecos,
-                                  root=self._sysroot)
-            except ValueError as e:
-                log.warning(str(e))
+        if not self._user_data_list:
+            return
+
+        with users.AccountsTransaction(root=self._sysroot) as transaction:
+            for user_data in self._user_data_list:
+                self._create_user(transaction, user_data)
+
+    def _create_user(self, transaction, user_data):
+        # UserData uses -1 for not-set uid/gid while the function takes None for not-set
+        uid = None
+        if user_data.uid != USER_UID_NOT_SET:
+            uid = user_data.uid
+        gid = None
+        if user_data.gid != USER_GID_NOT_SET:
+            gid = user_data.gid
+
+        try:
+            transaction.create_user(username=user_data.name,
+                                    password=user_data.password,
+                                    is_crypted=user_data.is_crypted,
+                                    lock=user_data.lock,
+                                    homedir=user_data.homedir,
+                                    uid=uid, gid=gid,
+                                    groups=user_data.groups,
+                                    shell=user_data.shell,
+                                    gecos=user_data.gecos)
+        except ValueError as e:
+            log.warning(str(e))
 
 
 class CreateGroupsTask(Task):
@@ -129,15 +135,19 @@ class CreateGroupsTask(Task):
         self._create_groups()
 
     def _create_groups(self):
-        for group_data in self._group_data_list:
-            # GroupData uses -1 for not-set gid while the function takes None for not-set
-            gid = None
-            if group_data.gid >= 0:
-                gid = group_data.gid
-            try:
-                users.create_group(group_name=group_data.name, gid=gid, root=self._sysroot)
-            except ValueError as e:
-                log.warning(str(e))
+        if not self._group_data_list:
+            return
+
+        with users.AccountsTransaction(root=self._sysroot) as transaction:
+            for group_data in self._group_data_list:
+                # GroupData uses -1 for not-set gid while the function takes None for not-set
+                gid = None
+                if group_data.gid >= 0:
+                    gid = group_data.gid
+                try:
+                    transaction.create_group(group_name=group_data.name, gid=gid)
+                except ValueError as e:
+                    log.warning(str(e))
 
 
 class SetSshKeysTask(Task):
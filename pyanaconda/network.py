@@ -348,6 +348,74 @@ def _set_ntp_servers_from_dhcp():
         timezone_proxy.SetNTPServers(hostnames)
 
 
+class NetworkStateWaiter(object):
+    """Wait for a condition on the state of the network module.
+
+    The condition is checked every time the network module emits one
+    of the given signals, so the waiter wakes up as soon as the state
+    changes. The condition is also re-checked at the given interval in
+    case the signals can't be delivered, for example if the event loop
+    that dispatches them runs in the waiting thread.
+    """
+
+    def __init__(self, proxy, signals, condition,
+                 recheck_interval=constants.NETWORK_CONNECTED_CHECK_INTERVAL):
+        """Create a new waiter.
+
+        :param proxy: a DBus proxy of the network module
+        :param signals: names of the proxy signals that wake up the waiter
+        :type signals: list(str)
+        :param condition: a function that takes the proxy and returns True
+                          if the waiting is done
+        :param recheck_interval: an interval of the fallback checks in seconds
+        :type recheck_interval: float
+        """
+        self._proxy = proxy
+        self._signals = signals
+        self._condition = condition
+        self._recheck_interval = recheck_interval
+        self._event = threading.Event()
+        self.waited = 0
+
+    def _wake_up(self, *args, **kwargs):
+        """Wake up the waiter."""
+        self._event.set()
+
+    def wait(self, timeout):
+        """Wait until the condition is met or the timeout expires.
+
+        The actual waiting time is stored in the waited attribute.
+
+        :param timeout: timeout in seconds
+        :type timeout: float
+        :return: True if the condition is met, otherwise False
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+
+        for name in self._signals:
+            getattr(self._proxy, name).connect(self._wake_up)
+
+        try:
+            while True:
+                # Clear the event before the check to not miss any change.
+                self._event.clear()
+
+                if self._condition(self._proxy):
+                    return True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+
+                self._event.wait(min(remaining, self._recheck_interval))
+        finally:
+            for name in self._signals:
+                getattr(self._proxy, name).disconnect(self._wake_up)
+
+            self.waited = time.monotonic() - start
+
+
 def wait_for_connected_NM(timeout=constants.NETWORK_CONNECTION_TIMEOUT, only_connecting=False):
     """Wait for NM being connected.
 
@@ -375,34 +443,37 @@ def wait_for_connected_NM(timeout=constants.NETWORK_CONNECTION_TIMEOUT, only_con
     else:
         log.debug("waiting for connected NM, timeout=%d", timeout)
 
-    i = 0
-    while i < timeout:
-        i += constants.NETWORK_CONNECTED_CHECK_INTERVAL
-        time.sleep(constants.NETWORK_CONNECTED_CHECK_INTERVAL)
-        if network_proxy.Connected:
-            log.debug("NM connected, waited %d seconds", i)
-            return True
-        elif only_connecting:
-            if not network_proxy.IsConnecting():
-                break
-
-    log.debug("NM not connected, waited %d seconds", i)
+    def _is_done(proxy):
+        return proxy.Connected or (only_connecting and not proxy.IsConnecting())
+
+    waiter = NetworkStateWaiter(network_proxy, ["PropertiesChanged"], _is_done)
+    waiter.wait(timeout)
+
+    if network_proxy.Connected:
+        log.debug("NM connected, waited %.2f seconds", waiter.waited)
+        return True
+
+    log.debug("NM not connected, waited %.2f seconds", waiter.waited)
     return False
 
 
 def wait_for_network_devices(devices, timeout=constants.NETWORK_CONNECTION_TIMEOUT):
     """Wait for network devices to be activated with a connection."""
     devices = set(devices)
-    i = 0
     log.debug("waiting for connection of devices %s for iscsi", devices)
-    while i < timeout:
-        network_proxy = NETWORK.get_proxy()
-        activated_devices = network_proxy.GetActivatedInterfaces()
-        if not devices - set(activated_devices):
-            return True
-        i += 1
-        time.sleep(1)
-    return False
+
+    def _are_activated(proxy):
+        return not devices - set(proxy.GetActivatedInterfaces())
+
+    network_proxy = NETWORK.get_proxy()
+    waiter = NetworkStateWaiter(network_proxy,
+                                ["PropertiesChanged", "DeviceConfigurationChanged"],
+                                _are_activated)
+    activated = waiter.wait(timeout)
+
+    log.debug("devices %s %s activated, waited %.2f seconds", devices,
+              "are" if activated else "are not", waiter.waited)
+    return activated
 
 
 def wait_for_connecting_NM_thread():
@@ -23,15 +23,25 @@ Module facilitating the work with NTP servers and NTP daemon's configuration
 
 import re
 import os
+import random
+import selectors
+import struct
 import tempfile
+import threading
+import time
 import shutil
 import ntplib
 import socket
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 from pyanaconda import isys
 from pyanaconda.threading import threadMgr, AnacondaThread
 from pyanaconda.core.constants import THREAD_SYNC_TIME_BASENAME
 
+from pyanaconda.anaconda_loggers import get_module_logger
+log = get_module_logger(__name__)
+
 NTP_CONFIG_FILE = "/etc/chrony.conf"
 
 #example line:
@@ -41,10 +51,273 @@ SRV_LINE_REGEXP = re.compile(r"^\s*(server|pool)\s*([-a-zA-Z.0-9]+)\s*[a-zA-Z]+\
 #treat pools as four servers with the same name
 SERVERS_PER_POOL = 4
 
+NTP_PORT = 123
+
+#how long to wait for responses of the NTP servers (in seconds)
+NTP_PROBE_TIMEOUT = 5
+
+#how long to remember results of the NTP servers probes (in seconds)
+NTP_PROBE_CACHE_TTL = 30
+
+#the maximal number of NTP servers resolved at once
+NTP_RESOLVE_WORKERS = 8
+
+#seconds between the NTP epoch (1900) and the Unix epoch (1970)
+NTP_EPOCH_OFFSET = 2208988800
+
+#li_vn_mode, stratum, poll, precision, root delay, root dispersion,
+#reference id, reference, originate, receive and transmit timestamps
+NTP_PACKET = struct.Struct("!BBbbIIIQQQQ")
+
+#leap indicator 0, version 3, mode 3 (client)
+NTP_CLIENT_LI_VN_MODE = 0x1b
+NTP_MODE_SERVER = 4
+
+NTPProbeResult = namedtuple("NTPProbeResult", ["server", "working", "rtt", "offset", "stratum"])
+
 class NTPconfigError(Exception):
     """Exception class for NTP related problems"""
     pass
 
+def _from_ntp_time(timestamp):
+    """Convert a 64-bit NTP timestamp to the Unix time."""
+    return (timestamp >> 32) - NTP_EPOCH_OFFSET + (timestamp & 0xffffffff) / 2**32
+
+
+class NTPServerProber(object):
+    """Probe many NTP servers at once.
+
+    The queries are sent to all addresses of all servers and pools
+    from one non-blocking socket per address family. The responses
+    are matched to the queries by their originate timestamps and
+    collected until all servers respond or the shared deadline is
+    reached. The results are cached for a short time.
+    """
+
+    def __init__(self, port=NTP_PORT, cache_ttl=NTP_PROBE_CACHE_TTL):
+        """Create a new prober.
+
+        :param int port: a port of the NTP servers
+        :param cache_ttl: how long to cache the results in seconds
+        """
+        self._port = port
+        self._cache_ttl = cache_ttl
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def invalidate(self):
+        """Forget all cached results."""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def probe(self, servers, timeout=NTP_PROBE_TIMEOUT, use_cache=True):
+        """Probe the given NTP servers and pools.
+
+        :param servers: hostnames or IP addresses of NTP servers and pools
+        :type servers: iterable of str
+        :param timeout: the shared deadline for all servers in seconds
+        :param bool use_cache: use cached results if available
+        :return: a dictionary of servers and their probe results
+        :rtype: dict(str, NTPProbeResult)
+        """
+        results = {}
+        pending = []
+
+        with self._cache_lock:
+            now = time.monotonic()
+
+            for server in set(servers):
+                cached = self._cache.get(server)
+
+                if use_cache and cached and now - cached[0] < self._cache_ttl:
+                    results[server] = cached[1]
+                else:
+                    pending.append(server)
+
+        if pending:
+            probed = self._probe(pending, timeout)
+            results.update(probed)
+
+            with self._cache_lock:
+                now = time.monotonic()
+
+                for server, result in probed.items():
+                    self._cache[server] = (now, result)
+
+        return results
+
+    def _resolve(self, server):
+        """Get the addresses of the server."""
+        try:
+            infos = socket.getaddrinfo(server, self._port, type=socket.SOCK_DGRAM)
+        except (socket.gaierror, UnicodeError) as e:
+            log.debug("Failed to resolve NTP server %s: %s", server, e)
+            return []
+
+        return [(family, address) for family, _type, _proto, _name, address in infos]
+
+    def _query(self, server, family, address, selector, sockets, queries):
+        """Send a query to one address of the server.
+
+        :return: True if the query was sent, otherwise False
+        """
+        sock = sockets.get(family)
+
+        if not sock:
+            try:
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+            except OSError as e:
+                log.debug("Failed to create a socket for NTP: %s", e)
+                return False
+
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ)
+            sockets[family] = sock
+
+        nonce = random.getrandbits(64)
+        packet = NTP_PACKET.pack(NTP_CLIENT_LI_VN_MODE, 0, 0, 0,
+                                 0, 0, 0, 0, 0, 0, nonce)
+        try:
+            sock.sendto(packet, address)
+        except OSError as e:
+            # (including "Network is unreachable")
+            log.debug("Failed to query NTP server %s: %s", server, e)
+            return False
+
+        queries[nonce] = (server, time.time())
+        return True
+
+    def _probe(self, servers, timeout):
+        """Resolve the servers, send the queries and collect the responses.
+
+        The servers are resolved concurrently and the queries are sent
+        as soon as the addresses of a server are known, so a slow name
+        server doesn't delay the others. The resolution counts against
+        the same deadline as the responses.
+        """
+        deadline = time.monotonic() + timeout
+        results = {server: NTPProbeResult(server, False, None, None, None) for server in servers}
+        sockets = {}
+        queries = {}
+        unanswered = set()
+
+        # Wake up the selector when a server is resolved.
+        waker, notifier = socket.socketpair()
+        notifier.setblocking(False)
+
+        def notify(_future):
+            try:
+                notifier.send(b"\0")
+            except OSError:
+                pass
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(NTP_RESOLVE_WORKERS, len(servers)),
+            thread_name_prefix="AnaNTPResolveThread"
+        )
+
+        with selectors.DefaultSelector() as selector:
+            try:
+                selector.register(waker, selectors.EVENT_READ)
+                resolving = {executor.submit(self._resolve, server): server for server in servers}
+
+                for future in resolving:
+                    future.add_done_callback(notify)
+
+                while resolving or unanswered:
+                    for future in [f for f in resolving if f.done()]:
+                        server = resolving.pop(future)
+
+                        for family, address in future.result():
+                            if self._query(server, family, address, selector, sockets, queries):
+                                unanswered.add(server)
+
+                    if not resolving and not unanswered:
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+
+                    for key, _events in selector.select(remaining):
+                        if key.fileobj is waker:
+                            waker.recv(1024)
+                            continue
+
+                        result = self._receive(key.fileobj, queries)
+
+                        if result and result.server in unanswered:
+                            results[result.server] = result
+                            unanswered.discard(result.server)
+
+                for future, server in resolving.items():
+                    future.cancel()
+                    log.debug("Failed to resolve NTP server %s in time.", server)
+            finally:
+                executor.shutdown(wait=False)
+
+                for sock in sockets.values():
+                    sock.close()
+
+                waker.close()
+                notifier.close()
+
+        return results
+
+    def _receive(self, sock, queries):
+        """Receive and check one response.
+
+        :return: a probe result or None
+        """
+        try:
+            data, _address = sock.recvfrom(1024)
+        except OSError:
+            return None
+
+        received = time.time()
+
+        if len(data) < NTP_PACKET.size:
+            return None
+
+        (li_vn_mode, stratum, _poll, _precision, _delay, _dispersion, _ref_id,
+         _ref_ts, orig_ts, recv_ts, tx_ts) = NTP_PACKET.unpack_from(data)
+
+        query = queries.pop(orig_ts, None)
+        if not query or li_vn_mode & 0x7 != NTP_MODE_SERVER:
+            return None
+
+        server, sent = query
+
+        # stratum 0 is a "kiss-o'-death" message
+        if stratum == 0:
+            return NTPProbeResult(server, False, None, None, stratum)
+
+        t2 = _from_ntp_time(recv_ts)
+        t3 = _from_ntp_time(tx_ts)
+        rtt = (received - sent) - (t3 - t2)
+        offset = ((t2 - sent) + (t3 - received)) / 2
+
+        return NTPProbeResult(server, True, rtt, offset, stratum)
+
+
+ntp_prober = NTPServerProber()
+
+
+def probe_ntp_servers(servers, timeout=NTP_PROBE_TIMEOUT):
+    """
+    Probe the given NTP servers and pools at once.
+
+    :param servers: hostnames or IP addresses of NTP servers
+    :type servers: iterable of strings
+    :param timeout: the shared deadline in seconds
+    :return: a dictionary of servers and their probe results
+    :rtype: dict(str, NTPProbeResult)
+
+    """
+
+    return ntp_prober.probe(servers, timeout)
+
+
 def ntp_server_working(server):
     """
     Tries to do an NTP request to the $server (timeout may take some time).
@@ -56,21 +329,7 @@ def ntp_server_working(server):
 
     """
 
-    client = ntplib.NTPClient()
-
-    try:
-        client.request(server)
-    except ntplib.NTPException:
-        return False
-    # address related error
-    except socket.gaierror:
-        return False
-    # socket related error
-    # (including "Network is unreachable")
-    except socket.error:
-        return False
-
-    return True
+    return probe_ntp_servers([server])[server].working
 
 def pools_servers_to_internal(pools, servers):
     ret = []
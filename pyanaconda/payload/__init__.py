@@ -369,15 +369,12 @@ class Payload(metaclass=ABCMeta):
     ###
     # METHODS FOR TREE VERIFICATION
     ###
-    def _refresh_install_tree(self, url):
-        """Refresh installation tree metadata.
+    def _get_install_tree_request_args(self):
+        """Get the arguments of requests for the installation tree.
 
-        :param url: url of the repo
-        :type url: string
+        :return: a dictionary with the proxies, the ssl verification,
+                 the client certificate and the headers
         """
-        if not url:
-            return
-
         if hasattr(self.data.method, "proxy"):
             proxy_url = self.data.method.proxy
         else:
@@ -393,9 +390,6 @@ class Payload(metaclass=ABCMeta):
         ssl_client_key = getattr(self.data.method, "ssl_client_key", None)
         ssl_cert = (ssl_client_cert, ssl_client_key) if ssl_client_cert else None
 
-        log.debug("retrieving treeinfo from %s (proxy: %s ; ssl_verify: %s)",
-                  url, proxy_url, ssl_verify)
-
         proxies = {}
         if proxy_url:
             try:
@@ -407,9 +401,30 @@ class Payload(metaclass=ABCMeta):
                          proxy_url, e)
 
         headers = {"user-agent": USER_AGENT}
+        return {
+            "proxies": proxies,
+            "verify": ssl_verify,
+            "cert": ssl_cert,
+            "headers": headers
+        }
+
+    def _refresh_install_tree(self, url):
+        """Refresh installation tree metadata.
+
+        :param url: url of the repo
+        :type url: string
+        """
+        if not url:
+            return
+
+        args = self._get_install_tree_request_args()
+        log.debug("retrieving treeinfo from %s (proxy: %s ; ssl_verify: %s)",
+                  url, getattr(self.data.method, "proxy", None), args["verify"])
+
         self._install_tree_metadata = InstallTreeMetadata()
         try:
-            ret = self._install_tree_metadata.load_url(url, proxies, ssl_verify, ssl_cert, headers)
+            ret = self._install_tree_metadata.load_url(url, args["proxies"], args["verify"],
+                                                       args["cert"], args["headers"])
         except IOError as e:
             self._install_tree_metadata = None
             self.verbose_errors.append(str(e))
@@ -1173,6 +1188,13 @@ class PackagePayload(Payload, metaclass=ABCMeta):
     def group_description(self, grpid):
         raise NotImplementedError()
 
+    def load_descriptions(self):
+        """Cache the descriptions of environments and groups.
+
+        The descriptions are translated to the current language.
+        """
+        pass
+
     def group_id(self, group_name):
         """Return group id for translation of groups from a kickstart file."""
         raise NotImplementedError()
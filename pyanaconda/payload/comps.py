@@ -0,0 +1,210 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import locale
+from collections import OrderedDict
+
+from pyanaconda.anaconda_loggers import get_packaging_logger
+log = get_packaging_logger()
+
+__all__ = ["CompsIndex", "get_comps_language"]
+
+
+def get_comps_language():
+    """Get the language of the translated comps strings.
+
+    DNF translates the names and the descriptions of environments and
+    groups according to the current locale of messages.
+
+    :return: a string with the locale of messages
+    """
+    lang = locale.getlocale(locale.LC_MESSAGES)
+
+    if lang == (None, None):
+        return "C"
+
+    return ".".join(filter(None, lang))
+
+
+class CompsIndex(object):
+    """An index of environments and groups of the comps metadata.
+
+    The index is created once for the loaded comps metadata, so the
+    environments, groups and their relations can be looked up without
+    walking the comps metadata again.
+
+    Environments and groups are found by their ids or names. Other
+    patterns are passed to the comps object.
+
+    The translated names and descriptions are cached per language,
+    because reading them from the comps metadata is expensive.
+    """
+
+    def __init__(self, comps):
+        """Create a new index.
+
+        :param comps: a DNF comps object
+        """
+        self._comps = comps
+        self._environments = OrderedDict()
+        self._environment_names = {}
+        self._groups = OrderedDict()
+        self._group_names = {}
+        self._options = {}
+        self._group_environments = {}
+        self._lang_only_groups = OrderedDict()
+        self._descriptions = {}
+
+        for env in comps.environments:
+            self._environments[env.id] = env
+            options = self._options[env.id] = OrderedDict()
+
+            for opt in env.option_ids:
+                options[opt.name] = options.get(opt.name, False) or bool(opt.default)
+
+            if env.name:
+                self._environment_names.setdefault(env.name, env)
+
+        for grp in comps.groups_iter():
+            self._groups[grp.id] = grp
+            self._group_environments[grp.id] = []
+
+            if grp.name:
+                self._group_names.setdefault(grp.name, grp)
+
+            if grp.lang_only:
+                self._lang_only_groups.setdefault(grp.lang_only, []).append(grp.id)
+
+        for env_id, options in self._options.items():
+            for grp_id in options:
+                self._group_environments.setdefault(grp_id, []).append(env_id)
+
+        log.debug("Indexed %d environments and %d groups.",
+                  len(self._environments), len(self._groups))
+
+    @property
+    def comps(self):
+        """The indexed comps object."""
+        return self._comps
+
+    @property
+    def environments(self):
+        """A list of environment ids."""
+        return list(self._environments)
+
+    @property
+    def groups(self):
+        """A list of group ids."""
+        return list(self._groups)
+
+    def get_environment(self, pattern):
+        """Find an environment by its id, name or pattern.
+
+        :param str pattern: an id, a name or a pattern
+        :return: a comps environment or None
+        """
+        env = self._environments.get(pattern) or self._environment_names.get(pattern)
+
+        if env is None:
+            env = self._comps.environment_by_pattern(pattern)
+
+        return env
+
+    def get_group(self, pattern):
+        """Find a group by its id, name or pattern.
+
+        :param str pattern: an id, a name or a pattern
+        :return: a comps group or None
+        """
+        grp = self._groups.get(pattern) or self._group_names.get(pattern)
+
+        if grp is None:
+            grp = self._comps.group_by_pattern(pattern)
+
+        return grp
+
+    def get_options(self, environment_id):
+        """Get the optional groups of an environment.
+
+        :param str environment_id: an id of the environment
+        :return: an ordered dictionary of group ids and their default flags
+        """
+        return self._options.get(environment_id, OrderedDict())
+
+    def get_environments_of_group(self, group_id):
+        """Get the environments that offer the group as an option.
+
+        :param str group_id: an id of the group
+        :return: a list of environment ids
+        """
+        return self._group_environments.get(group_id, [])
+
+    def get_lang_only_groups(self):
+        """Get the language specific groups.
+
+        :return: an ordered dictionary of langcodes and lists of group ids
+        """
+        return self._lang_only_groups
+
+    def _get_descriptions(self, language):
+        """Get the cached descriptions for the given language."""
+        return self._descriptions.setdefault(language or get_comps_language(), {})
+
+    def get_environment_description(self, env, language=None):
+        """Get the translated name and description of an environment.
+
+        :param env: a comps environment
+        :param str language: a language or None for the current one
+        :return: a tuple with the name and the description
+        """
+        descriptions = self._get_descriptions(language)
+        key = ("environment", env.id)
+
+        if key not in descriptions:
+            descriptions[key] = (env.ui_name, env.ui_description)
+
+        return descriptions[key]
+
+    def get_group_description(self, grp, language=None):
+        """Get the translated name and description of a group.
+
+        :param grp: a comps group
+        :param str language: a language or None for the current one
+        :return: a tuple with the name and the description
+        """
+        descriptions = self._get_descriptions(language)
+        key = ("group", grp.id)
+
+        if key not in descriptions:
+            descriptions[key] = (grp.ui_name, grp.ui_description)
+
+        return descriptions[key]
+
+    def load_descriptions(self, language=None):
+        """Cache the descriptions of all environments and groups.
+
+        :param str language: a language or None for the current one
+        """
+        language = language or get_comps_language()
+
+        for env in self._environments.values():
+            self.get_environment_description(env, language)
+
+        for grp in self._groups.values():
+            self.get_group_description(grp, language)
+
+        log.debug("Cached the comps descriptions for the language %s.", language)
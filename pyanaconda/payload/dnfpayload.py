@@ -19,13 +19,17 @@
 import os
 import configparser
 import collections
+import ctypes
 import multiprocessing
 import operator
 import hashlib
+import queue
 import shutil
 import sys
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
 from pyanaconda.flags import flags
@@ -33,12 +37,17 @@ from pyanaconda.core.i18n import _, N_
 from pyanaconda.progress import progressQ, progress_message
 from pyanaconda.core.util import ProxyString, ProxyStringError
 from pyanaconda.core import constants
+from pyanaconda.core import native
 from pyanaconda.core import util
 from pyanaconda.core.configuration.anaconda import conf
 from pyanaconda.modules.common.constants.services import LOCALIZATION
 from pyanaconda.simpleconfig import SimpleConfigFile
 from pyanaconda.kickstart import RepoData
 from pyanaconda.product import productName, productVersion
+from pyanaconda.payload.comps import CompsIndex
+from pyanaconda.payload.download import DownloadScheduler, TransferRate
+from pyanaconda.payload.package_cache import PackageCache
+from pyanaconda.payload.probe import URLProbe, is_probe_supported
 from pyanaconda.payload.errors import MetadataError, NoSuchGroup, DependencyError, \
     PayloadInstallError, PayloadSetupError, PayloadError
 
@@ -66,6 +75,7 @@ log = get_packaging_logger()
 DNF_CACHE_DIR = '/tmp/dnf.cache'
 DNF_PLUGINCONF_DIR = '/tmp/dnf.pluginconf'
 DNF_PACKAGE_CACHE_DIR_SUFFIX = 'dnf.package.cache'
+PACKAGE_STORE_DIR_SUFFIX = 'anaconda.package.store'
 DNF_LIBREPO_LOG = '/tmp/dnf.librepo.log'
 REPO_DIRS = ['/etc/yum.repos.d',
              '/etc/anaconda.repos.d',
@@ -81,6 +91,18 @@ USER_AGENT = "%s (anaconda)/%s" % (productName, productVersion)
 # 6KiB = 4K(max default fragment size) + 2K(rpm db could be taken for a header file)
 BONUS_SIZE_ON_FILE = Size("6 KiB")
 
+# How often is the progress of the RPM transaction shown (in seconds).
+TRANSACTION_PROGRESS_INTERVAL = 0.2
+
+# The maximal number of log lines of the RPM transaction sent at once.
+TRANSACTION_LOG_BATCH_SIZE = 100
+
+# The size of the shared memory with the last progress message (in bytes).
+TRANSACTION_PROGRESS_SIZE = 4096
+
+# The maximal number of repositories checked at once.
+REPO_CHECK_WORKERS = 8
+
 
 def _failure_limbo():
     progressQ.send_quit(1)
@@ -90,6 +112,22 @@ def _failure_limbo():
 
 def _df_map():
     """Return (mountpoint -> size available) mapping."""
+    try:
+        structured = {mount_point: Size(free_space) for mount_point, free_space
+                      in native.get_free_space_map().items()}
+    except OSError as e:
+        log.debug("Failed to read the mounted filesystems, running df: %s", e)
+        structured = _run_df()
+
+    # Add /var/tmp/ if this is a directory or image installation
+    if not conf.target.is_hardware:
+        var_tmp = os.statvfs("/var/tmp")
+        structured["/var/tmp"] = Size(var_tmp.f_frsize * var_tmp.f_bfree)
+    return structured
+
+
+def _run_df():
+    """Return (mountpoint -> size available) mapping reported by df."""
     output = util.execWithCapture('df', ['--output=target,avail'])
     output = output.rstrip()
     lines = output.splitlines()
@@ -100,10 +138,6 @@ def _df_map():
             continue
         structured[key] = Size(int(val) * 1024)
 
-    # Add /var/tmp/ if this is a directory or image installation
-    if not conf.target.is_hardware:
-        var_tmp = os.statvfs("/var/tmp")
-        structured["/var/tmp"] = Size(var_tmp.f_frsize * var_tmp.f_bfree)
     return structured
 
 
@@ -166,16 +200,187 @@ def _pick_mpoint(df, download_size, install_size, download_only):
         return sorted_mpoints[0][0]
 
 
+class TransactionSizeEstimator(object):
+    """Estimate the install size and the number of files of a transaction.
+
+    Neither the sack nor the primary metadata provide the number of files
+    of a package, so the file list has to be read. It is read only once for
+    every package and the sizes of packages are remembered across transactions.
+    The result for the last transaction is remembered as well, because the
+    required space is checked several times for the same transaction.
+    """
+
+    def __init__(self):
+        self._packages = {}
+        self._last_estimate = None
+
+    @staticmethod
+    def _get_package_key(pkg):
+        """Get a key of the package that doesn't depend on the sack."""
+        return str(pkg), pkg.reponame, pkg.installsize
+
+    def get_package_size(self, pkg):
+        """Get the install size and the number of files of a package.
+
+        :param pkg: a DNF package
+        :return: a tuple of the size in bytes and the number of files
+        """
+        key = self._get_package_key(pkg)
+        result = self._packages.get(key)
+
+        if result is None:
+            result = (pkg.installsize, len(pkg.files))
+            self._packages[key] = result
+
+        return result
+
+    def estimate(self, transaction):
+        """Estimate the install size and the number of files of a transaction.
+
+        :param transaction: a DNF transaction
+        :return: a tuple of the size in bytes and the number of files
+        """
+        if self._last_estimate and self._last_estimate[0] is transaction:
+            return self._last_estimate[1]
+
+        size = 0
+        files_nm = 0
+
+        for tsi in transaction:
+            # space taken by all files installed by the package and
+            # number of files installed on the system
+            pkg_size, pkg_files_nm = self.get_package_size(tsi.pkg)
+            size += pkg_size
+            files_nm += pkg_files_nm
+
+        self._last_estimate = (transaction, (size, files_nm))
+        return size, files_nm
+
+    def clear(self):
+        """Forget all estimates."""
+        self._packages = {}
+        self._last_estimate = None
+
+
+class TransactionProgressChannel(object):
+    """A channel for the progress of the RPM transaction.
+
+    The transaction runs in a child process. The child process stores
+    the last progress message in shared memory and the parent process
+    reads it at a bounded rate, so the packages don't have to be reported
+    one by one. The log lines are sent in batches. Other events are always
+    sent through the queue after the log lines that precede them.
+    """
+
+    def __init__(self, interval=TRANSACTION_PROGRESS_INTERVAL,
+                 batch_size=TRANSACTION_LOG_BATCH_SIZE):
+        """Create a new channel.
+
+        :param float interval: a minimal number of seconds between two updates
+        :param int batch_size: a maximal number of log lines sent at once
+        """
+        self._interval = interval
+        self._batch_size = batch_size
+        self._queue = multiprocessing.Queue()
+        self._progress = multiprocessing.Array(ctypes.c_char, TRANSACTION_PROGRESS_SIZE)
+        self._progress_id = multiprocessing.Value(ctypes.c_ulonglong, 0,
+                                                  lock=self._progress.get_lock())
+        self._log_lines = []
+        self._last_log_time = 0
+        self._last_progress_id = 0
+        self._last_progress_time = 0
+
+    def set_progress(self, token, msg):
+        """Replace the last progress message.
+
+        :param str token: a type of the progress message
+        :param str msg: a text of the message
+        """
+        data = "{}\n{}".format(token, msg).encode("utf-8")[:TRANSACTION_PROGRESS_SIZE - 1]
+
+        with self._progress.get_lock():
+            self._progress.value = data
+            self._progress_id.value += 1
+
+    def log(self, line):
+        """Add a log line.
+
+        The log lines are sent if there are enough of them or
+        if the last log lines were sent a while ago.
+
+        :param str line: a log line
+        """
+        self._log_lines.append(line)
+        now = time.time()
+
+        if len(self._log_lines) >= self._batch_size or now - self._last_log_time >= self._interval:
+            self._send_log()
+
+    def _send_log(self):
+        """Send the pending log lines."""
+        self._last_log_time = time.time()
+
+        if not self._log_lines:
+            return
+
+        self._queue.put(('log', self._log_lines))
+        self._log_lines = []
+
+    def send(self, token, msg):
+        """Send an event that has to be delivered.
+
+        :param str token: a type of the event
+        :param msg: a message of the event
+        """
+        self._send_log()
+        self._queue.put((token, msg))
+
+    def receive(self):
+        """Receive the next event.
+
+        Wait for the event at most for the interval of progress updates.
+
+        :return: a tuple of a token and a message or None
+        """
+        try:
+            return self._queue.get(timeout=self._interval)
+        except queue.Empty:
+            return None
+
+    def get_progress(self, force=False):
+        """Get the last progress message if there is a new one.
+
+        :param bool force: ignore the interval of progress updates
+        :return: a tuple of a token and a message or None
+        """
+        now = time.time()
+
+        if not force and now - self._last_progress_time < self._interval:
+            return None
+
+        with self._progress.get_lock():
+            progress_id = self._progress_id.value
+            data = self._progress.value
+
+        if progress_id == self._last_progress_id:
+            return None
+
+        self._last_progress_id = progress_id
+        self._last_progress_time = now
+        token, msg = data.decode("utf-8", errors="ignore").split("\n", 1)
+        return token, msg
+
+
 class PayloadRPMDisplay(dnf.callback.TransactionProgress):
-    def __init__(self, queue_instance):
+    def __init__(self, channel):
         super().__init__()
-        self._queue = queue_instance
+        self._channel = channel
         self._last_ts = None
         self._postinst_phase = False
         self.cnt = 0
 
     def progress(self, package, action, ti_done, ti_total, ts_done, ts_total):
-        # Process DNF actions, communicating with anaconda via the queue
+        # Process DNF actions, communicating with anaconda via the channel.
         # A normal installation consists of 'install' messages followed by
         # the 'post' message.
         if action == dnf.transaction.PKG_INSTALL and ti_done == 0:
@@ -187,17 +392,17 @@ class PayloadRPMDisplay(dnf.callback.TransactionProgress):
             msg = '%s.%s (%d/%d)' % \
                 (package.name, package.arch, ts_done, ts_total)
             self.cnt += 1
-            self._queue.put(('install', msg))
+            self._channel.set_progress('install', msg)
 
             # Log the exact package nevra, build time and checksum
             nevra = "%s-%s.%s" % (package.name, package.evr, package.arch)
             log_msg = "Installed: %s %s %s" % (nevra, package.buildtime, package.returnIdSum()[1])
-            self._queue.put(('log', log_msg))
+            self._channel.log(log_msg)
 
         elif action == dnf.transaction.TRANS_POST:
-            self._queue.put(('post', None))
+            self._channel.send('post', None)
             log_msg = "Post installation setup phase started."
-            self._queue.put(('log', log_msg))
+            self._channel.log(log_msg)
             self._postinst_phase = True
 
         elif action == dnf.transaction.PKG_SCRIPTLET:
@@ -205,79 +410,96 @@ class PayloadRPMDisplay(dnf.callback.TransactionProgress):
             nevra = "%s-%s.%s" % (package.name, package.evr, package.arch)
             log_msg = "Configuring (running scriptlet for): %s %s %s" % (nevra, package.buildtime,
                                                                          package.returnIdSum()[1])
-            self._queue.put(('log', log_msg))
+            self._channel.log(log_msg)
 
             # only show progress in UI for post-installation scriptlets
             if self._postinst_phase:
                 msg = '%s.%s' % (package.name, package.arch)
-                self._queue.put(('configure', msg))
+                self._channel.set_progress('configure', msg)
 
         elif action == dnf.transaction.PKG_VERIFY:
             msg = '%s.%s (%d/%d)' % (package.name, package.arch, ts_done, ts_total)
-            self._queue.put(('verify', msg))
+            self._channel.set_progress('verify', msg)
 
             # Log the exact package nevra, build time and checksum
             nevra = "%s-%s.%s" % (package.name, package.evr, package.arch)
             log_msg = "Verifying: %s %s %s" % (nevra, package.buildtime, package.returnIdSum()[1])
-            self._queue.put(('log', log_msg))
+            self._channel.log(log_msg)
 
             # Once the last package is verified the transaction is over
             if ts_done == ts_total:
-                self._queue.put(('done', None))
+                self._channel.send('done', None)
 
     def error(self, message):
         """Report an error that occurred during the transaction. Message is a
         string which describes the error.
         """
-        self._queue.put(('error', message))
+        self._channel.send('error', message)
 
 
 class DownloadProgress(dnf.callback.DownloadProgress):
     def __init__(self):
         super().__init__()
         self.downloads = collections.defaultdict(int)
+        self.downloaded = 0
         self.last_time = time.time()
         self.total_files = 0
         self.total_size = Size(0)
+        self.rate = TransferRate()
+
+    def _update(self, nevra, done):
+        # Keep the running total, the callbacks are called very often.
+        self.downloaded += done - self.downloads[nevra]
+        self.downloads[nevra] = done
+        self._send_message()
 
     @_paced
-    def _update(self):
-        msg = _('Downloading %(total_files)s RPMs, '
-                '%(downloaded)s / %(total_size)s (%(percent)d%%) done.')
-        downloaded = Size(sum(self.downloads.values()))
+    def _send_message(self):
+        self.rate.update(self.downloaded)
+        downloaded = Size(self.downloaded)
+        eta = self.rate.get_eta(int(self.total_size - downloaded))
         vals = {
             'downloaded': downloaded,
             'percent': int(100 * downloaded / self.total_size),
             'total_files': self.total_files,
-            'total_size': self.total_size
+            'total_size': self.total_size,
+            'speed': Size(int(self.rate.rate)),
         }
+
+        if eta is None:
+            msg = _('Downloading %(total_files)s RPMs, '
+                    '%(downloaded)s / %(total_size)s (%(percent)d%%) done.')
+        else:
+            msg = _('Downloading %(total_files)s RPMs, '
+                    '%(downloaded)s / %(total_size)s (%(percent)d%%) done, '
+                    '%(speed)s/s, %(eta)s remaining.')
+            vals['eta'] = "%d:%02d" % divmod(int(eta), 60)
+
         progressQ.send_message(msg % vals)
 
     def end(self, dnf_payload, status, msg):  # pylint: disable=arguments-differ
         nevra = str(dnf_payload)
         if status is dnf.callback.STATUS_OK:
-            self.downloads[nevra] = dnf_payload.download_size
-            self._update()
+            self._update(nevra, dnf_payload.download_size)
             return
         log.warning("Failed to download '%s': %d - %s", nevra, status, msg)
 
     def progress(self, dnf_payload, done):  # pylint: disable=arguments-differ
-        nevra = str(dnf_payload)
-        self.downloads[nevra] = done
-        self._update()
+        self._update(str(dnf_payload), done)
 
     # TODO: Remove pylint disable after DNF-2.5.0 will arrive in Fedora
     def start(self, total_files, total_size, total_drpms=0):  # pylint: disable=arguments-differ
         self.total_files = total_files
         self.total_size = Size(total_size)
+        self.rate.update(self.downloaded)
 
 
-def do_transaction(base, queue_instance):
+def do_transaction(base, channel):
     # Execute the DNF transaction and catch any errors. An error doesn't
     # always raise a BaseException, so presence of 'quit' without a preceeding
     # 'post' message also indicates a problem.
     try:
-        display = PayloadRPMDisplay(queue_instance)
+        display = PayloadRPMDisplay(channel)
         base.do_transaction(display=display)
         exit_reason = "DNF quit"
     except BaseException as e:  # pylint: disable=broad-except
@@ -287,7 +509,7 @@ def do_transaction(base, queue_instance):
         exit_reason = str(e) + traceback.format_exc()
     finally:
         base.close()  # Always close this base.
-        queue_instance.put(('quit', str(exit_reason)))
+        channel.send('quit', str(exit_reason))
 
 
 class DNFPayload(payload.PackagePayload):
@@ -312,11 +534,29 @@ class DNFPayload(payload.PackagePayload):
         self._req_packages = set()
         self.requirements.set_apply_callback(self._apply_requirements)
 
+        # the last successfully resolved software selection
+        self._resolved_selection = None
+
+        # the estimator of the space required by the transaction
+        self._size_estimator = TransactionSizeEstimator()
+
+        # the index of the loaded comps metadata
+        self._comps_index = None
+
+        # the session for checks of the repositories
+        self._repo_check_session = None
+
+        # the packages kept for the next installation attempts
+        self._package_cache = PackageCache(directories=conf.payload.package_cache_directories)
+
     def unsetup(self):
         super().unsetup()
         self._base = None
         self._configure()
         self._repoMD_list = []
+        self._resolved_selection = None
+        self._size_estimator.clear()
+        self._comps_index = None
 
     def _replace_vars(self, url):
         """Replace url variables with their values.
@@ -818,14 +1058,26 @@ class DNFPayload(payload.PackagePayload):
                     return repo.id
         return None
 
+    @property
+    def comps_index(self):
+        """The index of the loaded comps metadata.
+
+        The index is created again if the comps metadata are reloaded.
+        """
+        comps = self._base.comps
+
+        if not self._comps_index or self._comps_index.comps is not comps:
+            self._comps_index = CompsIndex(comps)
+
+        return self._comps_index
+
     @property
     def environments(self):
-        return [env.id for env in self._base.comps.environments]
+        return self.comps_index.environments
 
     @property
     def groups(self):
-        groups = self._base.comps.groups_iter()
-        return [g.id for g in groups]
+        return self.comps_index.groups
 
     @property
     def repos(self):
@@ -867,13 +1119,7 @@ class DNFPayload(payload.PackagePayload):
         if transaction is None:
             return Size("3000 MB")
 
-        size = 0
-        files_nm = 0
-        for tsi in transaction:
-            # space taken by all files installed by the packages
-            size += tsi.pkg.installsize
-            # number of files installed on the system
-            files_nm += len(tsi.pkg.files)
+        size, files_nm = self._size_estimator.estimate(transaction)
 
         # append bonus size depending on number of files
         bonus_size = files_nm * BONUS_SIZE_ON_FILE
@@ -886,14 +1132,81 @@ class DNFPayload(payload.PackagePayload):
         return total_space
 
     def _is_group_visible(self, grpid):
-        grp = self._base.comps.group_by_pattern(grpid)
+        grp = self.comps_index.get_group(grpid)
         if grp is None:
             raise NoSuchGroup(grpid)
         return grp.visible
 
+    def _refresh_environment_addons(self):
+        log.info("Refreshing environment_addons")
+        index = self.comps_index
+        self._environment_addons = {env: ([], []) for env in index.environments}
+
+        # Determine which groups are specific to an environment and which other
+        # groups are available in all environments.
+        for grp in index.groups:
+            specific = index.get_environments_of_group(grp)
+            visible = self._is_group_visible(grp)
+
+            for env, addons in self._environment_addons.items():
+                if env in specific:
+                    addons[0].append(grp)
+                elif visible:
+                    addons[1].append(grp)
+
+    def _get_selection_fingerprint(self):
+        """Get a fingerprint of the software selection.
+
+        The fingerprint contains everything that is used to resolve
+        the software selection except for the package sack. Every reload
+        of the repository metadata creates a new sack, so the sack is
+        compared by its identity.
+
+        :return: a tuple
+        """
+        packages = self.data.packages
+
+        with self._repos_lock:
+            repos = tuple(sorted(repo.id for repo in self._base.repos.iter_enabled()))
+
+        return (
+            packages.default,
+            packages.environment,
+            tuple(self.environments[:1]) if packages.default else (),
+            packages.nocore,
+            tuple((group.name, group.include) for group in packages.groupList),
+            tuple(group.name for group in packages.excludedGroupList),
+            tuple(packages.packageList),
+            tuple(packages.excludedList),
+            packages.handleMissing,
+            tuple((module.name, module.stream, module.enable)
+                  for module in self.data.module.dataList()),
+            tuple(sorted(req.id for req in self.requirements.packages)),
+            tuple(sorted(req.id for req in self.requirements.groups)),
+            tuple(self.kernel_packages),
+            repos,
+        )
+
     def check_software_selection(self):
         log.info("checking software selection")
         self._bump_tx_id()
+
+        fingerprint = self._get_selection_fingerprint()
+        sack = self._base.sack
+
+        if self._resolved_selection:
+            resolved_fingerprint, resolved_sack, resolve_time = self._resolved_selection
+
+            if resolved_fingerprint == fingerprint and resolved_sack is sack:
+                log.info("checking dependencies: no changes since the last check, "
+                         "skipped the resolve of %.2f s", resolve_time)
+                log.info("%d packages selected totalling %s",
+                         len(self._base.transaction), self.space_required)
+                return
+
+        self._resolved_selection = None
+        start_time = time.time()
+
         self._base.reset(goal=True)
         self._process_module_command()
         self._apply_selections()
@@ -908,6 +1221,10 @@ class DNFPayload(payload.PackagePayload):
             log.warning(msg)
             raise DependencyError(msg)
 
+        resolve_time = time.time() - start_time
+        log.debug("the software selection was resolved in %.2f s", resolve_time)
+        self._resolved_selection = (fingerprint, sack, resolve_time)
+
         log.info("%d packages selected totalling %s",
                  len(self._base.transaction), self.space_required)
 
@@ -937,6 +1254,7 @@ class DNFPayload(payload.PackagePayload):
         except KeyError:
             pass
         super().disable_repo(repo_id)
+        self._comps_index = None
 
     def enable_repo(self, repo_id):
         try:
@@ -945,44 +1263,52 @@ class DNFPayload(payload.PackagePayload):
         except KeyError:
             pass
         super().enable_repo(repo_id)
+        self._comps_index = None
 
     def environment_description(self, environment_id):
-        env = self._base.comps.environment_by_pattern(environment_id)
+        env = self.comps_index.get_environment(environment_id)
         if env is None:
             raise NoSuchGroup(environment_id)
-        return (env.ui_name, env.ui_description)
+        return self.comps_index.get_environment_description(env)
 
     def environment_id(self, environment):
         """Return environment id for the environment specified by id or name."""
         # the enviroment must be string or else DNF >=3 throws an assert error
         if not isinstance(environment, str):
             log.warning("environment_id() called with non-string argument: %s", environment)
-        env = self._base.comps.environment_by_pattern(environment)
+        env = self.comps_index.get_environment(environment)
         if env is None:
             raise NoSuchGroup(environment)
         return env.id
 
     def environment_has_option(self, environment_id, grpid):
-        env = self._base.comps.environment_by_pattern(environment_id)
+        env = self.comps_index.get_environment(environment_id)
         if env is None:
             raise NoSuchGroup(environment_id)
-        return grpid in (id_.name for id_ in env.option_ids)
+        return grpid in self.comps_index.get_options(env.id)
 
     def environment_option_is_default(self, environment_id, grpid):
-        env = self._base.comps.environment_by_pattern(environment_id)
+        env = self.comps_index.get_environment(environment_id)
         if env is None:
             raise NoSuchGroup(environment_id)
 
         # Look for a group in the optionlist that matches the group_id and has
         # default set
-        return any(grp for grp in env.option_ids if grp.name == grpid and grp.default)
+        return self.comps_index.get_options(env.id).get(grpid, False)
 
     def group_description(self, grpid):
         """Return name/description tuple for the group specified by id."""
-        grp = self._base.comps.group_by_pattern(grpid)
+        grp = self.comps_index.get_group(grpid)
         if grp is None:
             raise NoSuchGroup(grpid)
-        return (grp.ui_name, grp.ui_description)
+        return self.comps_index.get_group_description(grp)
+
+    def load_descriptions(self):
+        """Cache the translated descriptions of environments and groups."""
+        if self._base.comps is None:
+            return
+
+        self.comps_index.load_descriptions()
 
     def group_id(self, group_name):
         """Translate group name to group ID.
@@ -992,7 +1318,7 @@ class DNFPayload(payload.PackagePayload):
         :raise NoSuchGroup: If group_name doesn't exists.
         :raise PayloadError: When Yum's groups are not available.
         """
-        grp = self._base.comps.group_by_pattern(group_name)
+        grp = self.comps_index.get_group(group_name)
         if grp is None:
             raise NoSuchGroup(group_name)
         return grp.id
@@ -1005,6 +1331,9 @@ class DNFPayload(payload.PackagePayload):
         self._base.read_comps()
         self._refresh_environment_addons()
 
+        # Translate the comps metadata before the spokes ask for it.
+        self.load_descriptions()
+
     def install(self):
         progress_message(N_('Starting package installation process'))
 
@@ -1022,47 +1351,61 @@ class DNFPayload(payload.PackagePayload):
                 log.error("Installation failed: %r", e)
                 _failure_limbo()
 
-        if os.path.exists(self._download_location):
-            log.info("Removing existing package download location: %s", self._download_location)
-            shutil.rmtree(self._download_location)
         pkgs_to_download = self._base.transaction.install_set
+        pkgs_missing = self._stage_packages(pkgs_to_download)
         log.info('Downloading packages to %s.', self._download_location)
         progressQ.send_message(_('Downloading packages'))
         progress = DownloadProgress()
+        scheduler = DownloadScheduler(self._base.download_packages, progress)
         try:
-            self._base.download_packages(pkgs_to_download, progress)
+            scheduler.download(pkgs_missing, self._get_package_alternatives)
         except dnf.exceptions.DownloadError as e:
+            # Keep only the complete packages for the next attempts.
+            self._package_cache.collect(pkgs_missing, self._download_location, verify=True)
+
             msg = 'Failed to download the following packages: %s' % str(e)
             exc = PayloadInstallError(msg)
             if errors.errorHandler.cb(exc) == errors.ERROR_RAISE:
                 log.error("Installation failed: %r", exc)
                 _failure_limbo()
+        else:
+            # Keep the packages verified by DNF for the next attempts.
+            self._package_cache.collect(pkgs_missing, self._download_location)
 
-        log.info('Downloading packages finished.')
+        log.info('Downloading packages finished: %s served from the package cache, '
+                 '%s downloaded.', Size(self._package_cache.cached_size),
+                 Size(sum(pkg.downloadsize for pkg in pkgs_missing)))
 
         pre_msg = (N_("Preparing transaction from installation source"))
         progress_message(pre_msg)
 
-        queue_instance = multiprocessing.Queue()
+        channel = TransactionProgressChannel()
         process = multiprocessing.Process(target=do_transaction,
-                                          args=(self._base, queue_instance))
+                                          args=(self._base, channel))
         process.start()
-        (token, msg) = queue_instance.get()
         # When the installation works correctly it will get 'install' updates
         # followed by a 'post' message and then a 'quit' message.
         # If the installation fails it will send 'quit' without 'post'
-        while token:
-            if token == 'install':
-                msg = _("Installing %s") % msg
-                progressQ.send_message(msg)
-            elif token == 'configure':
-                msg = _("Configuring %s") % msg
-                progressQ.send_message(msg)
-            elif token == 'verify':
-                msg = _("Verifying %s") % msg
-                progressQ.send_message(msg)
-            elif token == 'log':
-                log.info(msg)
+        while True:
+            event = channel.receive()
+
+            # Show the last progress before any other event.
+            progress = channel.get_progress(force=bool(event and event[0] != 'log'))
+            if progress:
+                self._show_transaction_progress(*progress)
+
+            if event is None:
+                if process.is_alive():
+                    continue
+
+                # The process has ended without the 'quit' message.
+                event = channel.receive() or ('quit', "exit code %s" % process.exitcode)
+
+            (token, msg) = event
+
+            if token == 'log':
+                for line in msg:
+                    log.info(line)
             elif token == 'post':
                 msg = (N_("Performing post-installation setup tasks"))
                 progressQ.send_message(msg)
@@ -1076,10 +1419,10 @@ class DNFPayload(payload.PackagePayload):
                 if errors.errorHandler.cb(exc) == errors.ERROR_RAISE:
                     log.error("Installation failed: %r", exc)
                     _failure_limbo()
-            (token, msg) = queue_instance.get()
 
         process.join()
         # Don't close the mother base here, because we still need it.
+        self._package_cache.clear()
         if os.path.exists(self._download_location):
             log.info("Cleaning up downloaded packages: %s", self._download_location)
             shutil.rmtree(self._download_location)
@@ -1090,6 +1433,62 @@ class DNFPayload(payload.PackagePayload):
             # we don't have to care about clearing the download location ourselves.
             log.warning("Can't delete nonexistent download location: %s", self._download_location)
 
+    def _get_package_alternatives(self, pkg):
+        """Get the package and its copies from other repositories.
+
+        The copies have the same checksum and are downloaded to the
+        same local file, so DNF can install any of them.
+
+        :param pkg: a DNF package
+        :return: a list of DNF packages
+        """
+        query = self._base.sack.query().available().filter(
+            name=pkg.name, epoch=pkg.epoch, version=pkg.version,
+            release=pkg.release, arch=pkg.arch
+        )
+
+        alternatives = [pkg]
+        for alt in query:
+            if alt.reponame != pkg.reponame \
+                    and alt.returnIdSum() == pkg.returnIdSum() \
+                    and alt.localPkg() == pkg.localPkg():
+                alternatives.append(alt)
+
+        return alternatives
+
+    def _stage_packages(self, packages):
+        """Prepare the download location for the download of the packages.
+
+        Packages left in the download location by a previous attempt
+        are moved to the package cache. Packages available in the
+        package cache are staged in the clean download location.
+
+        :param packages: a list of DNF packages
+        :return: a list of packages that have to be downloaded
+        """
+        self._package_cache.path = os.path.join(os.path.dirname(self._download_location),
+                                                PACKAGE_STORE_DIR_SUFFIX)
+
+        if os.path.exists(self._download_location):
+            self._package_cache.collect(packages, self._download_location, verify=True)
+            log.info("Removing existing package download location: %s", self._download_location)
+            shutil.rmtree(self._download_location)
+
+        return self._package_cache.stage(packages)
+
+    def _show_transaction_progress(self, token, msg):
+        """Show the progress of the RPM transaction."""
+        if token == 'install':
+            msg = _("Installing %s") % msg
+        elif token == 'configure':
+            msg = _("Configuring %s") % msg
+        elif token == 'verify':
+            msg = _("Verifying %s") % msg
+        else:
+            return
+
+        progressQ.send_message(msg)
+
     def get_repo(self, repo_id):
         """Return the yum repo object."""
         return self._base.repos[repo_id]
@@ -1100,15 +1499,45 @@ class DNFPayload(payload.PackagePayload):
         except (dnf.exceptions.RepoError, KeyError):
             return super().is_repo_enabled(repo_id)
 
+    def _get_repo_check_session(self):
+        """Get a session for checks of the repositories.
+
+        The session is shared by all checks, so the connections
+        to the same servers are reused.
+        """
+        if not self._repo_check_session:
+            session = util.requests_session()
+            adapter = HTTPAdapter(pool_maxsize=REPO_CHECK_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._repo_check_session = session
+
+        return self._repo_check_session
+
     def verify_available_repositories(self):
-        """Verify availability of repositories."""
+        """Verify availability of repositories.
+
+        The repositories are checked concurrently. The check ends
+        with the first repository that can't be reached.
+        """
         if not self._repoMD_list:
             return False
 
-        for repo in self._repoMD_list:
-            if not repo.verify_repoMD():
-                log.debug("Can't reach repo %s", repo.id)
-                return False
+        executor = ThreadPoolExecutor(max_workers=min(REPO_CHECK_WORKERS, len(self._repoMD_list)))
+        futures = {executor.submit(repo.verify_repoMD): repo for repo in self._repoMD_list}
+
+        try:
+            for future in as_completed(futures):
+                if not future.result():
+                    log.debug("Can't reach repo %s", futures[future].id)
+                    return False
+        finally:
+            # Don't wait for the checks that are not needed anymore.
+            for future in futures:
+                future.cancel()
+
+            executor.shutdown(wait=False)
+
         return True
 
     def language_groups(self):
@@ -1116,11 +1545,9 @@ class DNFPayload(payload.PackagePayload):
         locales = [localization_proxy.Language] + localization_proxy.LanguageSupport
         match_fn = pyanaconda.localization.langcode_matches_locale
         gids = set()
-        gl_tuples = ((g.id, g.lang_only) for g in self._base.comps.groups_iter())
-        for (gid, lang) in gl_tuples:
-            for locale in locales:
-                if match_fn(lang, locale):
-                    gids.add(gid)
+        for (lang, lang_gids) in self.comps_index.get_lang_only_groups().items():
+            if any(match_fn(lang, locale) for locale in locales):
+                gids.update(lang_gids)
         return list(gids)
 
     def reset(self):
@@ -1131,6 +1558,9 @@ class DNFPayload(payload.PackagePayload):
         self._base.reset(sack=True, repos=True)
         self._configure_proxy()
         self._repoMD_list = []
+        self._resolved_selection = None
+        self._size_estimator.clear()
+        self._comps_index = None
 
     def update_base_repo(self, fallback=True, checkmount=True):
         log.info('configuring base repo')
@@ -1166,10 +1596,11 @@ class DNFPayload(payload.PackagePayload):
             try:
                 self._refresh_install_tree(install_tree_url)
                 self._base.conf.releasever = self._get_release_version(install_tree_url)
-                base_repo_url = self._get_base_repo_location(install_tree_url)
+                treeinfo_repo_url = self._get_base_repo_location(install_tree_url)
+                base_repo_url = self._probe_base_repo(install_tree_url, treeinfo_repo_url)
 
                 if self.first_payload_reset:
-                    self._add_treeinfo_repositories(install_tree_url, base_repo_url)
+                    self._add_treeinfo_repositories(install_tree_url, treeinfo_repo_url)
 
                 log.debug("releasever from %s is %s", base_repo_url, self._base.conf.releasever)
             except configparser.MissingSectionHeaderError as e:
@@ -1284,6 +1715,63 @@ class DNFPayload(payload.PackagePayload):
         log.debug("No base repository found in treeinfo file. Using installation tree root.")
         return install_tree_url
 
+    def _probe_base_repo(self, install_tree_url, base_repo_url):
+        """Pick a reachable location of the base repository.
+
+        The location from the treeinfo file is preferred, the installation
+        tree root is used if the location doesn't respond in time. Other
+        repositories from the treeinfo file and the additional repositories
+        are probed at the same time, so their latencies are logged.
+
+        :param install_tree_url: Url to the installation tree root.
+        :param base_repo_url: Base repository url from the treeinfo file.
+        :returns: Base repository url.
+        """
+        candidates = list(collections.OrderedDict.fromkeys(
+            filter(None, [base_repo_url, install_tree_url])
+        ))
+
+        if not candidates or not all(map(is_probe_supported, candidates)):
+            return base_repo_url
+
+        extra_urls = []
+
+        if self._install_tree_metadata:
+            for repo_md in self._install_tree_metadata.get_metadata_repos():
+                extra_urls.append(repo_md.path)
+
+        for repo in self.addons:
+            ksrepo = self.get_addon_repo(repo)
+            extra_urls.append(ksrepo.baseurl)
+
+        repomd_urls = collections.OrderedDict(
+            (self._get_repomd_url(url), url) for url in candidates
+        )
+
+        probe = URLProbe(**self._get_install_tree_request_args())
+        result = probe.race(
+            list(repomd_urls),
+            [self._get_repomd_url(url) for url in extra_urls if is_probe_supported(url)]
+        )
+
+        if not result:
+            log.warning("No location of the base repository responded: %s",
+                        ", ".join(candidates))
+            return base_repo_url
+
+        result.response.close()
+        url = repomd_urls[result.url]
+
+        if url != base_repo_url:
+            log.warning("Base repository at %s didn't respond, using %s.", base_repo_url, url)
+
+        return url
+
+    @staticmethod
+    def _get_repomd_url(url):
+        """Get the url of the repomd.xml file of the repository."""
+        return "%s/repodata/repomd.xml" % url.rstrip("/")
+
     def _add_treeinfo_repositories(self, install_tree_url, base_repo_url=None):
         """Add all repositories from treeinfo file which are not already loaded.
 
@@ -1377,11 +1865,17 @@ class DNFPayload(payload.PackagePayload):
         Save repomd hash to test if the repositories can be reached.
         """
         super().post_setup()
-        self._repoMD_list = []
-        for repo in self._base.repos.iter_enabled():
-            repoMD = RepoMDMetaHash(self, repo)
-            repoMD.store_repoMD_hash()
-            self._repoMD_list.append(repoMD)
+        session = self._get_repo_check_session()
+        self._repoMD_list = [RepoMDMetaHash(self, repo, session)
+                             for repo in self._base.repos.iter_enabled()]
+
+        if not self._repoMD_list:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(REPO_CHECK_WORKERS,
+                                                len(self._repoMD_list))) as executor:
+            for repoMD in self._repoMD_list:
+                executor.submit(repoMD.store_repoMD_hash)
 
     def post_install(self):
         """Perform post-installation tasks."""
@@ -1412,13 +1906,19 @@ class DNFPayload(payload.PackagePayload):
 class RepoMDMetaHash(object):
     """Class that holds hash of a repomd.xml file content from a repository.
     This class can test availability of this repository by comparing hashes.
+
+    The ETag and Last-Modified headers of the stored repomd.xml file are
+    remembered, so the file is not downloaded again if it is not modified.
     """
-    def __init__(self, dnf_payload, repo):
+    def __init__(self, dnf_payload, repo, session=None):
         self._repoId = repo.id
         self._method = dnf_payload.data.method
         self._ssl_verify = repo.sslverify
         self._urls = repo.baseurl
+        self._session = session
         self._repomd_hash = ""
+        self._repomd_url = None
+        self._repomd_headers = {}
 
     @property
     def repoMD_hash(self):
@@ -1437,19 +1937,41 @@ class RepoMDMetaHash(object):
 
     def verify_repoMD(self):
         """Download and compare with stored repomd.xml file."""
-        new_repomd = self._download_repoMD(self._method)
+        new_repomd = self._download_repoMD(self._method, conditional=True)
+
+        # The file was not modified.
+        if new_repomd is None:
+            return True
+
         new_repomd_hash = self._calculate_hash(new_repomd)
         return new_repomd_hash == self._repomd_hash
 
+    def _store_headers(self, url, response_headers):
+        """Store the headers for conditional requests."""
+        self._repomd_url = url
+        self._repomd_headers = {}
+
+        if response_headers.get("ETag"):
+            self._repomd_headers["if-none-match"] = response_headers["ETag"]
+
+        if response_headers.get("Last-Modified"):
+            self._repomd_headers["if-modified-since"] = response_headers["Last-Modified"]
+
     def _calculate_hash(self, data):
         m = hashlib.sha256()
         m.update(data.encode('ascii', 'backslashreplace'))
         return m.digest()
 
-    def _download_repoMD(self, method):
+    def _download_repoMD(self, method, conditional=False):
+        """Download the repomd.xml file.
+
+        :param method: the installation method
+        :param bool conditional: send the headers of the stored file
+        :return: the content of the file, an empty string if no file was
+                 downloaded or None if the stored file was not modified
+        """
         proxies = {}
         repomd = ""
-        headers = {"user-agent": USER_AGENT}
 
         if hasattr(method, "proxy"):
             proxy_url = method.proxy
@@ -1461,16 +1983,29 @@ class RepoMDMetaHash(object):
                 log.info("Failed to parse proxy for test if repo available %s: %s",
                          proxy_url, e)
 
-        session = util.requests_session()
+        session = self._session or util.requests_session()
 
         # Test all urls for this repo. If any of these is working it is enough.
         for url in self._urls:
+            headers = {"user-agent": USER_AGENT}
+            validated = conditional and url == self._repomd_url and bool(self._repomd_headers)
+
+            if validated:
+                headers.update(self._repomd_headers)
+
             try:
                 result = session.get("%s/repodata/repomd.xml" % url, headers=headers,
                                      proxies=proxies, verify=self._ssl_verify,
                                      timeout=constants.NETWORK_CONNECTION_TIMEOUT)
-                if result.ok:
+                if result.status_code == 304 and validated:
+                    log.debug("The repomd.xml file of %s was not modified", self._repoId)
+                    return None
+                elif result.ok:
                     repomd = result.text
+
+                    if not conditional:
+                        self._store_headers(url, result.headers)
+
                     break
                 else:
                     log.debug("Server returned %i code when downloading repomd",
@@ -0,0 +1,253 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import time
+from collections import defaultdict, deque
+
+from pyanaconda.anaconda_loggers import get_packaging_logger
+log = get_packaging_logger()
+
+__all__ = ["DownloadScheduler", "TransferRate"]
+
+# The maximal number of packages downloaded in one batch.
+DOWNLOAD_BATCH_SIZE = 50
+
+# The time window of the measured transfer rate (in seconds).
+TRANSFER_RATE_WINDOW = 10
+
+# The weight of the last measurement of the throughput of a source.
+THROUGHPUT_WEIGHT = 0.5
+
+
+class TransferRate(object):
+    """The transfer rate measured over a sliding time window."""
+
+    def __init__(self, window=TRANSFER_RATE_WINDOW, clock=time.monotonic):
+        """Create a new transfer rate.
+
+        :param window: a time window in seconds
+        :param clock: a function that returns the current time in seconds
+        """
+        self._window = window
+        self._clock = clock
+        self._samples = deque()
+
+    def update(self, transferred):
+        """Record the number of bytes transferred so far.
+
+        :param int transferred: a number of bytes
+        """
+        now = self._clock()
+        self._samples.append((now, transferred))
+
+        # Keep one sample older than the window.
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self._window:
+            self._samples.popleft()
+
+    @property
+    def rate(self):
+        """The transfer rate in bytes per second."""
+        if len(self._samples) < 2:
+            return 0
+
+        (first_time, first_bytes), (last_time, last_bytes) = self._samples[0], self._samples[-1]
+
+        if last_time <= first_time:
+            return 0
+
+        return max(0, last_bytes - first_bytes) / (last_time - first_time)
+
+    def get_eta(self, remaining):
+        """Estimate the time of the remaining transfer.
+
+        :param int remaining: a number of remaining bytes
+        :return: a number of seconds or None if unknown
+        """
+        rate = self.rate
+
+        if not rate:
+            return None
+
+        return max(0, remaining) / rate
+
+
+class _BatchProgress(object):
+    """The download progress of one batch of packages.
+
+    DNF reports the progress of every batch separately. The progress
+    is passed to the progress of the whole download and the download
+    time of the packages is measured.
+    """
+
+    def __init__(self, scheduler, progress):
+        self._scheduler = scheduler
+        self._progress = progress
+        self._started = {}
+        self._batch_start = None
+
+    def start(self, total_files, total_size, total_drpms=0):
+        self._batch_start = time.monotonic()
+
+    def progress(self, payload, done):
+        self._started.setdefault(payload.pkg, time.monotonic())
+
+        if self._progress:
+            self._progress.progress(payload, done)
+
+    def end(self, payload, status, msg):
+        start = self._started.pop(payload.pkg, self._batch_start)
+
+        if start is not None and status is None:
+            self._scheduler.add_measurement(payload.pkg, payload.download_size,
+                                            time.monotonic() - start)
+
+        if self._progress:
+            self._progress.end(payload, status, msg)
+
+
+class DownloadScheduler(object):
+    """A scheduler of package downloads from several sources.
+
+    The same package is often available in several repositories that
+    point to different mirrors. The packages are downloaded in batches,
+    the largest packages first, and the throughput of every source is
+    measured. Every package of the next batch is assigned to the source
+    that is expected to finish it first, so the slow sources get less
+    work and the fast sources are not overloaded.
+    """
+
+    def __init__(self, download, progress=None, batch_size=DOWNLOAD_BATCH_SIZE):
+        """Create a new scheduler.
+
+        :param download: a function that downloads a list of packages
+                         and reports the progress to a callback
+        :param progress: a callback with the progress of the whole download
+        :param int batch_size: a maximal number of packages in a batch
+        """
+        self._download = download
+        self._progress = progress
+        self._batch_size = batch_size
+        self._throughput = {}
+        self._downloaded = defaultdict(int)
+
+    @staticmethod
+    def get_source(pkg):
+        """Get the source of the package.
+
+        :param pkg: a DNF package
+        :return: a name of the repository
+        """
+        return pkg.reponame
+
+    def get_throughput(self, source):
+        """Get the measured throughput of the source.
+
+        :param str source: a name of the source
+        :return: bytes per second or None if unknown
+        """
+        return self._throughput.get(source)
+
+    @property
+    def downloaded(self):
+        """A dictionary of sources and their downloaded bytes."""
+        return dict(self._downloaded)
+
+    def add_measurement(self, pkg, size, duration):
+        """Add a measured download of the package.
+
+        :param pkg: a downloaded DNF package
+        :param int size: a size of the download in bytes
+        :param float duration: a duration of the download in seconds
+        """
+        source = self.get_source(pkg)
+        self._downloaded[source] += size
+
+        if duration <= 0:
+            return
+
+        throughput = size / duration
+        last = self._throughput.get(source)
+
+        if last is not None:
+            throughput = THROUGHPUT_WEIGHT * throughput + (1 - THROUGHPUT_WEIGHT) * last
+
+        self._throughput[source] = throughput
+
+    def _get_finish_time(self, pkg, queued):
+        """Estimate when the source finishes the package."""
+        source = self.get_source(pkg)
+        throughput = self._throughput.get(source)
+
+        # Try the unknown sources as if they were the fastest ones.
+        if throughput is None:
+            throughput = max(self._throughput.values(), default=1)
+
+        return (queued[source] + pkg.downloadsize) / throughput
+
+    def _create_batch(self, pending, alternatives):
+        """Assign the next pending packages to the sources."""
+        queued = defaultdict(int)
+        batch = []
+
+        for pkg in pending[:self._batch_size]:
+            choice = min(alternatives[pkg], key=lambda alt: self._get_finish_time(alt, queued))
+            queued[self.get_source(choice)] += choice.downloadsize
+            batch.append(choice)
+
+        log.debug("Scheduled %d packages: %s", len(batch), ", ".join(
+            "%s (%d B)" % item for item in sorted(queued.items())))
+
+        return batch
+
+    def download(self, packages, get_alternatives=None):
+        """Download the packages.
+
+        The alternatives of a package have to be interchangeable with
+        the package, because any of them can be downloaded instead.
+
+        :param packages: a list of DNF packages
+        :param get_alternatives: a function that returns a list of the
+                                 package and its copies from other sources
+        :raise: the first error raised by the download function
+        """
+        pending = sorted(packages, key=lambda pkg: pkg.downloadsize, reverse=True)
+        alternatives = {}
+
+        for pkg in pending:
+            alternatives[pkg] = get_alternatives(pkg) if get_alternatives else [pkg]
+
+        if self._progress:
+            self._progress.start(len(pending), sum(pkg.downloadsize for pkg in pending))
+
+        error = None
+
+        while pending:
+            batch = self._create_batch(pending, alternatives)
+            pending = pending[len(batch):]
+
+            try:
+                self._download(batch, _BatchProgress(self, self._progress))
+            except Exception as e:  # pylint: disable=broad-except
+                log.error("Failed to download a batch of packages: %s", e)
+                error = error or e
+
+        for source, size in sorted(self._downloaded.items()):
+            log.debug("Downloaded %d B from %s at %d B/s.",
+                      size, source, self._throughput.get(source, 0))
+
+        if error:
+            raise error
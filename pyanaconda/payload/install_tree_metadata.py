@@ -18,11 +18,11 @@
 #
 
 import time
-import requests
 import os
 
 from productmd.treeinfo import TreeInfo
 from pyanaconda.core import util, constants
+from pyanaconda.payload.probe import URLProbe
 
 from pyanaconda.anaconda_loggers import get_packaging_logger
 log = get_packaging_logger()
@@ -78,33 +78,26 @@ class InstallTreeMetadata(object):
 
         xdelay = util.xprogressive_delay()
         response = None
-        ret_code = [None, None]
-        session = util.requests_session()
+        probe = URLProbe(headers=headers, proxies=proxies, verify=sslverify, cert=sslcert)
+        urls = ["%s/%s" % (url, file_name) for file_name in (".treeinfo", "treeinfo")]
 
         for retry_count in range(0, MAX_TREEINFO_DOWNLOAD_RETRIES + 1):
             if retry_count > 0:
                 time.sleep(next(xdelay))
-            # Downloading .treeinfo
-            log.info("Trying to download '.treeinfo'")
-            (response, ret_code[0]) = self._download_treeinfo_file(session, url, ".treeinfo",
-                                                                   headers, proxies,
-                                                                   sslverify, sslcert)
-            if response:
-                break
-            # Downloading treeinfo
-            log.info("Trying to download 'treeinfo'")
-            (response, ret_code[1]) = self._download_treeinfo_file(session, url, "treeinfo",
-                                                                   headers, proxies,
-                                                                   sslverify, sslcert)
-            if response:
+            # Downloading .treeinfo and treeinfo at once, .treeinfo is preferred
+            log.info("Trying to download '.treeinfo' and 'treeinfo'")
+            result = probe.race(urls)
+            if result:
+                log.debug("Retrieved '%s' from %s", os.path.basename(result.url), url)
+                response = result.response
                 break
 
             # The [.]treeinfo wasn't downloaded. Try it again if [.]treeinfo
             # is on the server.
             #
             # Server returned HTTP 404 code -> no need to try again
-            if (ret_code[0] is not None and ret_code[0] == 404
-                    and ret_code[1] is not None and ret_code[1] == 404):
+            ret_code = {r.url: r.status_code for r in probe.results}
+            if all(ret_code.get(u) == 404 for u in urls):
                 response = None
                 log.error("Got HTTP 404 Error when downloading [.]treeinfo files")
                 break
@@ -131,22 +124,6 @@ class InstallTreeMetadata(object):
 
         return False
 
-    @staticmethod
-    def _download_treeinfo_file(session, url, file_name, headers, proxies, verify, cert):
-        try:
-            result = session.get("%s/%s" % (url, file_name), headers=headers,
-                                 proxies=proxies, verify=verify, cert=cert,
-                                 timeout=constants.NETWORK_CONNECTION_TIMEOUT)
-            # Server returned HTTP 4XX or 5XX codes
-            if 400 <= result.status_code < 600:
-                log.info("Server returned %i code", result.status_code)
-                return None, result.status_code
-            log.debug("Retrieved '%s' from %s", file_name, url)
-        except requests.exceptions.RequestException as e:
-            log.info("Error downloading '%s': %s", file_name, e)
-            return (None, None)
-        return result, result.status_code
-
     def _clear(self):
         """Clear metadata repositories."""
         self._tree_info = TreeInfo()
@@ -0,0 +1,320 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import fcntl
+import hashlib
+import os
+import shutil
+
+from pyanaconda.anaconda_loggers import get_packaging_logger
+log = get_packaging_logger()
+
+__all__ = ["PackageCache", "link_file"]
+
+# The ioctl request for cloning a file on Linux (see ioctl_ficlone(2)).
+FICLONE = 0x40049409
+
+# The size of the blocks read for the checksums (in bytes).
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+
+def _reflink_file(src, dst):
+    """Create a copy of a file that shares its data blocks."""
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        except OSError:
+            os.unlink(dst)
+            raise
+
+
+def link_file(src, dst):
+    """Make the file available at the new path as cheap as possible.
+
+    Try a hard link first, then a reflink and copy the file only if
+    the file system supports neither of them.
+
+    :param str src: a path to the existing file
+    :param str dst: a path to the new file
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+    try:
+        os.link(src, dst)
+        return
+    except OSError as e:
+        log.debug("Failed to create a hard link of %s: %s", src, e)
+
+    try:
+        _reflink_file(src, dst)
+        return
+    except OSError as e:
+        log.debug("Failed to create a reflink of %s: %s", src, e)
+
+    shutil.copyfile(src, dst)
+
+
+def get_file_checksum(path, algorithm):
+    """Calculate the checksum of a file.
+
+    :param str path: a path to the file
+    :param str algorithm: a name of the hash algorithm
+    :return: a hex digest of the file
+    """
+    checksum = hashlib.new(algorithm)
+
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK_SIZE), b""):
+            checksum.update(block)
+
+    return checksum.hexdigest()
+
+
+class PackageCache(object):
+    """A content-addressed cache of downloaded packages.
+
+    Packages are stored by their checksums, so a package is never
+    downloaded again if the cache or one of the local directories
+    contains a file with the same content.
+
+    The cache is kept for the whole boot, so the packages downloaded
+    by a failed installation attempt are reused by the next one.
+    """
+
+    def __init__(self, path=None, directories=()):
+        """Create a new cache.
+
+        :param str path: a path to the cache directory or None
+        :param directories: a list of local directories with packages
+        """
+        self._path = path
+        self._directories = list(directories)
+        self._directory_index = None
+        self._cached_size = 0
+        self._verified = set()
+
+    @property
+    def path(self):
+        """A path to the cache directory."""
+        return self._path
+
+    @path.setter
+    def path(self, path):
+        self._path = path
+
+    @property
+    def cached_size(self):
+        """The number of bytes served from the cache by the last staging."""
+        return self._cached_size
+
+    @staticmethod
+    def _get_checksum(pkg):
+        """Get the checksum of the package from the metadata.
+
+        :return: a tuple with a name of the algorithm and a hex digest
+        """
+        algorithm, digest = pkg.returnIdSum()
+        return algorithm.lower(), digest.lower()
+
+    def _get_cache_path(self, algorithm, digest):
+        """Get a path to the cached package with the given checksum."""
+        return os.path.join(self._path, algorithm, digest[:2], digest + ".rpm")
+
+    def _check_cache_entry(self, cache_path, algorithm, digest):
+        """Check that the cached package matches its checksum.
+
+        A corrupted entry is removed from the cache.
+
+        :return: True if the entry is valid, otherwise False
+        """
+        if cache_path in self._verified:
+            return True
+
+        if not os.path.exists(cache_path):
+            return False
+
+        try:
+            valid = get_file_checksum(cache_path, algorithm) == digest
+        except (OSError, ValueError) as e:
+            log.debug("Failed to check the cached package %s: %s", cache_path, e)
+            valid = False
+
+        if valid:
+            self._verified.add(cache_path)
+            return True
+
+        log.debug("Removing the corrupted package %s from the cache.", cache_path)
+
+        try:
+            os.unlink(cache_path)
+        except OSError as e:
+            log.warning("Failed to remove %s: %s", cache_path, e)
+
+        return False
+
+    def _get_directory_index(self):
+        """Get the packages of the local directories by their file names."""
+        if self._directory_index is None:
+            self._directory_index = {}
+
+            for directory in self._directories:
+                for root, _dirs, files in os.walk(directory):
+                    for name in files:
+                        if name.endswith(".rpm"):
+                            self._directory_index.setdefault(name, []).append(
+                                os.path.join(root, name))
+
+            log.debug("Found %d packages in the local directories %s.",
+                      len(self._directory_index), ", ".join(self._directories))
+
+        return self._directory_index
+
+    def _find_in_directories(self, pkg, algorithm, digest):
+        """Find a package with the given checksum in the local directories."""
+        name = os.path.basename(pkg.location)
+
+        for path in self._get_directory_index().get(name, []):
+            try:
+                if get_file_checksum(path, algorithm) == digest:
+                    return path
+            except (OSError, ValueError) as e:
+                log.debug("Failed to check the package %s: %s", path, e)
+
+        return None
+
+    def lookup(self, pkg):
+        """Find a local file with the content of the package.
+
+        :param pkg: a DNF package
+        :return: a path to the file or None
+        """
+        algorithm, digest = self._get_checksum(pkg)
+
+        if self._path:
+            path = self._get_cache_path(algorithm, digest)
+
+            if self._check_cache_entry(path, algorithm, digest):
+                return path
+
+        if self._directories:
+            return self._find_in_directories(pkg, algorithm, digest)
+
+        return None
+
+    def add(self, pkg, path, verify=True):
+        """Add a package to the cache.
+
+        :param pkg: a DNF package
+        :param str path: a path to the downloaded package
+        :param bool verify: verify the checksum of the file, it can be
+                            skipped only if the file was verified by DNF
+        :return: True if the package is in the cache, otherwise False
+        """
+        if not self._path:
+            return False
+
+        algorithm, digest = self._get_checksum(pkg)
+        cache_path = self._get_cache_path(algorithm, digest)
+
+        if self._check_cache_entry(cache_path, algorithm, digest):
+            return True
+
+        try:
+            if verify and get_file_checksum(path, algorithm) != digest:
+                log.debug("The package %s doesn't match its checksum.", path)
+                return False
+
+            # Never leave an incomplete file in the cache.
+            tmp_path = cache_path + ".tmp"
+
+            if os.path.lexists(tmp_path):
+                os.unlink(tmp_path)
+
+            link_file(path, tmp_path)
+            os.rename(tmp_path, cache_path)
+        except (OSError, ValueError) as e:
+            log.warning("Failed to cache the package %s: %s", path, e)
+            return False
+
+        self._verified.add(cache_path)
+        return True
+
+    def stage(self, packages):
+        """Stage the cached packages for the download.
+
+        Create the local files of the packages that are available in
+        the cache or in the local directories, so DNF doesn't have to
+        download them.
+
+        :param packages: a list of DNF packages
+        :return: a list of packages that have to be downloaded
+        """
+        self._cached_size = 0
+        missing = []
+
+        for pkg in packages:
+            target = pkg.localPkg()
+
+            if os.path.exists(target):
+                continue
+
+            source = self.lookup(pkg)
+
+            if not source:
+                missing.append(pkg)
+                continue
+
+            try:
+                link_file(source, target)
+            except OSError as e:
+                log.warning("Failed to stage the package %s: %s", source, e)
+                missing.append(pkg)
+                continue
+
+            self._cached_size += pkg.downloadsize
+
+        log.debug("Staged %d of %d packages from the cache.",
+                  len(packages) - len(missing), len(packages))
+        return missing
+
+    def collect(self, packages, directory, verify=False):
+        """Add the downloaded files of the packages to the cache.
+
+        Only the files in the download directory are added. The local
+        files of the packages from the installation media are never
+        copied to the cache.
+
+        :param packages: a list of DNF packages
+        :param str directory: a path to the download directory
+        :param bool verify: verify the checksums of the files, it can be
+                            skipped only if DNF downloaded all of them
+        """
+        directory = os.path.join(os.path.abspath(directory), "")
+
+        for pkg in packages:
+            path = os.path.abspath(pkg.localPkg())
+
+            if path.startswith(directory) and os.path.exists(path):
+                self.add(pkg, path, verify=verify)
+
+    def clear(self):
+        """Remove the cached packages."""
+        if self._path and os.path.exists(self._path):
+            log.info("Removing the package cache: %s", self._path)
+            shutil.rmtree(self._path)
+
+        self._verified.clear()
@@ -0,0 +1,241 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from pyanaconda.core import util, constants
+
+from pyanaconda.anaconda_loggers import get_packaging_logger
+log = get_packaging_logger()
+
+__all__ = ["URLProbe", "ProbeResult"]
+
+# The time to wait for the responses of the probed URLs (in seconds).
+# If no URL responds in time, the race waits for the normal timeout.
+PROBE_DEADLINE = 10
+
+# The maximal number of URLs probed at once.
+PROBE_WORKERS = 8
+
+# The URL schemes supported by the probe.
+PROBE_SCHEMES = ("http://", "https://", "ftp://", "file://")
+
+
+class ProbeResult(object):
+    """The result of a probed URL."""
+
+    def __init__(self, url):
+        self.url = url
+        self.response = None
+        self.status_code = None
+        self.error = None
+        self.latency = None
+
+    @property
+    def valid(self):
+        """Is the response valid?"""
+        return self.response is not None
+
+    def __repr__(self):
+        if self.latency is None:
+            return "{}: no response".format(self.url)
+
+        return "{}: {} in {:.3f} s".format(self.url, self.status_code or self.error, self.latency)
+
+
+def is_probe_supported(url):
+    """Can the URL be probed?
+
+    :param str url: a URL
+    :return: True or False
+    """
+    return bool(url) and url.startswith(PROBE_SCHEMES)
+
+
+def _close_response(future):
+    """Close the response of a finished request."""
+    if future.cancelled():
+        return
+
+    response = future.result().response
+
+    if response is not None:
+        response.close()
+
+
+class URLProbe(object):
+    """A probe that requests several URLs at once.
+
+    A race of the URLs finds the most preferred URL that returns a
+    valid response, so an unreachable URL costs at most the deadline
+    of the probe and the other URLs don't have to wait for it. If no
+    URL responds before the deadline, the race waits for the normal
+    network timeout. The requests that lost the race are cancelled and
+    their responses are closed.
+
+    The latencies of all probed URLs are kept for diagnostics.
+    """
+
+    def __init__(self, session=None, deadline=PROBE_DEADLINE, workers=PROBE_WORKERS,
+                 **request_args):
+        """Create a new probe.
+
+        :param session: a requests session or None
+        :param deadline: the time to wait for the responses in seconds
+        :param workers: the maximal number of URLs probed at once
+        :param request_args: additional arguments of the requests
+        """
+        self._session = session or util.requests_session()
+        self._deadline = deadline
+        self._workers = workers
+        self._request_args = request_args
+        self._results = []
+        self._lock = threading.Lock()
+
+    @property
+    def results(self):
+        """A list of results of all probed URLs."""
+        with self._lock:
+            return list(self._results)
+
+    def _request(self, result, cancelled):
+        """Request the URL and record the result.
+
+        The response is closed if the request was cancelled.
+        """
+        start = time.monotonic()
+        session = self._session
+
+        # The FTP adapter keeps only one connection, so it can't be shared.
+        if result.url.startswith("ftp://"):
+            session = util.requests_session()
+
+        try:
+            response = session.get(
+                result.url, stream=True,
+                timeout=constants.NETWORK_CONNECTION_TIMEOUT,
+                **self._request_args
+            )
+        except requests.exceptions.RequestException as e:
+            result.error = str(e)
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Failed to probe %s: %r", result.url, e)
+            result.error = repr(e)
+        else:
+            result.status_code = response.status_code
+
+            if cancelled.is_set() or not 200 <= response.status_code < 400:
+                response.close()
+            else:
+                result.response = response
+
+        result.latency = time.monotonic() - start
+        log.debug("Probed %r.", result)
+
+        with self._lock:
+            self._results.append(result)
+
+        return result
+
+    @staticmethod
+    def _get_winner(results, futures):
+        """Get the most preferred valid result if it is known.
+
+        :return: a tuple of a flag if the race is decided and the result
+        """
+        for result, future in zip(results, futures):
+            if not future.done():
+                return False, None
+
+            if result.valid:
+                return True, result
+
+        return True, None
+
+    def race(self, urls, extra_urls=()):
+        """Find the most preferred URL that returns a valid response.
+
+        The extra URLs are probed at the same time only for diagnostics
+        and the race doesn't wait for them.
+
+        :param urls: a list of URLs ordered by their priority
+        :param extra_urls: a list of other URLs to probe
+        :return: a result with the response or None
+        """
+        results = [ProbeResult(url) for url in urls]
+        extra_results = [ProbeResult(url) for url in extra_urls if url not in urls]
+        cancelled = threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(self._workers, len(results) + len(extra_results))),
+            thread_name_prefix="AnaProbeThread"
+        )
+
+        try:
+            futures = [executor.submit(self._request, r, cancelled) for r in results]
+
+            # The responses of the extra URLs are never used.
+            diagnostics = threading.Event()
+            diagnostics.set()
+
+            for result in extra_results:
+                executor.submit(self._request, result, diagnostics)
+
+            start = time.monotonic()
+            deadline = start + self._deadline
+            fallback = start + constants.NETWORK_CONNECTION_TIMEOUT
+            decided, winner = self._get_winner(results, futures)
+
+            while not decided:
+                # Wait for the normal timeout if no URL responded in time.
+                answered = any(f.done() and r.valid for r, f in zip(results, futures))
+                timeout = (deadline if answered else fallback) - time.monotonic()
+
+                if timeout <= 0:
+                    break
+
+                wait([f for f in futures if not f.done()],
+                     timeout=timeout, return_when=FIRST_COMPLETED)
+                decided, winner = self._get_winner(results, futures)
+
+            if not decided:
+                # Take the best response that arrived in time.
+                winner = next((r for r, f in zip(results, futures) if f.done() and r.valid),
+                              None)
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=False)
+
+        # Close the responses of the losers.
+        for result, future in zip(results, futures):
+            if result is winner:
+                continue
+
+            future.cancel()
+            future.add_done_callback(_close_response)
+
+        for result in results:
+            if result.latency is None:
+                log.debug("Probed %r.", result)
+
+        if winner:
+            log.debug("Picked %s.", winner.url)
+
+        return winner
@@ -107,6 +107,14 @@ class RPMOSTreePayload(Payload):
             if errors.errorHandler.cb(exn) == errors.ERROR_RAISE:
                 raise exn
 
+    def _safe_copy_tree(self, srcpath, destpath):
+        """Like util.copy_tree, but treat errors as fatal"""
+        rc = util.copy_tree(srcpath, destpath)
+        if rc != 0:
+            exn = PayloadInstallError("cp %s %s exited with code %d" % (srcpath, destpath, rc))
+            if errors.errorHandler.cb(exn) == errors.ERROR_RAISE:
+                raise exn
+
     def _pull_progress_cb(self, asyncProgress):
         status = asyncProgress.get_status()
         outstanding_fetches = asyncProgress.get_uint('outstanding-fetches')
@@ -165,11 +173,10 @@ class RPMOSTreePayload(Payload):
                     for subname in os.listdir(srcpath):
                         sub_srcpath = os.path.join(srcpath, subname)
                         sub_destpath = os.path.join(destpath, subname)
-                        self._safe_exec_with_redirect('cp',
-                                                      ['-r', '-p', sub_srcpath, sub_destpath])
+                        self._safe_copy_tree(sub_srcpath, sub_destpath)
             else:
                 log.info("Copying bootloader data: %s", fname)
-                self._safe_exec_with_redirect('cp', ['-r', '-p', srcpath, destpath])
+                self._safe_copy_tree(srcpath, destpath)
 
             # Unfortunate hack, see https://github.com/rhinstaller/anaconda/issues/1188
             efi_grubenv_link = physboot + '/grub2/grubenv'
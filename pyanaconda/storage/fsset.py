@@ -19,6 +19,7 @@ import os
 import shutil
 import stat
 import time
+from functools import partial
 
 import gi
 gi.require_version("BlockDev", "2.0")
@@ -33,6 +34,7 @@ from blivet.storage_log import log_exception_info
 from pyanaconda.core.configuration.anaconda import conf
 from pyanaconda.errors import errorHandler as error_handler, ERROR_RAISE
 from pyanaconda.platform import platform as _platform, EFI
+from pyanaconda.storage.mount import MountPlanner
 
 from pyanaconda.anaconda_loggers import get_module_logger
 log = get_module_logger(__name__)
@@ -228,6 +230,13 @@ class FSSet(object):
         self._fstab_swaps = set()
         self.preserve_lines = []     # lines we just ignore and preserve
 
+        # Device and format methods are serialized by the global lock
+        # of blivet, so the planned batches are processed on the calling
+        # thread by default. The lock is also held by the callers from
+        # InstallerStorage, so workers would deadlock there.
+        self.mount_workers = 1
+        self.mount_timings = {}      # mount point -> seconds spent
+
     @property
     def sysfs(self):
         if not self._sysfs:
@@ -470,6 +479,8 @@ class FSSet(object):
 
     def turn_on_swap(self, root_path=""):
         """Activate the system's swap space."""
+        devices = []
+
         for device in self.swap_devices:
             if isinstance(device, FileDevice):
                 # set up FileDevices' parents now that they are accessible
@@ -484,38 +495,68 @@ class FSSet(object):
                 else:
                     device.parents = [parent]
 
-            while True:
-                if device.status and device.format.status:
-                    break
-                try:
-                    device.setup()
-                    device.format.setup()
-                except (blockdev.SwapOldError, blockdev.SwapSuspendError,
-                        blockdev.SwapUnknownError, blockdev.SwapPagesizeError) as e:
-                    log.error("Failed to activate swap on '%s': %s", device.name, str(e))
-                    break
-                except (StorageError, blockdev.BlockDevError) as e:
+            devices.append(device)
+
+        # The swap devices don't depend on each other.
+        while devices:
+            results = MountPlanner.run_batch(devices, self._activate_swap, self.mount_workers)
+            devices = []
+
+            for result in results:
+                self._record_timing(result, "activated swap on %s", result.device.name)
+                e = result.error
+
+                if isinstance(e, (blockdev.SwapOldError, blockdev.SwapSuspendError,
+                                  blockdev.SwapUnknownError, blockdev.SwapPagesizeError)):
+                    log.error("Failed to activate swap on '%s': %s", result.device.name, str(e))
+                elif isinstance(e, (StorageError, blockdev.BlockDevError)):
                     if error_handler.cb(e) == ERROR_RAISE:
-                        raise
-                else:
-                    break
+                        raise e
+                    # try again
+                    devices.append(result.device)
+                elif e:
+                    raise e
+
+    def _activate_swap(self, device):
+        """Activate the given swap device."""
+        if device.status and device.format.status:
+            return
+
+        device.setup()
+        device.format.setup()
+
+    def _record_timing(self, result, msg, *args):
+        """Record and log the time spent on the given mount operation."""
+        key = getattr(result.device.format, "mountpoint", None) or result.device.name
+        self.mount_timings[key] = result.elapsed
+        log.debug("%s in %.3f s", msg % args, result.elapsed)
+
+    def _get_mount_devices(self):
+        """Return all devices that can be mounted or unmounted."""
+        devices = list(self.mountpoints.values()) + self.swap_devices
+        devices.extend([self.dev, self.devshm, self.devpts, self.sysfs,
+                        self.proc, self.selinux, self.usb, self.run])
+
+        if isinstance(_platform, EFI):
+            devices.append(self.efivars)
+
+        devices.sort(key=lambda d: getattr(d.format, "mountpoint", ""))
+        return devices
 
     def mount_filesystems(self, root_path="", read_only=None, skip_root=False):
         """Mount the system's filesystems.
 
+        The mount points are mounted in batches planned by the mount
+        planner. Parents are always mounted before their children.
+
         :param str root_path: the root directory for this filesystem
         :param read_only: read only option str for this filesystem
         :type read_only: str or None
         :param bool skip_root: whether to skip mounting the root filesystem
         """
-        devices = list(self.mountpoints.values()) + self.swap_devices
-        devices.extend([self.dev, self.devshm, self.devpts, self.sysfs,
-                        self.proc, self.selinux, self.usb, self.run])
-        if isinstance(_platform, EFI):
-            devices.append(self.efivars)
-        devices.sort(key=lambda d: getattr(d.format, "mountpoint", ""))
+        devices = []
 
-        for device in devices:
+        for device in self._get_mount_devices():
             if not device.format.mountable or not device.format.mountpoint:
                 continue
 
@@ -526,64 +567,101 @@ class FSSet(object):
             if "noauto" in options.split(","):
                 continue
 
-            if device.format.type == "bind" and device not in [self.dev, self.run]:
-                # set up the DirectoryDevice's parents now that they are
-                # accessible
-                #
-                # -- bind formats' device and mountpoint are always both
-                #    under the chroot. no exceptions. none, damn it.
-                target_dir = "%s/%s" % (root_path, device.path)
-                parent = get_containing_device(target_dir, self.devicetree)
-                if not parent:
-                    log.error("cannot determine which device contains "
-                              "directory %s", device.path)
-                    device.parents = []
-                    self.devicetree._remove_device(device)
-                    continue
-                else:
-                    device.parents = [parent]
+            devices.append(device)
 
-            try:
-                device.setup()
-            except Exception as e:  # pylint: disable=broad-except
-                log_exception_info(fmt_str="unable to set up device %s", fmt_args=[device])
-                if error_handler.cb(e) == ERROR_RAISE:
-                    raise
-                else:
-                    continue
+        planner = MountPlanner(devices)
+
+        for batch in planner.mount_batches:
+            batch = [d for d in batch if self._set_up_bind_parents(d, root_path)]
+            results = MountPlanner.run_batch(
+                batch,
+                partial(self._mount_device, root_path=root_path, read_only=read_only),
+                self.mount_workers
+            )
 
-            if read_only:
-                options = "%s,%s" % (options, read_only)
+            for result in results:
+                self._record_timing(result, "mounted %s on %s",
+                                    result.device.path, result.device.format.mountpoint)
 
-            try:
-                device.format.setup(options=options,
-                                    chroot=root_path)
-            except Exception as e:  # pylint: disable=broad-except
-                log_exception_info(log.error, "error mounting %s on %s", [device.path, device.format.mountpoint])
-                if error_handler.cb(e) == ERROR_RAISE:
-                    raise
+                if result.error and error_handler.cb(result.error) == ERROR_RAISE:
+                    raise result.error
 
         self.active = True
 
+    def _set_up_bind_parents(self, device, root_path):
+        """Set up the parents of the bind device.
+
+        :return: False if the device should be skipped, otherwise True
+        """
+        if device.format.type == "bind" and device not in [self.dev, self.run]:
+            # set up the DirectoryDevice's parents now that they are
+            # accessible
+            #
+            # -- bind formats' device and mountpoint are always both
+            #    under the chroot. no exceptions. none, damn it.
+            target_dir = "%s/%s" % (root_path, device.path)
+            parent = get_containing_device(target_dir, self.devicetree)
+            if not parent:
+                log.error("cannot determine which device contains "
+                          "directory %s", device.path)
+                device.parents = []
+                self.devicetree._remove_device(device)
+                return False
+            else:
+                device.parents = [parent]
+
+        return True
+
+    def _mount_device(self, device, root_path="", read_only=None):
+        """Set up and mount the given device."""
+        try:
+            device.setup()
+        except Exception:  # pylint: disable=broad-except
+            log_exception_info(fmt_str="unable to set up device %s", fmt_args=[device])
+            raise
+
+        options = device.format.options
+        if read_only:
+            options = "%s,%s" % (options, read_only)
+
+        try:
+            device.format.setup(options=options,
+                                chroot=root_path)
+        except Exception:  # pylint: disable=broad-except
+            log_exception_info(log.error, "error mounting %s on %s", [device.path, device.format.mountpoint])
+            raise
+
     def umount_filesystems(self, swapoff=True):
         """Unmount filesystems.
 
-        Exclude swap if swapoff is False.
+        Exclude swap if swapoff is False. The mount points are unmounted
+        in the reverse order of the mount planner's batches.
         """
-        devices = list(self.mountpoints.values()) + self.swap_devices
-        devices.extend([self.dev, self.devshm, self.devpts, self.sysfs,
-                        self.proc, self.usb, self.selinux, self.run])
-        if isinstance(_platform, EFI):
-            devices.append(self.efivars)
-        devices.sort(key=lambda d: getattr(d.format, "mountpoint", ""))
-        devices.reverse()
-        for device in devices:
+        devices = []
+
+        for device in self._get_mount_devices():
             if (not device.format.mountable) or \
                (device.format.type == "swap" and not swapoff):
                 continue
 
+            devices.append(device)
+
+        planner = MountPlanner(devices)
+
+        for batch in planner.umount_batches:
             # Unmount the devices
-            device.format.teardown()
+            results = MountPlanner.run_batch(
+                list(reversed(batch)),
+                lambda d: d.format.teardown(),
+                self.mount_workers
+            )
+
+            for result in results:
+                self._record_timing(result, "unmounted %s", result.device.path)
+
+            errors = [result.error for result in results if result.error]
+            if errors:
+                raise errors[0]
 
         self.active = False
 
@@ -0,0 +1,187 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = ["MountPlanner", "MountResult", "get_parent_mountpoint"]
+
+
+MountResult = namedtuple("MountResult", ["device", "elapsed", "error"])
+
+
+def get_parent_mountpoint(path, mountpoints):
+    """Return the closest mount point that contains the given path.
+
+    :param str path: an absolute path
+    :param mountpoints: a collection of mount points
+    :return: a mount point or None
+    """
+    path = os.path.normpath(path)
+
+    while path != "/":
+        path = os.path.dirname(path)
+
+        if path in mountpoints:
+            return path
+
+    return None
+
+
+def _get_mountpoint(device):
+    """Return the mount point of the device or an empty string."""
+    return getattr(device.format, "mountpoint", None) or ""
+
+
+class MountPlanner(object):
+    """Plan the mount and unmount operations of a set of devices.
+
+    The mount points are organized into a dependency tree. A device
+    depends on the device mounted at the closest parent mount point
+    and, in case of a bind mount, also on the device that contains
+    the source directory of the bind mount.
+
+    The devices are split into batches. Devices in the same batch
+    don't depend on each other and can be processed concurrently.
+    Every batch is processed after all its dependencies are done.
+    """
+
+    def __init__(self, devices):
+        """Create a new mount planner.
+
+        :param devices: a list of devices to plan
+        """
+        self._devices = list(devices)
+        self._batches = self._create_batches()
+
+    @property
+    def mount_batches(self):
+        """Batches of devices in the order they should be mounted.
+
+        :return: a list of lists of devices
+        """
+        return [list(batch) for batch in self._batches]
+
+    @property
+    def umount_batches(self):
+        """Batches of devices in the order they should be unmounted.
+
+        :return: a list of lists of devices
+        """
+        return [list(batch) for batch in reversed(self._batches)]
+
+    def _get_dependencies(self, index, device, mountpoints):
+        """Return indexes of devices the given device depends on."""
+        mountpoint = _get_mountpoint(device)
+        paths = []
+
+        if mountpoint:
+            paths.append(mountpoint)
+
+        if getattr(device.format, "type", None) == "bind":
+            paths.append(device.path)
+
+        dependencies = set()
+
+        for path in paths:
+            parent = get_parent_mountpoint(path, mountpoints)
+
+            if parent:
+                dependencies.update(i for i in mountpoints[parent] if i != index)
+
+        # Devices with the same mount point are processed in the given order.
+        if mountpoint in mountpoints:
+            dependencies.update(i for i in mountpoints[mountpoint] if i < index)
+
+        return dependencies
+
+    def _create_batches(self):
+        """Split the devices into ordered batches."""
+        mountpoints = {}
+
+        for index, device in enumerate(self._devices):
+            mountpoint = _get_mountpoint(device)
+
+            if mountpoint:
+                mountpoints.setdefault(mountpoint, []).append(index)
+
+        dependencies = {
+            index: self._get_dependencies(index, device, mountpoints)
+            for index, device in enumerate(self._devices)
+        }
+
+        depths = {}
+
+        def get_depth(index, visited):
+            if index in depths:
+                return depths[index]
+
+            # Ignore dependency cycles created by unusual bind mounts.
+            visited = visited | {index}
+            parents = [i for i in dependencies[index] if i not in visited]
+            depths[index] = 1 + max((get_depth(i, visited) for i in parents), default=-1)
+            return depths[index]
+
+        order = sorted(range(len(self._devices)),
+                       key=lambda i: (_get_mountpoint(self._devices[i]), i))
+
+        for index in order:
+            get_depth(index, set())
+
+        batches = []
+
+        for index in order:
+            depth = depths[index]
+
+            while len(batches) <= depth:
+                batches.append([])
+
+            batches[depth].append(self._devices[index])
+
+        return [batch for batch in batches if batch]
+
+    @staticmethod
+    def run_batch(batch, action, max_workers=1):
+        """Run an action for every device in the batch.
+
+        Exceptions raised by the action are not propagated. They are
+        returned in the results, so the caller can handle them in its
+        own thread.
+
+        :param batch: a list of devices
+        :param action: a function that takes a device
+        :param int max_workers: a maximal number of concurrent workers
+        :return: a list of mount results in the order of the batch
+        """
+        def _run(device):
+            start = time.monotonic()
+            error = None
+
+            try:
+                action(device)
+            except Exception as e:  # pylint: disable=broad-except
+                error = e
+
+            return MountResult(device, time.monotonic() - start, error)
+
+        if max_workers <= 1 or len(batch) <= 1:
+            return [_run(device) for device in batch]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batch))) as executor:
+            return list(executor.map(_run, batch))
@@ -24,6 +24,7 @@ configuration, valid timezones recognition etc.
 
 import pytz
 import langtable
+import threading
 from collections import OrderedDict
 
 from pyanaconda.core import util
@@ -52,6 +53,93 @@ class TimezoneConfigError(Exception):
     """Exception class for timezone configuration related problems"""
     pass
 
+class TimezoneIndex(object):
+    """
+    Frozen index of the timezones known to the installer.
+
+    The index is built only once per process (see get_timezone_index) and
+    provides constant time validity checks, a prebuilt mapping of regions to
+    their cities and cached timezones of territories.
+
+    """
+
+    def __init__(self, common_timezones, etc_zones):
+        """
+        :param common_timezones: a list of common timezones (e.g. 'Europe/Prague')
+        :param etc_zones: a list of zones of the Etc region (e.g. 'GMT+1')
+        """
+
+        regions = OrderedDict()
+
+        for tz in common_timezones:
+            parts = tz.split("/", 1)
+
+            if len(parts) > 1:
+                regions.setdefault(parts[0], set()).add(parts[1])
+
+        regions["Etc"] = set(etc_zones)
+
+        self._regions = OrderedDict((region, frozenset(cities))
+                                    for region, cities in regions.items())
+        self._timezones = frozenset(common_timezones) | \
+            frozenset("Etc/" + zone for zone in etc_zones)
+        self._territory_timezones = dict()
+        self._territory_lock = threading.Lock()
+
+    @property
+    def regions(self):
+        """
+        A dictionary mapping the regions to frozen sets of their cities.
+
+        :rtype: OrderedDict
+
+        """
+
+        return OrderedDict(self._regions)
+
+    def is_valid(self, timezone):
+        """Check if a given string is an existing timezone."""
+
+        return timezone in self._timezones
+
+    def get_territory_timezones(self, territory):
+        """
+        Get timezones of a given territory ordered by langtable's ranking.
+
+        :param territory: territory to get timezones for
+        :type territory: str
+        :rtype: tuple(str)
+
+        """
+
+        with self._territory_lock:
+            if territory not in self._territory_timezones:
+                timezones = tuple(langtable.list_timezones(territoryId=territory))
+                self._territory_timezones[territory] = timezones
+
+            return self._territory_timezones[territory]
+
+_timezone_index = None
+_timezone_index_lock = threading.Lock()
+
+def get_timezone_index():
+    """
+    Get the timezone index shared by the whole process.
+
+    The index is built on the first call.
+
+    :rtype: TimezoneIndex
+
+    """
+
+    global _timezone_index
+
+    with _timezone_index_lock:
+        if _timezone_index is None:
+            _timezone_index = TimezoneIndex(pytz.common_timezones, ETC_ZONES)
+
+        return _timezone_index
+
 def time_initialize(timezone_proxy, storage):
     """
     Try to guess if RTC uses UTC time or not, set timezone.isUtc properly and
@@ -120,7 +208,7 @@ def get_preferred_timezone(territory):
 
     """
 
-    timezones = langtable.list_timezones(territoryId=territory)
+    timezones = get_timezone_index().get_territory_timezones(territory)
     if not timezones:
         return None
 
@@ -128,24 +216,13 @@ def get_preferred_timezone(territory):
 
 def get_all_regions_and_timezones():
     """
-    Get a dictionary mapping the regions to the list of their timezones.
+    Get a dictionary mapping the regions to the frozen sets of their timezones.
 
     :rtype: dict
 
     """
 
-    result = OrderedDict()
-
-    for tz in pytz.common_timezones:
-        parts = tz.split("/", 1)
-
-        if len(parts) > 1:
-            if parts[0] not in result:
-                result[parts[0]] = set()
-            result[parts[0]].add(parts[1])
-
-    result["Etc"] = set(ETC_ZONES)
-    return result
+    return get_timezone_index().regions
 
 def is_valid_timezone(timezone):
     """
@@ -156,9 +233,7 @@ def is_valid_timezone(timezone):
 
     """
 
-    etc_zones = ["Etc/" + zone for zone in ETC_ZONES]
-
-    return timezone in pytz.common_timezones + etc_zones
+    return get_timezone_index().is_valid(timezone)
 
 def get_timezone(timezone):
     """
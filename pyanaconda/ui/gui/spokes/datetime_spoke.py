@@ -260,11 +260,14 @@ class NTPconfigDialog(GUIObject, GUIDialogInputCheckHandler):
         self._serverEntry.grab_focus()
 
     def refresh_servers_state(self):
+        itrs = []
         itr = self._serversStore.get_iter_first()
         while itr:
-            self._refresh_server_working(itr)
+            itrs.append(itr)
             itr = self._serversStore.iter_next(itr)
 
+        self._refresh_servers_working(itrs)
+
     def run(self):
         self.window.show()
         rc = self.window.run()
@@ -288,12 +291,12 @@ class NTPconfigDialog(GUIObject, GUIDialogInputCheckHandler):
 
         return rc
 
-    def _set_server_ok_nok(self, itr, epoch_started):
+    def _set_servers_ok_nok(self, items, epoch_started):
         """
-        If the server is working, set its data to NTP_SERVER_OK, otherwise set its
-        data to NTP_SERVER_NOK.
+        If the servers are working, set their data to NTP_SERVER_OK, otherwise set
+        their data to NTP_SERVER_NOK. All servers are probed at once.
 
-        :param itr: iterator of the $server's row in the self._serversStore
+        :param items: list of (itr, hostname) tuples of rows in the self._serversStore
 
         """
 
@@ -311,8 +314,7 @@ class NTPconfigDialog(GUIObject, GUIDialogInputCheckHandler):
             (store, itr, column, value) = arg_tuple
             store.set_value(itr, column, value)
 
-        orig_hostname = self._serversStore[itr][SERVER_HOSTNAME]
-        server_working = ntp.ntp_server_working(self._serversStore[itr][SERVER_HOSTNAME])
+        results = ntp.probe_ntp_servers(hostname for _itr, hostname in items)
 
         #do not let dialog change epoch while we are modifying data
         self._epoch_lock.acquire()
@@ -320,10 +322,13 @@ class NTPconfigDialog(GUIObject, GUIDialogInputCheckHandler):
         #check if we are in the same epoch as the dialog (and the serversStore)
         #and if the server wasn't changed meanwhile
         if epoch_started == self._epoch:
-            actual_hostname = self._serversStore[itr][SERVER_HOSTNAME]
+            for itr, orig_hostname in items:
+                actual_hostname = self._serversStore[itr][SERVER_HOSTNAME]
+
+                if orig_hostname != actual_hostname:
+                    continue
 
-            if orig_hostname == actual_hostname:
-                if server_working:
+                if results[orig_hostname].working:
                     set_store_value((self._serversStore,
                                      itr, SERVER_WORKING, constants.NTP_SERVER_OK))
                 else:
@@ -331,14 +336,24 @@ class NTPconfigDialog(GUIObject, GUIDialogInputCheckHandler):
                                      itr, SERVER_WORKING, constants.NTP_SERVER_NOK))
         self._epoch_lock.release()
 
-    @async_action_nowait
     def _refresh_server_working(self, itr):
-        """ Runs a new thread with _set_server_ok_nok(itr) as a taget. """
+        """ Refresh the state of the server in the given row. """
+        self._refresh_servers_working([itr])
+
+    @async_action_nowait
+    def _refresh_servers_working(self, itrs):
+        """ Runs one new thread with _set_servers_ok_nok(items) as a target. """
+        if not itrs:
+            return
+
+        items = []
+        for itr in itrs:
+            self._serversStore.set_value(itr, SERVER_WORKING, constants.NTP_SERVER_QUERY)
+            items.append((itr, self._serversStore[itr][SERVER_HOSTNAME]))
 
-        self._serversStore.set_value(itr, SERVER_WORKING, constants.NTP_SERVER_QUERY)
         threadMgr.add(AnacondaThread(prefix=constants.THREAD_NTP_SERVER_CHECK,
-                                     target=self._set_server_ok_nok,
-                                     args=(itr, self._epoch)))
+                                     target=self._set_servers_ok_nok,
+                                     args=(items, self._epoch)))
 
     def _add_server(self, server, pool=False):
         """
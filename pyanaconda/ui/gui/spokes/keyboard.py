@@ -70,6 +70,26 @@ class AddLayoutDialog(GUIObject):
         super().__init__(data)
         self._xkl_wrapper = XklWrapper.get_instance()
         self._chosen_layouts = []
+        self._search_terms = {}
+
+    def _get_search_terms(self, value):
+        """Get the strings the given layout can be found by.
+
+        The strings are computed only once for every layout.
+
+        :param value: layout-variant specification
+        :return: a tuple of the english, translated and transliterated descriptions
+        """
+        terms = self._search_terms.get(value)
+
+        if terms is None:
+            eng_value = self._xkl_wrapper.get_layout_variant_description(value, xlated=False)
+            xlated_value = self._xkl_wrapper.get_layout_variant_description(value)
+            translit_value = strip_accents(xlated_value).lower()
+            terms = (eng_value, xlated_value, translit_value)
+            self._search_terms[value] = terms
+
+        return terms
 
     def matches_entry(self, model, itr, user_data=None):
         entry_text = self._entry.get_text()
@@ -78,13 +98,9 @@ class AddLayoutDialog(GUIObject):
             return True
 
         value = model[itr][0]
-        eng_value = self._xkl_wrapper.get_layout_variant_description(value, xlated=False)
-        xlated_value = self._xkl_wrapper.get_layout_variant_description(value)
-        translit_value = strip_accents(xlated_value).lower()
         entry_text = entry_text.lower()
 
-        return have_word_match(entry_text, eng_value) or have_word_match(entry_text, xlated_value) \
-            or have_word_match(entry_text, translit_value)
+        return any(have_word_match(entry_text, term) for term in self._get_search_terms(value))
 
     def compare_layouts(self, model, itr1, itr2, user_data=None):
         """
@@ -95,8 +111,8 @@ class AddLayoutDialog(GUIObject):
 
         value1 = model[itr1][0]
         value2 = model[itr2][0]
-        show_str1 = self._xkl_wrapper.get_layout_variant_description(value1)
-        show_str2 = self._xkl_wrapper.get_layout_variant_description(value2)
+        show_str1 = self._get_search_terms(value1)[1]
+        show_str2 = self._get_search_terms(value2)[1]
 
         return locale_mod.strcoll(show_str1, show_str2)
 
@@ -126,8 +142,13 @@ class AddLayoutDialog(GUIObject):
                                      target=self._initialize))
 
     def _initialize(self):
-        gtk_batch_map(self._addLayout, self._xkl_wrapper.get_available_layouts(),
-                      args=(self._store,), batch_size=20)
+        layouts = self._xkl_wrapper.get_available_layouts()
+
+        # prepare the search terms in this thread, not in the filter callbacks
+        for layout in layouts:
+            self._get_search_terms(layout)
+
+        gtk_batch_map(self._addLayout, layouts, args=(self._store,), batch_size=20)
 
     def wait_initialize(self):
         threadMgr.wait(THREAD_ADD_LAYOUTS_INIT)
@@ -24,13 +24,12 @@ screens handling languages or locales configuration.
 
 import gi
 gi.require_version("Gtk", "3.0")
-gi.require_version("Pango", "1.0")
 gi.require_version("GdkPixbuf", "2.0")
 
-from gi.repository import Gtk, Pango, GdkPixbuf
+from gi.repository import Gtk, GdkPixbuf
 
 from pyanaconda import localization
-from pyanaconda.core.util import strip_accents
+from pyanaconda.ui.lib.search import SearchIndex
 from pyanaconda.ui.gui.utils import set_treeview_selection, timed_action, override_cell_property
 
 class LangLocaleHandler(object):
@@ -57,6 +56,9 @@ class LangLocaleHandler(object):
         self._right_arrow = None
         self._left_arrow = None
 
+        # the index of languages for the filter of the language store
+        self._language_index = SearchIndex()
+
         self.payload = payload
 
     def initialize(self):
@@ -74,9 +76,10 @@ class LangLocaleHandler(object):
         langs = localization.get_available_translations()
         langs = self._filter_languages(langs)
         for lang in langs:
-            self._add_language(self._languageStore,
-                               localization.get_native_name(lang),
-                               localization.get_english_name(lang), lang)
+            native = localization.get_native_name(lang)
+            english = localization.get_english_name(lang)
+            self._add_language(self._languageStore, native, english, lang)
+            self._language_index.add(lang, [native, english, lang])
 
         # make filtering work
         self._languageStoreFilter.set_visible_func(self._matches_entry, None)
@@ -87,21 +90,10 @@ class LangLocaleHandler(object):
         if not entry:
             return True
 
-        # Need to strip out the pango markup before attempting to match.
-        # Otherwise, starting to type "span" for "spanish" will match everything
-        # due to the enclosing span tag.
-        # (success, attrs, native, accel)
-        native = Pango.parse_markup(model[itr][0], -1, "_")[2]
-        english = model[itr][1]
-
         # Otherwise, filter the list showing only what is matched by the
-        # text entry.  Either the English or native names can match.
-        lowered = entry.lower()
-        translit = strip_accents(native).lower()
-        if lowered in native.lower() or lowered in english.lower() or lowered in translit:
-            return True
-        else:
-            return False
+        # text entry. The native or English names or the code can match.
+        # The index remembers the last search, so it runs once per refilter.
+        return model[itr][2] in self._language_index.search(entry)
 
     def _render_lang_selected(self, column, renderer, model, itr, user_data=None):
         (lang_store, sel_itr) = self._langSelection.get_selected()
@@ -349,6 +349,12 @@ class SoftwareSelectionSpoke(NormalSpoke):
             # It's better to have all or nothing selected from kickstart
             self._addon_states = {}
 
+        # The payload thread might have translated the comps metadata
+        # before the language was selected. Translate them here, so the
+        # refresh in the main thread doesn't have to.
+        if not self._error:
+            self.payload.load_descriptions()
+
         if not self._kickstarted:
             # having done all the slow downloading, we need to do the first refresh
             # of the UI here so there's an environment selected by default.  This
@@ -35,13 +35,14 @@ from gi.repository import GdkX11, Xkl
 
 import threading
 import gettext
-from collections import namedtuple
 
 from pyanaconda.core import util
 from pyanaconda.core.configuration.anaconda import conf
 from pyanaconda.core.constants import DEFAULT_KEYBOARD
 from pyanaconda.keyboard import join_layout_variant, parse_layout_variant, KeyboardConfigError, InvalidLayoutVariantSpec
 from pyanaconda.core.async_utils import async_action_wait
+from pyanaconda.xkb_index import LayoutInfo, XkbRegistryIndex, XKB_INDEX_CACHE_PATH, \
+    get_registry_stamp
 
 from pyanaconda.anaconda_loggers import get_module_logger
 log = get_module_logger(__name__)
@@ -49,9 +50,6 @@ log = get_module_logger(__name__)
 Xkb_ = lambda x: gettext.translation("xkeyboard-config", fallback=True).gettext(x)
 iso_ = lambda x: gettext.translation("iso_639", fallback=True).gettext(x)
 
-# namedtuple for information about a keyboard layout (its language and description)
-LayoutInfo = namedtuple("LayoutInfo", ["lang", "desc"])
-
 class XklWrapperError(KeyboardConfigError):
     """Exception class for reporting libxklavier-related problems"""
 
@@ -110,15 +108,43 @@ class XklWrapper(object):
                     # really wrong
                     raise XklWrapperError("Failed to initialize layouts")
 
-        #needed also for Gkbd.KeyboardDrawingDialog
-        self.configreg = Xkl.ConfigRegistry.get_instance(self._engine)
-        self.configreg.load(False)
+        self._configreg = None
+        self._configreg_lock = threading.Lock()
 
         self._layout_infos = dict()
         self._layout_infos_lock = threading.RLock()
         self._switch_opt_infos = dict()
         self._switch_opt_infos_lock = threading.RLock()
 
+        #walking the registry takes quite a long time, try the cached index first
+        stamp = get_registry_stamp()
+        index = XkbRegistryIndex.load(XKB_INDEX_CACHE_PATH, stamp)
+
+        if index:
+            log.debug("Using the cached XKB registry index.")
+            self._layout_infos.update(index.layouts)
+            self._switch_opt_infos.update(index.switching_options)
+        else:
+            self._load_registry()
+            index = XkbRegistryIndex(self._layout_infos, self._switch_opt_infos)
+            index.save(XKB_INDEX_CACHE_PATH, stamp)
+
+    @property
+    def configreg(self):
+        """The XKB configuration registry.
+
+        It is loaded on demand, because the cached index is used otherwise.
+        It is needed also for Gkbd.KeyboardDrawingDialog.
+        """
+        with self._configreg_lock:
+            if not self._configreg:
+                self._configreg = Xkl.ConfigRegistry.get_instance(self._engine)
+                self._configreg.load(False)
+
+            return self._configreg
+
+    def _load_registry(self):
+        """Read layouts and switching options from the registry."""
         #this might take quite a long time
         self.configreg.foreach_language(self._get_language_variants, None)
         self.configreg.foreach_country(self._get_country_variants, None)
@@ -0,0 +1,120 @@
+#
+# User interface library functions for searching
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+from pyanaconda.core.util import strip_accents
+
+__all__ = ["SearchIndex", "fold_search_text"]
+
+# separator of the searchable terms of one item
+TERM_SEPARATOR = "\0"
+
+
+def fold_search_text(text):
+    """Fold the text for a case and accent insensitive search.
+
+    :param str text: a text to fold
+    :return: a lower-cased text without diacritics
+    """
+    return strip_accents(text).lower()
+
+
+class SearchIndex(object):
+    """Index of items that can be found by their names.
+
+    Every item is identified by a key and can be found by a substring
+    or a prefix of any of its names. The names are stored lower-cased
+    and also folded, so the search is case and accent insensitive.
+
+    The result of the last search is remembered. If the user refines
+    the query by typing more characters, only the previous matches are
+    searched again.
+    """
+
+    def __init__(self):
+        self._terms = {}
+        self._words = {}
+        self._last_search = None
+
+    @property
+    def keys(self):
+        """A frozen set of keys of all indexed items."""
+        return frozenset(self._terms)
+
+    def add(self, key, names):
+        """Add an item to the index.
+
+        :param key: a hashable key of the item (e.g. a language code)
+        :param names: a list of names of the item
+        """
+        terms = []
+
+        for name in names:
+            if not name:
+                continue
+
+            terms.append(name.lower())
+            terms.append(fold_search_text(name))
+
+        terms = list(dict.fromkeys(terms))
+        self._terms[key] = TERM_SEPARATOR.join(terms)
+        self._words[key] = tuple(set(terms) | {word for term in terms for word in term.split()})
+        self._last_search = None
+
+    def clear(self):
+        """Remove all items from the index."""
+        self._terms.clear()
+        self._words.clear()
+        self._last_search = None
+
+    def search(self, text, prefix=False):
+        """Find items matching the given text.
+
+        :param str text: a text to search for
+        :param bool prefix: match only the beginnings of the names or their words
+        :return: a frozen set of keys of the matching items
+        """
+        text = text.strip().lower()
+
+        if not text:
+            return self.keys
+
+        queries = {text, fold_search_text(text)}
+        candidates = self._terms.keys()
+
+        # The matches of a refined query are a subset of the previous ones.
+        if self._last_search:
+            last_text, last_prefix, last_result = self._last_search
+
+            if text == last_text and prefix == last_prefix:
+                return last_result
+
+            if last_text in text and (not prefix or text.startswith(last_text)) \
+                    and prefix == last_prefix:
+                candidates = last_result
+
+        if prefix:
+            result = frozenset(key for key in candidates
+                               if any(word.startswith(query)
+                                      for word in self._words[key] for query in queries))
+        else:
+            result = frozenset(key for key in candidates
+                               if any(query in self._terms[key] for query in queries))
+
+        self._last_search = (text, prefix, result)
+        return result
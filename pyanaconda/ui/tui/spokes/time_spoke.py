@@ -109,26 +109,27 @@ class TimeSpoke(FirstbootSpokeMixIn, NormalTUISpoke):
 
         :param list servers: list of servers to check
         """
-        for server in servers:
-            threadMgr.add(AnacondaThread(prefix=constants.THREAD_NTP_SERVER_CHECK,
-                                         target=self._check_ntp_server,
-                                         args=(server,)))
+        threadMgr.add(AnacondaThread(prefix=constants.THREAD_NTP_SERVER_CHECK,
+                                     target=self._check_ntp_servers,
+                                     args=(list(servers),)))
+
+    def _check_ntp_servers(self, servers):
+        """Check if NTP servers appear to be working.
 
-    def _check_ntp_server(self, server):
-        """Check if an NTP server appears to be working.
+        All servers are probed at once.
 
-        :param str server: NTP server address
-        :returns: True if the server appears to be working, False if not
-        :rtype: bool
+        :param list servers: NTP server addresses
         """
-        log.debug("checking NTP server %s", server)
-        result = ntp.ntp_server_working(server)
-        if result:
-            log.debug("NTP server %s appears to be working", server)
-            self.set_ntp_server_status(server, constants.NTP_SERVER_OK)
-        else:
-            log.debug("NTP server %s appears not to be working", server)
-            self.set_ntp_server_status(server, constants.NTP_SERVER_NOK)
+        log.debug("checking NTP servers %s", servers)
+        results = ntp.probe_ntp_servers(servers)
+
+        for server in servers:
+            if results[server].working:
+                log.debug("NTP server %s appears to be working", server)
+                self.set_ntp_server_status(server, constants.NTP_SERVER_OK)
+            else:
+                log.debug("NTP server %s appears not to be working", server)
+                self.set_ntp_server_status(server, constants.NTP_SERVER_NOK)
 
     @property
     def ntp_servers(self):
@@ -282,11 +283,10 @@ class TimeZoneSpoke(NormalTUISpoke):
 
         self.title = N_("Timezone settings")
         self._container = None
-        # it's stupid to call get_all_regions_and_timezones twice, but regions
-        # needs to be unsorted in order to display in the same order as the GUI
-        # so whatever
-        self._regions = list(timezone.get_all_regions_and_timezones().keys())
-        self._timezones = dict((k, sorted(v)) for k, v in timezone.get_all_regions_and_timezones().items())
+        # regions need to be unsorted in order to display in the same order as the GUI
+        regions_and_timezones = timezone.get_all_regions_and_timezones()
+        self._regions = list(regions_and_timezones.keys())
+        self._timezones = dict((k, sorted(v)) for k, v in regions_and_timezones.items())
         self._lower_regions = [r.lower() for r in self._regions]
 
         self._zones = ["%s/%s" % (region, z) for region in self._timezones for z in self._timezones[region]]
@@ -0,0 +1,167 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+
+"""
+This module provides an index of the XKB configuration registry.
+
+Walking the registry with libxklavier takes a lot of time, so the layouts,
+their descriptions, languages and countries and the layout switching options
+are stored in a file and loaded from it on later runs. The cached index is
+valid as long as the registry files of xkeyboard-config are not modified.
+
+"""
+
+import json
+import os
+from collections import namedtuple
+
+from pyanaconda.anaconda_loggers import get_module_logger
+log = get_module_logger(__name__)
+
+# the directory with the registry files of xkeyboard-config
+XKB_RULES_DIR = "/usr/share/X11/xkb/rules"
+
+# the default location of the cached index
+XKB_INDEX_CACHE_PATH = "/var/cache/anaconda/xkb-index.json"
+
+# the version of the format of the cached index
+XKB_INDEX_VERSION = 1
+
+# namedtuple for information about a keyboard layout (its language and description)
+LayoutInfo = namedtuple("LayoutInfo", ["lang", "desc"])
+
+
+def get_registry_stamp(rules_dir=XKB_RULES_DIR):
+    """Get a stamp of the registry files of xkeyboard-config.
+
+    The stamp changes if any of the registry files is added, removed
+    or modified.
+
+    :param str rules_dir: a path to the directory with the registry files
+    :return: a list of [name, mtime, size] lists or an empty list
+    """
+    stamp = []
+
+    try:
+        names = sorted(os.listdir(rules_dir))
+    except OSError as e:
+        log.debug("Can't list the XKB registry files: %s", e)
+        return stamp
+
+    for name in names:
+        if not name.endswith(".xml"):
+            continue
+
+        try:
+            stat = os.stat(os.path.join(rules_dir, name))
+        except OSError:
+            continue
+
+        stamp.append([name, stat.st_mtime_ns, stat.st_size])
+
+    return stamp
+
+
+class XkbRegistryIndex(object):
+    """An index of layouts and layout switching options of the XKB registry."""
+
+    def __init__(self, layouts, switching_options):
+        """Create a new index.
+
+        :param layouts: a dictionary of layout-variant specifications
+                        and their LayoutInfo tuples
+        :param switching_options: a dictionary of layout switching options
+                                  and their descriptions
+        """
+        self._layouts = dict(layouts)
+        self._switching_options = dict(switching_options)
+
+    @property
+    def layouts(self):
+        """A dictionary of layout-variant specifications and their LayoutInfo tuples."""
+        return self._layouts
+
+    @property
+    def switching_options(self):
+        """A dictionary of layout switching options and their descriptions."""
+        return self._switching_options
+
+    @classmethod
+    def load(cls, path, stamp):
+        """Load the index from a file.
+
+        :param str path: a path to the cached index
+        :param stamp: the current stamp of the registry
+        :return: an instance of XkbRegistryIndex or None if the cached
+                 index doesn't exist or is not valid anymore
+        """
+        if not stamp:
+            return None
+
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning("Failed to load the XKB registry index: %s", e)
+            return None
+
+        if data.get("version") != XKB_INDEX_VERSION or data.get("stamp") != stamp:
+            log.debug("The cached XKB registry index is out of date.")
+            return None
+
+        try:
+            layouts = [(name, LayoutInfo(lang, desc)) for name, lang, desc in data["layouts"]]
+            switching_options = [(name, desc) for name, desc in data["switching_options"]]
+        except (KeyError, TypeError, ValueError) as e:
+            log.warning("Invalid XKB registry index: %s", e)
+            return None
+
+        return cls(layouts, switching_options)
+
+    def save(self, path, stamp):
+        """Save the index to a file.
+
+        Failures are only logged, because the cached index is not required.
+
+        :param str path: a path to the cached index
+        :param stamp: the current stamp of the registry
+        """
+        if not stamp:
+            return
+
+        data = {
+            "version": XKB_INDEX_VERSION,
+            "stamp": stamp,
+            "layouts": [[name, info.lang, info.desc] for name, info in self._layouts.items()],
+            "switching_options": [[name, desc] for name, desc
+                                  in self._switching_options.items()],
+        }
+
+        tmp_path = path + ".tmp"
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning("Failed to save the XKB registry index: %s", e)
@@ -21,6 +21,7 @@ import os
 import tempfile
 import signal
 import shutil
+import time
 from threading import Lock
 
 import sys
@@ -101,6 +102,59 @@ class RunProgramTests(unittest.TestCase):
         # incorrect calling should return rc!=0
         self.assertNotEqual(util.execWithRedirect('ls', ['--asdasd']), 0)
 
+    def run_program_stream_test(self):
+        """Test _run_program with streamed output."""
+        logged = []
+
+        def _log(line):
+            logged.append((line.decode("utf-8").strip(), time.monotonic()))
+
+        with patch("pyanaconda.core.util._log_program_line", side_effect=_log):
+            retcode, output = util._run_program(
+                ['sh', '-c', 'echo first; sleep 0.5; echo second; exit 3'],
+                stream_output=True
+            )
+
+        self.assertEqual(retcode, 3)
+        self.assertEqual(output, "first\nsecond\n")
+
+        # The first line was logged before the program finished.
+        self.assertEqual([line for line, _timestamp in logged], ["first", "second"])
+        self.assertGreater(logged[1][1] - logged[0][1], 0.3)
+
+        # The filtered stderr is logged, but not returned.
+        logged.clear()
+        with patch("pyanaconda.core.util._log_program_line", side_effect=_log):
+            retcode, output = util._run_program(
+                ['sh', '-c', 'echo out; echo err >&2'],
+                stream_output=True, filter_stderr=True
+            )
+
+        self.assertEqual(output, "out\n")
+        self.assertEqual(sorted(line for line, _timestamp in logged), ["err", "out"])
+
+    @patch("pyanaconda.core.util.PROGRAM_OUTPUT_TAIL_LINES", 10)
+    def run_program_stream_tail_test(self):
+        """Test _run_program with a long streamed output."""
+        with tempfile.TemporaryFile("w+") as stdout:
+            retcode, output = util._run_program(['seq', '1', '10000'], stdout=stdout,
+                                                stream_output=True, log_output=False)
+            stdout.seek(0)
+            redirected = stdout.read()
+
+        self.assertEqual(retcode, 0)
+        self.assertEqual(output, "".join("%d\n" % i for i in range(9991, 10001)))
+        self.assertEqual(redirected, "".join("%d\n" % i for i in range(1, 10001)))
+
+        # The binary output is also bounded.
+        retcode, output = util._run_program(['seq', '1', '100'], binary_output=True,
+                                            stream_output=True, log_output=False)
+        self.assertEqual(output, b"".join(b"%d\n" % i for i in range(91, 101)))
+
+        # The whole output is captured without streaming.
+        output = util.execWithCapture('seq', ['1', '100'], log_output=False)
+        self.assertEqual(output, "".join("%d\n" % i for i in range(1, 101)))
+
     def exec_with_capture_test(self):
         """Test execWithCapture."""
 
@@ -19,6 +19,8 @@
 from pyanaconda import localization
 from pyanaconda.core.util import execWithCaptureBinary
 import locale as locale_mod
+import langtable
+import threading
 import unittest
 
 class ParsingTests(unittest.TestCase):
@@ -163,3 +165,67 @@ class LangcodeLocaleMatchingTests(unittest.TestCase):
             order = localization.resolve_date_format(1, 2, 3, fail_safe=False)[0]
             for i in (1, 2, 3):
                 self.assertIn(i, order)
+
+class LocalizationCacheTests(unittest.TestCase):
+    def setUp(self):
+        localization.localization_cache.clear()
+
+    def tearDown(self):
+        localization.localization_cache.clear()
+
+    def cache_statistics_test(self):
+        """Test hits and misses of the localization cache."""
+        cache = localization.localization_cache
+
+        self.assertEqual(localization.get_english_name("cs_CZ"), "Czech (Czechia)")
+        misses = cache.statistics.misses
+        self.assertGreater(misses, 0)
+
+        self.assertEqual(localization.get_english_name("cs_CZ"), "Czech (Czechia)")
+        self.assertEqual(cache.statistics.misses, misses)
+        self.assertGreater(cache.statistics.hits, 0)
+
+        cache.clear()
+        self.assertEqual(cache.statistics, (0, 0, 0))
+
+    def cached_values_test(self):
+        """Test that the cached values are not shared with callers."""
+        parts = localization.parse_langcode("cs_CZ.UTF-8")
+        parts["language"] = "en"
+        self.assertEqual(localization.parse_langcode("cs_CZ.UTF-8")["language"], "cs")
+
+        locales = localization.get_language_locales("cs")
+        locales.append("en_US.UTF-8")
+        self.assertEqual(localization.get_language_locales("cs"), ["cs_CZ.UTF-8"])
+
+    def warm_up_test(self):
+        """Test the warm-up of the localization cache."""
+        cache = localization.localization_cache
+        cache.warm_up(["cs_CZ.UTF-8", "sr_RS.UTF-8@latin", "*_&!"])
+        stats = cache.statistics
+
+        self.assertEqual(localization.get_native_name("cs_CZ.UTF-8"), "Čeština (Česko)")
+        self.assertEqual(localization.get_english_name("cs"), "Czech")
+        self.assertEqual(localization.get_language_locales("sr"),
+                         langtable.list_locales(languageId="sr"))
+        self.assertEqual(cache.statistics.misses, stats.misses)
+
+    def concurrent_lookups_test(self):
+        """Test lookups from multiple threads."""
+        locales = langtable.list_all_locales()
+        expected = [localization.get_english_name(locale) for locale in locales]
+        localization.localization_cache.clear()
+        results = []
+
+        def _lookup():
+            results.append([localization.get_english_name(locale) for locale in locales])
+
+        threads = [threading.Thread(target=_lookup) for _i in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, 4 * [expected])
@@ -0,0 +1,280 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import logging
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+from pyanaconda.anaconda_logging import AnacondaLogWriter, AnacondaQueueHandler, \
+    AnacondaFileHandler, LOG_QUEUE_BLOCK, LOG_QUEUE_DROP, setHandlersLevel, autoSetLevel
+
+
+class BlockingHandler(logging.Handler):
+    """A handler that collects messages and can be paused."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.resumed = threading.Event()
+        self.resumed.set()
+
+    def emit(self, record):
+        self.resumed.wait()
+        self.messages.append(self.format(record))
+
+
+class AsyncLoggingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._writers = []
+        self._logger = logging.getLogger("anaconda.test.async")
+        self._logger.setLevel(logging.DEBUG)
+        self._logger.propagate = False
+
+    def tearDown(self):
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+            handler.close()
+
+        for writer in self._writers:
+            writer.stop()
+
+    def _create_writer(self, **kwargs):
+        writer = AnacondaLogWriter(**kwargs)
+        writer.start()
+        self._writers.append(writer)
+        return writer
+
+    def _add_handler(self, target, writer):
+        handler = AnacondaQueueHandler(target, writer)
+        self._logger.addHandler(handler)
+        return handler
+
+    def _read(self, path):
+        with open(path, "r") as f:
+            return f.read().splitlines()
+
+    def file_test(self):
+        """Test writing to a file in a dedicated thread."""
+        writer = self._create_writer()
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "test.log")
+            target = AnacondaFileHandler(path)
+            target.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+            self._add_handler(target, writer)
+
+            # The arguments can change before the record is written.
+            args = ["a"]
+            self._logger.debug("Debug: %s", args)
+            args.append("b")
+
+            try:
+                raise ValueError("Invalid value!")
+            except ValueError:
+                self._logger.exception("Error!")
+
+            for i in range(1000):
+                self._logger.info("Message %d", i)
+
+            self.assertTrue(writer.flush(10))
+            lines = self._read(path)
+
+        self.assertEqual(lines[0], "DEBUG Debug: ['a']")
+        self.assertEqual(lines[1], "ERROR Error!")
+        self.assertEqual(lines[2], "Traceback (most recent call last):")
+        self.assertIn("ValueError: Invalid value!", lines)
+        self.assertEqual(lines[-1000:], ["INFO Message %d" % i for i in range(1000)])
+        self.assertEqual(writer.dropped, 0)
+
+    def shared_file_test(self):
+        """Test handlers that write to the same file."""
+        writer = self._create_writer()
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "test.log")
+            first = AnacondaFileHandler(path)
+            first.setFormatter(logging.Formatter("first %(message)s"))
+            self._add_handler(first, writer)
+
+            other_logger = logging.getLogger("anaconda.test.async.other")
+            other_logger.propagate = False
+            second = AnacondaFileHandler(path)
+            second.setFormatter(logging.Formatter("second %(message)s"))
+            other_handler = AnacondaQueueHandler(second, writer)
+            other_logger.addHandler(other_handler)
+
+            try:
+                for i in range(100):
+                    self._logger.warning("%d", i)
+                    other_logger.warning("%d", i)
+
+                self.assertTrue(writer.flush(10))
+            finally:
+                other_logger.removeHandler(other_handler)
+                other_handler.close()
+
+            lines = self._read(path)
+
+        expected = []
+        for i in range(100):
+            expected.append("first %d" % i)
+            expected.append("second %d" % i)
+
+        self.assertEqual(lines, expected)
+
+    def level_test(self):
+        """Test the level of a queue handler."""
+        writer = self._create_writer()
+        target = BlockingHandler()
+        target.setLevel(logging.INFO)
+        autoSetLevel(target, True)
+        handler = self._add_handler(target, writer)
+
+        self.assertEqual(handler.level, logging.INFO)
+        self.assertEqual(target.level, logging.NOTSET)
+
+        self._logger.debug("Hidden.")
+        setHandlersLevel(self._logger, logging.DEBUG)
+        self._logger.debug("Visible.")
+        writer.flush(10)
+
+        self.assertEqual(target.messages, ["Visible."])
+
+    def drop_test(self):
+        """Test dropping records if the queue is full."""
+        writer = self._create_writer(size=5, overflow=LOG_QUEUE_DROP)
+        target = BlockingHandler()
+        handler = self._add_handler(target, writer)
+
+        # Block the writer thread with the first record.
+        target.resumed.clear()
+        self._logger.info("First.")
+
+        for i in range(100):
+            self._logger.debug("Message %d", i)
+
+        self.assertGreater(writer.dropped, 0)
+        self.assertEqual(writer.dropped, handler.dropped)
+        dropped = writer.dropped
+
+        target.resumed.set()
+        self.assertTrue(writer.flush(10))
+
+        # The dropped records are reported with the next batch.
+        report = "%d log messages were dropped, because the log queue was full." % dropped
+        self.assertEqual(target.messages.count(report), 1)
+        self.assertEqual(len(target.messages), 101 - dropped + 1)
+
+        self._logger.warning("Last.")
+        self.assertTrue(writer.flush(10))
+        self.assertEqual(target.messages.count(report), 1)
+        self.assertEqual(target.messages[-1], "Last.")
+
+    def block_test(self):
+        """Test waiting for a free slot if the queue is full."""
+        writer = self._create_writer(size=5, overflow=LOG_QUEUE_BLOCK)
+        target = BlockingHandler()
+        self._add_handler(target, writer)
+
+        target.resumed.clear()
+
+        def log_messages():
+            for i in range(100):
+                self._logger.debug("Message %d", i)
+
+        producer = threading.Thread(target=log_messages)
+        producer.start()
+
+        producer.join(0.5)
+        self.assertTrue(producer.is_alive())
+
+        target.resumed.set()
+        producer.join(10)
+
+        self.assertTrue(writer.flush(10))
+        self.assertEqual(target.messages, ["Message %d" % i for i in range(100)])
+        self.assertEqual(writer.dropped, 0)
+
+    def default_block_test(self):
+        """Test that no records are dropped by default."""
+        writer = self._create_writer(size=5)
+        target = BlockingHandler()
+        self._add_handler(target, writer)
+
+        target.resumed.clear()
+
+        def log_messages():
+            for i in range(20):
+                self._logger.debug("Message %d", i)
+
+        producer = threading.Thread(target=log_messages)
+        producer.start()
+        producer.join(0.5)
+
+        target.resumed.set()
+        producer.join(10)
+
+        self.assertTrue(writer.flush(10))
+        self.assertEqual(target.messages, ["Message %d" % i for i in range(20)])
+        self.assertEqual(writer.dropped, 0)
+
+    def prepare_test(self):
+        """Test that the prepared record is a copy."""
+        writer = self._create_writer()
+        handler = self._add_handler(BlockingHandler(), writer)
+
+        try:
+            raise ValueError("Invalid value.")
+        except ValueError:
+            record = self._logger.makeRecord(
+                self._logger.name, logging.ERROR, __file__, 0,
+                "Message %d", (1,), sys.exc_info()
+            )
+
+        prepared = handler.prepare(record)
+        self.assertIsNot(prepared, record)
+        self.assertEqual(prepared.msg, "Message 1")
+        self.assertIsNone(prepared.args)
+        self.assertIsNone(prepared.exc_info)
+        self.assertIn("Invalid value.", prepared.exc_text)
+
+        # The original record is not changed.
+        self.assertEqual(record.msg, "Message %d")
+        self.assertEqual(record.args, (1,))
+        self.assertIsNotNone(record.exc_info)
+
+    def stop_test(self):
+        """Test stopping the writer."""
+        writer = self._create_writer()
+        target = BlockingHandler()
+        self._add_handler(target, writer)
+
+        for i in range(100):
+            self._logger.info("Message %d", i)
+
+        writer.stop(10)
+        self.assertFalse(writer.running)
+        self.assertEqual(len(target.messages), 100)
+
+        # The records are written directly now.
+        self._logger.info("Last.")
+        self.assertEqual(target.messages[-1], "Last.")
+        self.assertFalse(writer.flush())
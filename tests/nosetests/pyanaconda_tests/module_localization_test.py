@@ -35,6 +35,7 @@ from pyanaconda.modules.localization.installation import LanguageInstallationTas
     KeyboardInstallationTask, write_vc_configuration, VC_CONF_FILE_PATH, write_x_configuration, \
     X_CONF_DIR, X_CONF_FILE_NAME
 from pyanaconda.modules.localization.localization import LocalizationService
+from pyanaconda.modules.localization.kbd_model_map import KeyboardConverter, read_kbd_model_map
 from pyanaconda.modules.localization.localed import get_missing_keyboard_configuration, \
     LocaledWrapper
 from pyanaconda.modules.localization.localization_interface import LocalizationInterface
@@ -900,3 +901,149 @@ class LocaledWrapperTestCase(unittest.TestCase):
         mocked_system_bus.check_connection.return_value = False
         localed_wrapper = LocaledWrapper()
         self._guarded_localed_wrapper_calls_check(localed_wrapper)
+
+    @patch("pyanaconda.modules.localization.localed.SystemBus")
+    @patch("pyanaconda.modules.localization.localed.LOCALED")
+    @patch("pyanaconda.modules.localization.localed.conf")
+    def localed_wrapper_conversion_test(self, mocked_conf, mocked_localed_service,
+                                        mocked_system_bus):
+        """Test that LocaledWrapper converts in process and falls back to localed."""
+        mocked_system_bus.check_connection.return_value = True
+        mocked_conf.system.provides_system_bus = True
+        mocked_localed_proxy = Mock()
+        mocked_localed_service.get_proxy.return_value = mocked_localed_proxy
+        mocked_localed_proxy.VConsoleKeymap = "us"
+        mocked_localed_proxy.X11Layout = "us"
+        mocked_localed_proxy.X11Variant = ""
+
+        converter = Mock()
+        converter.convert_keymap.return_value = ["cz (qwerty)"]
+        converter.convert_layouts.return_value = "cz-qwerty"
+        localed_wrapper = LocaledWrapper(converter=converter)
+
+        self.assertEqual(localed_wrapper.convert_keymap("cz-lat2"), ["cz (qwerty)"])
+        self.assertEqual(localed_wrapper.convert_layouts(["cz (qwerty)"]), "cz-qwerty")
+        mocked_localed_proxy.SetVConsoleKeyboard.assert_not_called()
+        mocked_localed_proxy.SetX11Keyboard.assert_not_called()
+
+        converter.convert_keymap.return_value = None
+        converter.convert_layouts.return_value = None
+        localed_wrapper.convert_keymap("unknown")
+        localed_wrapper.convert_layouts(["unknown"])
+        mocked_localed_proxy.SetVConsoleKeyboard.assert_any_call("unknown", "", True, False)
+        mocked_localed_proxy.SetX11Keyboard.assert_any_call("unknown", "", "", "", True, False)
+
+
+# An excerpt of the kbd-model-map file of systemd.
+KBD_MODEL_MAP = """
+# Originally generated from system-config-keyboard's model list.
+# consolelayout\t\txlayout\txmodel\t\txvariant\txoptions
+sg\t\t\tch\tpc105\t\tde_nodeadkeys\tterminate:ctrl_alt_bksp
+us\t\t\tus\tpc105+inet\t-\t\tterminate:ctrl_alt_bksp
+de\t\t\tde\tpc105\t\t-\t\tterminate:ctrl_alt_bksp
+de-latin1\t\tde\tpc105\t\t-\t\tterminate:ctrl_alt_bksp
+fr_CH\t\t\tch\tpc105\t\tfr\t\tterminate:ctrl_alt_bksp
+bg_pho-utf8\t\tbg,us\tpc105\t\t,phonetic\tterminate:ctrl_alt_bksp,grp:shifts_toggle,grp_led:scroll
+cz-us-qwertz\t\tcz,us\tpc105\t\t-\t\tterminate:ctrl_alt_bksp,grp:shifts_toggle,grp_led:scroll
+cz-qwerty\t\tcz,us\tpc105\t\tqwerty,\t\tterminate:ctrl_alt_bksp,grp:shifts_toggle,grp_led:scroll
+us-acentos\t\tus\tpc105\t\tintl\t\tterminate:ctrl_alt_bksp
+de-latin1-nodeadkeys\tde\tpc105\t\tnodeadkeys\tterminate:ctrl_alt_bksp
+bg_bds-utf8\t\tbg,us\tpc105\t\t-\t\tterminate:ctrl_alt_bksp,grp:shifts_toggle,grp_led:scroll
+dvorak\t\t\tus\tpc105\t\tdvorak\t\tterminate:ctrl_alt_bksp
+dvorak\t\t\tus\tpc105\t\tdvorak-alt-intl\tterminate:ctrl_alt_bksp
+ru\t\t\tru,us\tpc105\t\t-\t\tterminate:ctrl_alt_bksp,grp:shifts_toggle,grp_led:scroll
+cz-lat2\t\t\tcz\tpc105\t\tqwerty\t\tterminate:ctrl_alt_bksp
+invalid line
+"""
+
+
+class KeyboardConverterTestCase(unittest.TestCase):
+    """Test the in-process keyboard converter."""
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._map_path = os.path.join(self._tmp_dir.name, "kbd-model-map")
+        self._keymap_dir = os.path.join(self._tmp_dir.name, "keymaps")
+
+        with open(self._map_path, "w") as f:
+            f.write(KBD_MODEL_MAP)
+
+        os.makedirs(os.path.join(self._keymap_dir, "xkb"))
+
+        for name in ("fi.map.gz", "cz-qwerty.map", "ru-phonetic.map.gz"):
+            open(os.path.join(self._keymap_dir, "xkb", name), "w").close()
+
+        self._converter = KeyboardConverter(
+            map_path=self._map_path,
+            keymap_dirs=[self._keymap_dir, "/nonexistent"]
+        )
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def read_kbd_model_map_test(self):
+        """Test reading of the kbd-model-map file."""
+        mappings = read_kbd_model_map(self._map_path)
+        self.assertEqual(len(mappings), 15)
+        self.assertEqual(mappings[0], ("sg", "ch", "pc105", "de_nodeadkeys",
+                                       "terminate:ctrl_alt_bksp"))
+        self.assertEqual(mappings[1].variant, "")
+
+    def convert_keymap_test(self):
+        """Test conversion of VConsole keymaps to X11 layouts."""
+        convert = self._converter.convert_keymap
+        self.assertEqual(convert("us"), ["us"])
+        self.assertEqual(convert("cz-lat2"), ["cz (qwerty)"])
+        self.assertEqual(convert("cz-qwerty"), ["cz (qwerty)", "us"])
+        self.assertEqual(convert("bg_pho-utf8"), ["bg", "us (phonetic)"])
+        self.assertEqual(convert("dvorak"), ["us (dvorak)"])
+        self.assertEqual(convert(""), [])
+        self.assertIsNone(convert("unknown"))
+
+    def convert_layouts_test(self):
+        """Test conversion of X11 layouts to VConsole keymaps."""
+        convert = self._converter.convert_layouts
+        # Exact matches.
+        self.assertEqual(convert(["us"]), "us")
+        self.assertEqual(convert(["de"]), "de")
+        self.assertEqual(convert(["de (nodeadkeys)"]), "de-latin1-nodeadkeys")
+        self.assertEqual(convert(["ch (fr)"]), "fr_CH")
+        self.assertEqual(convert(["cz (qwerty)", "us"]), "cz-qwerty")
+        self.assertEqual(convert(["bg", "us (phonetic)"]), "bg_pho-utf8")
+        self.assertEqual(convert(["ru", "us"]), "ru")
+        # The reversed order of layouts.
+        self.assertEqual(convert(["us", "ru"]), "ru")
+        self.assertEqual(convert(["us (dvorak)", "cz"]), "cz-us-qwertz")
+        # The first layout matches.
+        self.assertEqual(convert(["de", "us"]), "de")
+        # The layouts start with the layouts of the entry.
+        self.assertEqual(convert(["cz", "us", "de"]), "cz-us-qwertz")
+        # The first layout matches the first layout of the entry.
+        # The first of equally good matches wins.
+        self.assertEqual(convert(["bg (bas_phonetic)"]), "bg_pho-utf8")
+        self.assertEqual(convert(["bg"]), "bg_bds-utf8")
+        # Converted keymaps.
+        self.assertEqual(convert(["fi"]), "fi")
+        self.assertEqual(convert(["ru (phonetic)"]), "ru-phonetic")
+        self.assertEqual(convert(["fi", "us"]), "fi")
+        # No conversion.
+        self.assertEqual(convert([]), "")
+        self.assertIsNone(convert(["unknown"]))
+
+    def missing_map_test(self):
+        """Test the converter without the kbd-model-map file."""
+        converter = KeyboardConverter(map_path="/nonexistent", keymap_dirs=[])
+        self.assertIsNone(converter.convert_keymap("us"))
+        self.assertIsNone(converter.convert_layouts(["us"]))
+
+    def reload_test(self):
+        """Test that the tables are loaded only once."""
+        self.assertIsNone(self._converter.convert_keymap("es"))
+
+        with open(self._map_path, "a") as f:
+            f.write("es es pc105 - terminate:ctrl_alt_bksp\n")
+
+        self.assertIsNone(self._converter.convert_keymap("es"))
+        self._converter.reload()
+        self.assertEqual(self._converter.convert_keymap("es"), ["es"])
+        self.assertEqual(self._converter.convert_layouts(["es"]), "es")
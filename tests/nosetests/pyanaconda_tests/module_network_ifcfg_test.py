@@ -25,7 +25,7 @@ import os
 from textwrap import dedent
 from pyanaconda.core.kickstart.commands import NetworkData
 
-from pyanaconda.modules.network.ifcfg import IFCFG_DIR, IfcfgFile, \
+from pyanaconda.modules.network.ifcfg import IFCFG_DIR, IfcfgFile, IfcfgIndex, \
     get_ifcfg_files_paths, get_ifcfg_file, get_ifcfg_file_of_device, \
     get_slaves_from_ifcfgs, get_kickstart_network_data, get_master_slaves_from_ifcfgs
 
@@ -1868,3 +1868,104 @@ class IfcfgFileTestCase(unittest.TestCase):
         """Test get_master_slaves_from_ifcfgs."""
         for master_key in ("MASTER", "TEAM_MASTER", "BRIDGE"):
             self._get_master_slaves_from_ifcfgs_of_a_device_type(master_key)
+
+
+class IfcfgIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._root_dir = tempfile.mkdtemp(prefix="ifcfg-index-test-dir")
+        self._ifcfg_dir = os.path.join(self._root_dir, IFCFG_DIR.lstrip("/"))
+        os.makedirs(self._ifcfg_dir)
+        self._index = IfcfgIndex()
+
+    def tearDown(self):
+        shutil.rmtree(self._root_dir)
+
+    def _dump_ifcfg_file(self, file_name, content):
+        path = os.path.join(self._ifcfg_dir, file_name)
+        with open(path, "w") as f:
+            f.write(dedent(content).strip())
+        return path
+
+    def _generate_ifcfg_files(self, count):
+        for i in range(count):
+            self._dump_ifcfg_file("ifcfg-ens{}".format(i), """
+            TYPE=Ethernet
+            DEVICE=ens{0}
+            HWADDR=52:54:00:00:{1:02x}:{2:02x}
+            UUID=00000000-0000-0000-0000-{0:012d}
+            ONBOOT=yes
+            BOOTPROTO=dhcp
+            """.format(i, i // 256, i % 256))
+
+    def find_files_test(self):
+        """Test IfcfgIndex.find_files."""
+        self._generate_ifcfg_files(3)
+
+        ifcfgs = self._index.find_files("DEVICE", "ens1", root_path=self._root_dir)
+        self.assertEqual([ifcfg.get("DEVICE") for ifcfg in ifcfgs], ["ens1"])
+
+        ifcfgs = self._index.find_files("HWADDR", "52:54:00:00:00:02", root_path=self._root_dir)
+        self.assertEqual([ifcfg.get("DEVICE") for ifcfg in ifcfgs], ["ens2"])
+
+        uuid = "00000000-0000-0000-0000-000000000000"
+        ifcfgs = self._index.find_files("UUID", uuid, root_path=self._root_dir)
+        self.assertEqual([ifcfg.get("DEVICE") for ifcfg in ifcfgs], ["ens0"])
+
+        self.assertEqual(self._index.find_files("DEVICE", "ens3", root_path=self._root_dir), [])
+
+        with self.assertRaises(ValueError):
+            self._index.find_files("TYPE", "Ethernet", root_path=self._root_dir)
+
+    def files_are_copied_test(self):
+        """Test that the indexed files are not shared."""
+        self._generate_ifcfg_files(1)
+
+        ifcfg = self._index.find_files("DEVICE", "ens0", root_path=self._root_dir)[0]
+        ifcfg.set(("ONBOOT", "no"))
+
+        ifcfg = self._index.find_files("DEVICE", "ens0", root_path=self._root_dir)[0]
+        self.assertEqual(ifcfg.get("ONBOOT"), "yes")
+
+    def invalidation_test(self):
+        """Test the invalidation of the index."""
+        self._generate_ifcfg_files(2)
+        self.assertEqual(len(self._index.get_files(self._root_dir)), 2)
+
+        # A new file.
+        self._dump_ifcfg_file("ifcfg-ens5", """
+        TYPE=Ethernet
+        DEVICE=ens5
+        """)
+        ifcfgs = self._index.find_files("DEVICE", "ens5", root_path=self._root_dir)
+        self.assertEqual(len(ifcfgs), 1)
+
+        # A file written by the installer.
+        ifcfg = ifcfgs[0]
+        ifcfg.set(("DEVICE", "ens6"))
+
+        with patch("pyanaconda.modules.network.ifcfg.ifcfg_index", self._index):
+            ifcfg.write()
+
+        self.assertEqual(self._index.find_files("DEVICE", "ens5", root_path=self._root_dir), [])
+        self.assertEqual(len(self._index.find_files("DEVICE", "ens6", root_path=self._root_dir)), 1)
+
+        # A removed file.
+        os.unlink(ifcfg.path)
+        self.assertEqual(self._index.find_files("DEVICE", "ens6", root_path=self._root_dir), [])
+        self.assertEqual(len(self._index.get_files(self._root_dir)), 2)
+
+    def index_lookups_test(self):
+        """Test lookups in a few hundred ifcfg files."""
+        count = 300
+        self._generate_ifcfg_files(count)
+
+        with patch.object(IfcfgFile, "read", autospec=True, side_effect=IfcfgFile.read) as read:
+            with patch("pyanaconda.modules.network.ifcfg.ifcfg_index", self._index):
+                for i in range(count):
+                    uuid = "00000000-0000-0000-0000-{:012d}".format(i)
+                    ifcfg = get_ifcfg_file([("UUID", uuid)], root_path=self._root_dir)
+                    self.assertEqual(ifcfg.get("DEVICE"), "ens{}".format(i))
+
+        # Every file is parsed only once.
+        self.assertEqual(read.call_count, count)
@@ -0,0 +1,111 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import threading
+import unittest
+from unittest.mock import Mock
+
+from pyanaconda.storage.mount import MountPlanner, get_parent_mountpoint
+
+
+def _device(mountpoint, path=None, fmt_type="ext4"):
+    device = Mock()
+    device.path = path or "/dev/mapper/%s" % mountpoint.strip("/").replace("/", "-")
+    device.format.mountpoint = mountpoint
+    device.format.type = fmt_type
+    return device
+
+
+def _mountpoints(batches):
+    return [[d.format.mountpoint for d in batch] for batch in batches]
+
+
+class MountPlannerTestCase(unittest.TestCase):
+
+    def get_parent_mountpoint_test(self):
+        """Test the get_parent_mountpoint function."""
+        mountpoints = {"/", "/var", "/var/lib"}
+        self.assertEqual(get_parent_mountpoint("/", mountpoints), None)
+        self.assertEqual(get_parent_mountpoint("/home", mountpoints), "/")
+        self.assertEqual(get_parent_mountpoint("/var/log", mountpoints), "/var")
+        self.assertEqual(get_parent_mountpoint("/var/lib/x/y", mountpoints), "/var/lib")
+        self.assertEqual(get_parent_mountpoint("/var", {"/home"}), None)
+
+    def mount_batches_test(self):
+        """Test the mount batches."""
+        devices = [
+            _device("/var/log"),
+            _device("/home"),
+            _device("/"),
+            _device("/var"),
+            _device("/boot/efi"),
+            _device("/boot"),
+        ]
+        planner = MountPlanner(devices)
+
+        self.assertEqual(_mountpoints(planner.mount_batches), [
+            ["/"],
+            ["/boot", "/home", "/var"],
+            ["/boot/efi", "/var/log"],
+        ])
+        self.assertEqual(_mountpoints(planner.umount_batches), [
+            ["/boot/efi", "/var/log"],
+            ["/boot", "/home", "/var"],
+            ["/"],
+        ])
+
+    def bind_mount_batches_test(self):
+        """Test the mount batches with bind mounts."""
+        devices = [
+            _device("/"),
+            _device("/data", path="/var/data", fmt_type="bind"),
+            _device("/var"),
+        ]
+        planner = MountPlanner(devices)
+
+        self.assertEqual(_mountpoints(planner.mount_batches), [
+            ["/"],
+            ["/var"],
+            ["/data"],
+        ])
+
+    def duplicate_mountpoints_test(self):
+        """Test the mount batches with duplicate mount points."""
+        first = _device("/mnt")
+        second = _device("/mnt")
+        planner = MountPlanner([first, second])
+        self.assertEqual(planner.mount_batches, [[first], [second]])
+
+    def run_batch_test(self):
+        """Test the run_batch method."""
+        devices = [_device("/a"), _device("/b"), _device("/c")]
+        error = RuntimeError("Fake error!")
+        threads = set()
+
+        def action(device):
+            threads.add(threading.get_ident())
+            if device is devices[1]:
+                raise error
+
+        results = MountPlanner.run_batch(devices, action, max_workers=3)
+        self.assertEqual([r.device for r in results], devices)
+        self.assertEqual([r.error for r in results], [None, error, None])
+        self.assertTrue(all(r.elapsed >= 0 for r in results))
+
+        threads.clear()
+        MountPlanner.run_batch(devices, action)
+        self.assertEqual(threads, {threading.get_ident()})
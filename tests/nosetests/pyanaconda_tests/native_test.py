@@ -0,0 +1,498 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch, Mock
+
+from pyanaconda.core import native, util
+
+UNITS = {
+    "sshd.service": "[Unit]\nDescription=SSH\n\n[Service]\nExecStart=/bin/true\n\n"
+                    "[Install]\nWantedBy=multi-user.target\nAlso=sshd.socket\n",
+    "sshd.socket": "[Socket]\nListenStream=22\n\n[Install]\nWantedBy=sockets.target\n",
+    "chronyd.service": "[Service]\nExecStart=/bin/true\n\n[Install]\n"
+                       "WantedBy=multi-user.target \\\n  timers.target\n",
+    "dbus-broker.service": "[Service]\nExecStart=/bin/true\n\n"
+                           "[Install]\nAlias=dbus.service\n",
+    "static.service": "[Service]\nExecStart=/bin/true\n",
+    "tuned.service": "[Service]\nExecStart=/bin/true\n\n[Install]\n"
+                     "WantedBy=\nRequiredBy=graphical.target\n",
+    "getty@.service": "[Service]\nExecStart=/bin/true\n\n[Install]\n"
+                      "WantedBy=getty.target\nDefaultInstance=tty1\n",
+    "masked.service": "[Service]\nExecStart=/bin/true\n\n[Install]\n"
+                      "WantedBy=multi-user.target\n",
+}
+
+
+def _create_root():
+    """Create a root with a few unit files."""
+    root = tempfile.mkdtemp()
+    unit_dir = root + "/usr/lib/systemd/system"
+    os.makedirs(unit_dir)
+    os.makedirs(root + "/etc/systemd/system")
+
+    for name, content in UNITS.items():
+        with open(os.path.join(unit_dir, name), "w") as f:
+            f.write(content)
+
+    os.symlink("/dev/null", root + "/etc/systemd/system/masked.service")
+    return root
+
+
+def _read_config(root):
+    """Return the symlinks in the systemd configuration."""
+    links = {}
+    config_dir = root + native.SYSTEMD_CONFIG_PATH
+
+    for directory, _dirnames, filenames in os.walk(config_dir):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            links[os.path.relpath(path, config_dir)] = os.readlink(path)
+
+    return links
+
+
+class SystemdUnitsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = _create_root()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def enable_test(self):
+        """Test enabling of units."""
+        self.assertTrue(native.enable_unit("sshd", root=self.root))
+        self.assertTrue(native.enable_unit("chronyd.service", root=self.root))
+        self.assertTrue(native.enable_unit("dbus-broker.service", root=self.root))
+        self.assertTrue(native.enable_unit("static.service", root=self.root))
+        self.assertTrue(native.enable_unit("tuned.service", root=self.root))
+
+        # Enabling is idempotent.
+        self.assertTrue(native.enable_unit("sshd.service", root=self.root))
+
+        self.assertEqual(_read_config(self.root), {
+            "masked.service": "/dev/null",
+            "multi-user.target.wants/sshd.service": "/usr/lib/systemd/system/sshd.service",
+            "sockets.target.wants/sshd.socket": "/usr/lib/systemd/system/sshd.socket",
+            "multi-user.target.wants/chronyd.service":
+                "/usr/lib/systemd/system/chronyd.service",
+            "timers.target.wants/chronyd.service": "/usr/lib/systemd/system/chronyd.service",
+            "dbus.service": "/usr/lib/systemd/system/dbus-broker.service",
+            "graphical.target.requires/tuned.service": "/usr/lib/systemd/system/tuned.service",
+        })
+
+    def disable_test(self):
+        """Test disabling of units."""
+        for name in ("sshd", "chronyd", "dbus-broker"):
+            self.assertTrue(native.enable_unit(name, root=self.root))
+
+        self.assertTrue(native.disable_unit("sshd", root=self.root))
+        self.assertTrue(native.disable_unit("dbus-broker.service", root=self.root))
+
+        # Disabling is idempotent.
+        self.assertTrue(native.disable_unit("sshd", root=self.root))
+
+        self.assertEqual(_read_config(self.root), {
+            "masked.service": "/dev/null",
+            "multi-user.target.wants/chronyd.service":
+                "/usr/lib/systemd/system/chronyd.service",
+            "timers.target.wants/chronyd.service": "/usr/lib/systemd/system/chronyd.service",
+        })
+
+    def unsupported_test(self):
+        """Test units that are left to systemctl."""
+        for name in ("missing.service", "getty@.service", "getty@tty2.service",
+                     "masked.service", "../sshd.service"):
+            self.assertFalse(native.enable_unit(name, root=self.root))
+            self.assertFalse(native.disable_unit(name, root=self.root))
+
+        # A conflicting file.
+        os.makedirs(self.root + "/etc/systemd/system/sockets.target.wants")
+        os.symlink("/somewhere/else", self.root + "/etc/systemd/system/"
+                                                  "sockets.target.wants/sshd.socket")
+        self.assertFalse(native.enable_unit("sshd.service", root=self.root))
+
+        # Nothing was created.
+        self.assertEqual(len(_read_config(self.root)), 2)
+
+    @unittest.skipIf(not shutil.which("systemctl"), "systemctl is not available")
+    def compare_with_systemctl_test(self):
+        """Compare the results with systemctl."""
+        tool_root = _create_root()
+        self.addCleanup(shutil.rmtree, tool_root)
+
+        for name in ("sshd", "chronyd", "dbus-broker", "tuned"):
+            self.assertTrue(native.enable_unit(name, root=self.root))
+            subprocess.run(["systemctl", "enable", name, "--root", tool_root],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+        self.assertEqual(_read_config(self.root), _read_config(tool_root))
+
+        for name in ("sshd", "dbus-broker"):
+            self.assertTrue(native.disable_unit(name, root=self.root))
+            subprocess.run(["systemctl", "disable", name, "--root", tool_root],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+        self.assertEqual(_read_config(self.root), _read_config(tool_root))
+
+    @patch("pyanaconda.core.util._run_systemctl", return_value=0)
+    def native_error_test(self, run_systemctl):
+        """Test the fallback to systemctl if the configuration can't be changed."""
+        with patch("pyanaconda.core.native.os.symlink", side_effect=PermissionError("Denied")):
+            self.assertFalse(native.enable_unit("sshd", root=self.root))
+            util.enable_service("sshd", root=self.root)
+
+            with patch("pyanaconda.core.util._run_systemctl_batch",
+                       return_value=(0, [])) as run_systemctl_batch:
+                util.enable_services(["sshd"], root=self.root)
+
+        run_systemctl.assert_called_once_with("enable", "sshd", root=self.root)
+        run_systemctl_batch.assert_called_once_with("enable", ["sshd"], root=self.root)
+
+        run_systemctl.reset_mock()
+        self.assertTrue(native.enable_unit("sshd", root=self.root))
+
+        with patch("pyanaconda.core.native.os.unlink", side_effect=PermissionError("Denied")):
+            self.assertFalse(native.disable_unit("sshd", root=self.root))
+            util.disable_service("sshd", root=self.root)
+
+        run_systemctl.assert_called_once_with("disable", "sshd", root=self.root)
+
+    @patch("pyanaconda.core.util._run_systemctl", return_value=0)
+    def fallback_test(self, run_systemctl):
+        """Test the fallback to systemctl."""
+        util.enable_service("sshd", root=self.root)
+        run_systemctl.assert_not_called()
+
+        util.enable_service("getty@tty2.service", root=self.root)
+        run_systemctl.assert_called_once_with("enable", "getty@tty2.service", root=self.root)
+
+        run_systemctl.reset_mock()
+        util.disable_service("missing", root=self.root)
+        run_systemctl.assert_called_once_with("disable", "missing", root=self.root)
+
+    @unittest.skipIf(not shutil.which("systemctl"), "systemctl is not available")
+    def batch_with_systemctl_test(self):
+        """Test the batched configuration of services with systemctl."""
+        util.enable_services(["sshd", "getty@tty2.service", "getty@tty3"], root=self.root)
+
+        links = _read_config(self.root)
+        self.assertIn("getty.target.wants/getty@tty2.service", links)
+        self.assertIn("getty.target.wants/getty@tty3.service", links)
+        self.assertIn("multi-user.target.wants/sshd.service", links)
+
+        # The failed service is reported, the others are enabled.
+        with self.assertRaises(ValueError) as cm:
+            util.enable_services(["missing", "getty@tty4.service"], root=self.root)
+
+        self.assertIn("missing", str(cm.exception))
+        self.assertIn("getty.target.wants/getty@tty4.service", _read_config(self.root))
+
+        util.disable_services(["getty@tty2.service", "missing", "sshd"], root=self.root)
+
+        links = _read_config(self.root)
+        self.assertNotIn("getty.target.wants/getty@tty2.service", links)
+        self.assertNotIn("multi-user.target.wants/sshd.service", links)
+        self.assertIn("getty.target.wants/getty@tty3.service", links)
+
+    @patch("pyanaconda.core.util._run_systemctl", return_value=0)
+    @patch("pyanaconda.core.util._run_program")
+    def batch_test(self, run_program, run_systemctl):
+        """Test the batched configuration of services."""
+        # All services are enabled by one call.
+        run_program.return_value = (0, "")
+        util.enable_services(["sshd", "a@1", "b@2.service"], root=self.root)
+        run_program.assert_called_once_with(
+            ["systemctl", "enable", "a@1", "b@2.service", "--root", self.root],
+            stream_output=True
+        )
+        run_systemctl.assert_not_called()
+
+        # Only the failed service is enabled again one by one.
+        run_program.reset_mock()
+        run_program.side_effect = [
+            (1, "Failed to enable unit, unit b@2.service does not exist.\n"),
+            (0, "")
+        ]
+        util.enable_services(["a@1", "b@2.service", "c@3"], root=self.root)
+        self.assertEqual(run_program.call_count, 2)
+        self.assertEqual(run_program.call_args[0][0],
+                         ["systemctl", "enable", "a@1", "c@3", "--root", self.root])
+        run_systemctl.assert_called_once_with("enable", "b@2.service", root=self.root)
+
+        # The output doesn't say which services failed.
+        run_program.reset_mock()
+        run_systemctl.reset_mock()
+        run_program.side_effect = [(1, "Something is wrong.\n")]
+        util.enable_services(["a@1", "c@3"], root=self.root)
+        self.assertEqual(run_systemctl.call_count, 2)
+
+        # Only the failed service is disabled again one by one.
+        run_program.reset_mock()
+        run_systemctl.reset_mock()
+        run_program.side_effect = [
+            (0, "Failed to disable unit, unit a@1.service does not exist.\n"
+                "Removed \"/etc/systemd/system/getty.target.wants/c@3.service\".\n")
+        ]
+        util.disable_services(["a@1", "c@3", "sshd"], root=self.root)
+        run_program.assert_called_once_with(
+            ["systemctl", "disable", "a@1", "c@3", "--root", self.root],
+            stream_output=True
+        )
+        run_systemctl.assert_called_once_with("disable", "a@1", root=self.root)
+
+    @patch("pyanaconda.core.util.startProgram")
+    def no_forks_test(self, start_program):
+        """Test that a typical queue of configuration tasks doesn't fork."""
+        enabled = ["sshd", "chronyd", "dbus-broker", "tuned"] * 5
+        disabled = ["static", "chronyd"] * 5
+
+        for name in disabled:
+            util.disable_service(name, root=self.root)
+
+        for name in enabled:
+            util.enable_service(name, root=self.root)
+
+        start_program.assert_not_called()
+
+
+class FilesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def free_space_map_test(self):
+        """Test the free space map."""
+        os.mkdir(self.tmpdir + "/with space")
+        mountinfo = self.tmpdir + "/mountinfo"
+
+        with open(mountinfo, "w") as f:
+            f.write("22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw\n")
+            f.write("23 22 0:5 / {}/with\\040space rw - tmpfs tmpfs rw\n".format(self.tmpdir))
+            f.write("24 22 0:6 / /nonexistent/path rw - tmpfs tmpfs rw\n")
+            f.write("25 22 0:4 / /proc rw - proc proc rw\n")
+
+        free_space = native.get_free_space_map(mountinfo)
+        self.assertEqual(set(free_space), {"/", self.tmpdir + "/with space"})
+
+        stat = os.statvfs("/")
+        self.assertAlmostEqual(free_space["/"], stat.f_bavail * stat.f_frsize,
+                               delta=100 * 1024 * 1024)
+
+        # Read the real mountinfo file.
+        self.assertIn("/", native.get_free_space_map())
+
+    def _write_mountinfo(self, lines):
+        mountinfo = self.tmpdir + "/mountinfo"
+
+        with open(mountinfo, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        return mountinfo
+
+    def _create_statvfs(self, results):
+        def statvfs(path):
+            if path not in results:
+                raise FileNotFoundError(path)
+
+            bavail, blocks = results[path]
+            return os.statvfs_result((4096, 4096, blocks, bavail, bavail, 0, 0, 0, 0, 255))
+
+        return statvfs
+
+    def free_space_map_mounts_test(self):
+        """Test the free space map with the mounts of the installer."""
+        mountinfo = self._write_mountinfo([
+            # The root of a live image.
+            "60 1 0:50 / / rw,relatime - overlay LiveOS_rootfs rw,lowerdir=/a,upperdir=/b",
+            "61 60 0:21 / /tmp rw - tmpfs tmpfs rw",
+            "62 60 253:3 / /mnt/sysimage rw - ext4 /dev/mapper/root rw",
+            "63 62 253:4 / /mnt/sysimage/boot rw - ext4 /dev/sda1 rw",
+            # The system root is a bind mount of the physical root.
+            "64 60 253:3 / /mnt/sysroot rw - ext4 /dev/mapper/root rw",
+            "65 64 253:4 / /mnt/sysroot/boot rw - ext4 /dev/sda1 rw",
+            # A tmpfs mounted over another one.
+            "66 60 0:22 / /run/install rw - tmpfs tmpfs rw",
+            "67 66 0:23 / /run/install rw - tmpfs tmpfs rw",
+            # A mount point that doesn't exist anymore.
+            "68 60 0:24 / /mnt/install/source\\040(deleted) rw - iso9660 /dev/sr0 ro",
+            # A pseudo filesystem.
+            "69 60 0:4 / /proc rw - proc proc rw",
+        ])
+
+        statvfs = Mock(side_effect=self._create_statvfs({
+            "/": (100, 1000),
+            "/tmp": (200, 1000),
+            "/mnt/sysimage": (300, 1000),
+            "/mnt/sysimage/boot": (400, 1000),
+            "/mnt/sysroot": (300, 1000),
+            "/mnt/sysroot/boot": (400, 1000),
+            "/run/install": (500, 1000),
+            "/proc": (0, 0),
+        }))
+
+        with patch("pyanaconda.core.native.os.statvfs", statvfs):
+            free_space = native.get_free_space_map(mountinfo, max_age=0)
+
+        self.assertEqual(free_space, {
+            "/": 100 * 4096,
+            "/tmp": 200 * 4096,
+            "/mnt/sysimage": 300 * 4096,
+            "/mnt/sysimage/boot": 400 * 4096,
+            "/mnt/sysroot": 300 * 4096,
+            "/mnt/sysroot/boot": 400 * 4096,
+            "/run/install": 500 * 4096,
+        })
+
+        # The bind mounts share the results.
+        paths = [c[0][0] for c in statvfs.call_args_list]
+        self.assertEqual(paths, ["/", "/tmp", "/mnt/sysimage", "/mnt/sysimage/boot",
+                                 "/run/install", "/mnt/install/source (deleted)", "/proc"])
+
+    def free_space_map_cache_test(self):
+        """Test the cache of the free space map."""
+        lines = ["22 1 8:1 / / rw,relatime - ext4 /dev/sda1 rw"]
+        mountinfo = self._write_mountinfo(lines)
+        statvfs = Mock(side_effect=self._create_statvfs({"/": (100, 1000), "/tmp": (5, 10)}))
+
+        with patch("pyanaconda.core.native.os.statvfs", statvfs):
+            free_space = native.get_free_space_map(mountinfo, max_age=60)
+            self.assertEqual(free_space, {"/": 100 * 4096})
+
+            # The map is cached.
+            free_space["/tmp"] = 0
+            self.assertEqual(native.get_free_space_map(mountinfo, max_age=60), {"/": 100 * 4096})
+            self.assertEqual(statvfs.call_count, 1)
+
+            # The map is too old.
+            self.assertEqual(native.get_free_space_map(mountinfo, max_age=0), {"/": 100 * 4096})
+            self.assertEqual(statvfs.call_count, 2)
+
+            # A filesystem was mounted.
+            lines.append("23 22 0:21 / /tmp rw - tmpfs tmpfs rw")
+            mountinfo = self._write_mountinfo(lines)
+
+            free_space = native.get_free_space_map(mountinfo, max_age=60)
+            self.assertEqual(free_space, {"/": 100 * 4096, "/tmp": 5 * 4096})
+            self.assertEqual(statvfs.call_count, 4)
+
+    def free_space_map_df_test(self):
+        """Compare the free space map with the output of df."""
+        if not shutil.which("df"):
+            self.skipTest("df is not available")
+
+        output = subprocess.check_output(["df", "--output=target,avail"],
+                                         universal_newlines=True)
+        free_space = native.get_free_space_map(max_age=0)
+
+        for line in output.splitlines()[1:]:
+            mount_point, available = line.rsplit(maxsplit=1)
+
+            if not mount_point.startswith("/"):
+                continue
+
+            self.assertIn(mount_point, free_space)
+            self.assertAlmostEqual(free_space[mount_point], int(available) * 1024,
+                                   delta=100 * 1024 * 1024)
+
+    def copy_tree_test(self):
+        """Test the copy of a directory tree."""
+        source = self.tmpdir + "/source"
+        os.makedirs(source + "/dir/subdir")
+        os.chmod(source + "/dir", 0o750)
+
+        with open(source + "/dir/file", "w") as f:
+            f.write("content")
+
+        os.chmod(source + "/dir/file", 0o4755)
+        os.symlink("file", source + "/dir/link")
+        os.chown(source + "/dir/file", 1000, 1000)
+
+        native.copy_tree(source, self.tmpdir + "/native")
+        subprocess.run(["cp", "-r", "-p", source, self.tmpdir + "/tool"], check=True)
+
+        # Copy to an existing directory.
+        os.mkdir(self.tmpdir + "/existing")
+        native.copy_tree(source, self.tmpdir + "/existing")
+
+        for target in (self.tmpdir + "/native", self.tmpdir + "/existing/source"):
+            for name in ("dir", "dir/subdir", "dir/file", "dir/link"):
+                native_stat = os.lstat(os.path.join(target, name))
+                tool_stat = os.lstat(os.path.join(self.tmpdir + "/tool", name))
+
+                self.assertEqual(native_stat.st_mode, tool_stat.st_mode)
+                self.assertEqual(native_stat.st_uid, tool_stat.st_uid)
+                self.assertEqual(native_stat.st_mtime_ns, tool_stat.st_mtime_ns)
+
+            self.assertEqual(os.readlink(target + "/dir/link"), "file")
+
+    @patch("pyanaconda.core.util.execWithRedirect", return_value=0)
+    def copy_tree_fallback_test(self, exec_mock):
+        """Test the fallback to cp."""
+        self.assertEqual(util.copy_tree(self.tmpdir + "/missing", self.tmpdir + "/target"), 0)
+        exec_mock.assert_called_once_with(
+            "cp", ["-r", "-p", self.tmpdir + "/missing", self.tmpdir + "/target"]
+        )
+
+    @patch("pyanaconda.core.util.execWithRedirect", return_value=0)
+    def copy_tree_partial_test(self, exec_mock):
+        """Test the removal of a partial copy before the fallback to cp."""
+        source = self.tmpdir + "/source"
+        target = self.tmpdir + "/target"
+        os.makedirs(source + "/dir")
+
+        def fail(src, dst):
+            os.makedirs(dst + "/partial")
+            raise OSError("Failed!")
+
+        with patch("pyanaconda.core.native._copy_entry", side_effect=fail):
+            self.assertEqual(util.copy_tree(source, target), 0)
+
+        exec_mock.assert_called_once_with("cp", ["-r", "-p", source, target])
+        self.assertFalse(os.path.exists(target))
+
+        # An existing target is kept.
+        exec_mock.reset_mock()
+        os.makedirs(target + "/source")
+
+        with patch("pyanaconda.core.native._copy_entry", side_effect=fail):
+            self.assertEqual(util.copy_tree(source, target), 0)
+
+        exec_mock.assert_called_once_with("cp", ["-r", "-p", source, target])
+        self.assertTrue(os.path.isdir(target + "/source/partial"))
+
+    @patch("pyanaconda.core.util.execWithRedirect")
+    def restorecon_test(self, exec_mock):
+        """Test the relabeling."""
+        with patch("pyanaconda.core.native.relabel", return_value=True):
+            util.restorecon(["/a", "/b"])
+
+        exec_mock.assert_not_called()
+
+        with patch("pyanaconda.core.native.relabel", return_value=False):
+            util.restorecon(["/a", "/b"])
+            util.restorecon([])
+
+        exec_mock.assert_called_once_with("restorecon", ["-r", "/a", "/b"])
@@ -17,7 +17,10 @@
 # Red Hat, Inc.
 
 from pyanaconda import network
+from pyanaconda.core.signal import Signal
+import threading
 import unittest
+from unittest.mock import patch
 
 
 class NetworkTests(unittest.TestCase):
@@ -251,3 +254,101 @@ class NetworkTests(unittest.TestCase):
         cmdline = {"ip": "[fd00:10:100::84:5]::[fd00:10:100::86:49]:80::ens50:none"
                          "ens3:dhcp 10.34.102.244::10.34.102.54:255.255.255.0:myhostname:ens9:none"}
         self.assertEqual(network.hostname_from_cmdline(cmdline), "myhostname")
+
+
+class FakeNetworkProxy(object):
+    """A fake proxy of the network module that emits signals."""
+
+    def __init__(self):
+        self.PropertiesChanged = Signal()
+        self.DeviceConfigurationChanged = Signal()
+        self.Connected = False
+        self.Connecting = False
+        self.ActivatedInterfaces = []
+        self.checks = 0
+
+    def IsConnecting(self):
+        return self.Connecting
+
+    def GetActivatedInterfaces(self):
+        self.checks += 1
+        return self.ActivatedInterfaces
+
+    def connect(self):
+        self.Connected = True
+        self.PropertiesChanged.emit("org.fedoraproject.Anaconda.Modules.Network",
+                                    {"Connected": True}, [])
+
+    def activate(self, iface):
+        self.ActivatedInterfaces = self.ActivatedInterfaces + [iface]
+        self.DeviceConfigurationChanged.emit([])
+
+
+class NetworkStateWaiterTestCase(unittest.TestCase):
+
+    def _emit_later(self, delay, callback, *args):
+        timer = threading.Timer(delay, callback, args)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def wait_for_signal_test(self):
+        """Test that the waiter wakes up on a signal."""
+        proxy = FakeNetworkProxy()
+        waiter = network.NetworkStateWaiter(proxy, ["PropertiesChanged"],
+                                            lambda p: p.Connected, recheck_interval=60)
+
+        self._emit_later(0.1, proxy.connect)
+        self.assertTrue(waiter.wait(30))
+        self.assertGreaterEqual(waiter.waited, 0.1)
+        self.assertLess(waiter.waited, 10)
+
+        # The callback is disconnected.
+        self.assertFalse(any(proxy.PropertiesChanged._methods.values()))
+
+    def wait_timeout_test(self):
+        """Test that the waiter gives up after the timeout."""
+        proxy = FakeNetworkProxy()
+        waiter = network.NetworkStateWaiter(proxy, ["PropertiesChanged"],
+                                            lambda p: p.Connected, recheck_interval=60)
+
+        self.assertFalse(waiter.wait(0.2))
+        self.assertGreaterEqual(waiter.waited, 0.2)
+        self.assertLess(waiter.waited, 10)
+
+    def wait_recheck_test(self):
+        """Test that the waiter re-checks the condition without signals."""
+        proxy = FakeNetworkProxy()
+        waiter = network.NetworkStateWaiter(proxy, [],
+                                            lambda p: p.Connected, recheck_interval=0.05)
+
+        self._emit_later(0.1, setattr, proxy, "Connected", True)
+        self.assertTrue(waiter.wait(30))
+        self.assertLess(waiter.waited, 10)
+
+    @patch("pyanaconda.network.NETWORK")
+    def wait_for_connected_NM_test(self, network_service):
+        """Test the wait_for_connected_NM function."""
+        proxy = FakeNetworkProxy()
+        network_service.get_proxy.return_value = proxy
+
+        proxy.Connected = True
+        self.assertTrue(network.wait_for_connected_NM(timeout=0))
+
+        proxy.Connected = False
+        self.assertFalse(network.wait_for_connected_NM(timeout=0.1))
+        self.assertFalse(network.wait_for_connected_NM(timeout=30, only_connecting=True))
+
+        self._emit_later(0.1, proxy.connect)
+        self.assertTrue(network.wait_for_connected_NM(timeout=30))
+
+    @patch("pyanaconda.network.NETWORK")
+    def wait_for_network_devices_test(self, network_service):
+        """Test the wait_for_network_devices function."""
+        proxy = FakeNetworkProxy()
+        network_service.get_proxy.return_value = proxy
+
+        self.assertFalse(network.wait_for_network_devices(["ens3"], timeout=0.1))
+
+        self._emit_later(0.1, proxy.activate, "ens3")
+        self._emit_later(0.2, proxy.activate, "ens4")
+        self.assertTrue(network.wait_for_network_devices(["ens3", "ens4"], timeout=30))
@@ -0,0 +1,168 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import socket
+import threading
+import time
+import unittest
+
+from pyanaconda import ntp
+
+
+def _to_ntp_time(timestamp):
+    """Convert the Unix time to a 64-bit NTP timestamp."""
+    timestamp += ntp.NTP_EPOCH_OFFSET
+    return (int(timestamp) << 32) + int((timestamp % 1) * 2**32)
+
+
+class FakeNTPServer(object):
+    """A local UDP stand-in for an NTP server."""
+
+    def __init__(self, stratum=2, offset=0.0, delay=0.0, respond=True):
+        self.stratum = stratum
+        self.offset = offset
+        self.delay = delay
+        self.respond = respond
+        self.queries = 0
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.settimeout(0.1)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self._socket.getsockname()[1]
+
+    def _serve(self):
+        while self._running:
+            try:
+                data, address = self._socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+
+            self.queries += 1
+
+            if not self.respond:
+                continue
+
+            fields = ntp.NTP_PACKET.unpack_from(data)
+            received = _to_ntp_time(time.time() + self.offset)
+            time.sleep(self.delay)
+            transmitted = _to_ntp_time(time.time() + self.offset)
+
+            response = ntp.NTP_PACKET.pack(0x1c, self.stratum, 0, 0, 0, 0, 0,
+                                           received, fields[10], received, transmitted)
+            self._socket.sendto(response, address)
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+        self._socket.close()
+
+
+class NTPServerProberTestCase(unittest.TestCase):
+
+    def _start_server(self, **kwargs):
+        server = FakeNTPServer(**kwargs)
+        self.addCleanup(server.stop)
+        return server
+
+    def probe_test(self):
+        """Test probing of a working NTP server."""
+        server = self._start_server(stratum=3, offset=100, delay=0.05)
+        prober = ntp.NTPServerProber(port=server.port)
+
+        result = prober.probe(["127.0.0.1"], timeout=5)["127.0.0.1"]
+        self.assertTrue(result.working)
+        self.assertEqual(result.stratum, 3)
+        self.assertAlmostEqual(result.offset, 100, delta=1)
+        self.assertGreaterEqual(result.rtt, 0)
+        self.assertLess(result.rtt, 1)
+
+    def probe_many_servers_test(self):
+        """Test probing of many NTP servers with one deadline."""
+        working = self._start_server()
+        silent = self._start_server(respond=False)
+        prober = ntp.NTPServerProber(port=working.port)
+
+        start = time.monotonic()
+        results = prober.probe(["127.0.0.1", "localhost", "invalid.hostname.test"], timeout=0.5)
+        self.assertLess(time.monotonic() - start, 5)
+
+        self.assertTrue(results["127.0.0.1"].working)
+        self.assertFalse(results["invalid.hostname.test"].working)
+
+        prober = ntp.NTPServerProber(port=silent.port)
+        result = prober.probe(["127.0.0.1"], timeout=0.2)["127.0.0.1"]
+        self.assertFalse(result.working)
+        self.assertEqual(silent.queries, 1)
+
+    def slow_resolve_test(self):
+        """Test probing of NTP servers with a slow name resolution."""
+        server = self._start_server()
+        prober = ntp.NTPServerProber(port=server.port)
+        resolve = prober._resolve
+        resumed = threading.Event()
+        self.addCleanup(resumed.set)
+
+        def slow_resolve(hostname):
+            if hostname == "slow.hostname.test":
+                resumed.wait(10)
+                return []
+
+            return resolve(hostname)
+
+        prober._resolve = slow_resolve
+
+        start = time.monotonic()
+        results = prober.probe(["slow.hostname.test", "127.0.0.1"], timeout=0.5)
+        self.assertLess(time.monotonic() - start, 2)
+
+        self.assertTrue(results["127.0.0.1"].working)
+        self.assertFalse(results["slow.hostname.test"].working)
+
+    def kiss_of_death_test(self):
+        """Test a kiss-o'-death response."""
+        server = self._start_server(stratum=0)
+        prober = ntp.NTPServerProber(port=server.port)
+
+        result = prober.probe(["127.0.0.1"], timeout=5)["127.0.0.1"]
+        self.assertFalse(result.working)
+        self.assertEqual(result.stratum, 0)
+
+    def cache_test(self):
+        """Test the cache of the prober."""
+        server = self._start_server()
+        prober = ntp.NTPServerProber(port=server.port, cache_ttl=60)
+
+        self.assertTrue(prober.probe(["127.0.0.1"])["127.0.0.1"].working)
+        self.assertTrue(prober.probe(["127.0.0.1"])["127.0.0.1"].working)
+        self.assertEqual(server.queries, 1)
+
+        prober.probe(["127.0.0.1"], use_cache=False)
+        self.assertEqual(server.queries, 2)
+
+        prober.invalidate()
+        prober.probe(["127.0.0.1"])
+        self.assertEqual(server.queries, 3)
+
+        prober = ntp.NTPServerProber(port=server.port, cache_ttl=0)
+        prober.probe(["127.0.0.1"])
+        prober.probe(["127.0.0.1"])
+        self.assertEqual(server.queries, 5)
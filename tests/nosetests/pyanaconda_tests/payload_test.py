@@ -23,17 +23,32 @@ import tempfile
 import os
 import hashlib
 import shutil
+import multiprocessing
+import threading
+import time
 import gi
 
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.request import urlopen
+
 from tempfile import TemporaryDirectory
 from unittest.mock import patch, Mock, call
+from requests.exceptions import RequestException
 
 from blivet.size import Size
+from pykickstart.parser import Packages
 
 from pyanaconda.core.configuration.anaconda import conf
 from pyanaconda.modules.common.structures.requirement import Requirement
 from pyanaconda.payload import dnfpayload
 from pyanaconda.payload.flatpak import FlatpakPayload
+from pyanaconda.payload.comps import CompsIndex, get_comps_language
+from pyanaconda.payload.download import DownloadScheduler, TransferRate
+from pyanaconda.payload.install_tree_metadata import InstallTreeMetadata
+from pyanaconda.payload.probe import URLProbe, is_probe_supported
+from pyanaconda.payload.package_cache import PackageCache
 from pyanaconda.payload.dnfpayload import RepoMDMetaHash
 from pyanaconda.payload.requirement import PayloadRequirements
 from pyanaconda.payload.errors import PayloadRequirementsMissingApply
@@ -163,6 +178,1039 @@ or it should be. Nah it's just a test!
         os.remove(self._md_file)
         self.assertFalse(r.verify_repoMD())
 
+    def _create_response(self, status_code, text="", headers=None):
+        return Mock(status_code=status_code, ok=status_code == 200,
+                    text=text, headers=headers or {})
+
+    def conditional_verify_test(self):
+        """Test verification with conditional requests."""
+        self._dummyRepo.baseurl = ["http://broken", "http://mirror"]
+        session = Mock()
+        session.get.side_effect = [
+            RequestException("Broken!"),
+            self._create_response(200, "repomd", {"ETag": '"1"', "Last-Modified": "Mon"}),
+        ]
+
+        r = RepoMDMetaHash(DummyPayload(), self._dummyRepo, session)
+        r.store_repoMD_hash()
+
+        # The file was not modified.
+        session.get.reset_mock()
+        session.get.side_effect = [
+            self._create_response(404),
+            self._create_response(304),
+        ]
+        self.assertTrue(r.verify_repoMD())
+
+        headers = [c[1]["headers"] for c in session.get.call_args_list]
+        self.assertNotIn("if-none-match", headers[0])
+        self.assertEqual(headers[1]["if-none-match"], '"1"')
+        self.assertEqual(headers[1]["if-modified-since"], "Mon")
+
+        # The file was modified.
+        session.get.side_effect = [
+            self._create_response(404),
+            self._create_response(200, "new repomd"),
+        ]
+        self.assertFalse(r.verify_repoMD())
+
+        # The file is the same.
+        session.get.side_effect = [
+            self._create_response(200, "repomd"),
+        ]
+        self.assertTrue(r.verify_repoMD())
+
+        # The server doesn't support conditional requests.
+        self._dummyRepo.baseurl = ["http://mirror"]
+        session.get.side_effect = [
+            self._create_response(200, "repomd"),
+            self._create_response(304),
+        ]
+
+        r = RepoMDMetaHash(DummyPayload(), self._dummyRepo, session)
+        r.store_repoMD_hash()
+        self.assertFalse(r.verify_repoMD())
+
+    def verify_available_repositories_test(self):
+        """Test the concurrent verification of repositories."""
+        payload = dnfpayload.DNFPayload.__new__(dnfpayload.DNFPayload)
+        payload._repoMD_list = []
+        self.assertFalse(payload.verify_available_repositories())
+
+        repos = [Mock(id="repo-%d" % i) for i in range(20)]
+        for repo in repos:
+            repo.verify_repoMD.return_value = True
+
+        payload._repoMD_list = repos
+        self.assertTrue(payload.verify_available_repositories())
+
+        for repo in repos:
+            repo.verify_repoMD.assert_called_once_with()
+
+        repos[10].verify_repoMD.return_value = False
+        self.assertFalse(payload.verify_available_repositories())
+
+
+class DummyPackage(object):
+    def __init__(self, i):
+        self.name = "package-%d" % i
+        self.reponame = "anaconda"
+        self.installsize = 1000 * i
+        self._files = ["/usr/share/p%d/f%d" % (i, j) for j in range(i % 7)]
+        self.files_read = 0
+
+    @property
+    def files(self):
+        self.files_read += 1
+        return list(self._files)
+
+    def __str__(self):
+        return self.name + "-1.0-1.x86_64"
+
+
+class TransactionSizeEstimatorTestCase(unittest.TestCase):
+
+    def _create_transaction(self, count, offset=0):
+        return [Mock(pkg=DummyPackage(i)) for i in range(offset, offset + count)]
+
+    def _count(self, transaction):
+        size = 0
+        files_nm = 0
+
+        for tsi in transaction:
+            size += tsi.pkg.installsize
+            files_nm += len(tsi.pkg.files)
+
+        return size, files_nm
+
+    def _get_files_read(self, transaction):
+        return [tsi.pkg.files_read for tsi in transaction]
+
+    def estimate_test(self):
+        """Compare the estimate with the sizes of the packages."""
+        estimator = dnfpayload.TransactionSizeEstimator()
+        transaction = self._create_transaction(100)
+
+        self.assertEqual(estimator.estimate(transaction), self._count(transaction))
+        self.assertEqual(estimator.estimate([]), (0, 0))
+
+    def cache_test(self):
+        """Test that the file lists are read only once."""
+        estimator = dnfpayload.TransactionSizeEstimator()
+        transaction = self._create_transaction(10)
+        expected = self._count(transaction)
+
+        # The same transaction.
+        self.assertEqual(estimator.estimate(transaction), expected)
+        self.assertEqual(estimator.estimate(transaction), expected)
+        self.assertEqual(self._get_files_read(transaction), [2] * 10)
+
+        # A different transaction with some of the same packages.
+        other = self._create_transaction(20, offset=5)
+        expected = self._count(other)
+
+        self.assertEqual(estimator.estimate(other), expected)
+        self.assertEqual(self._get_files_read(other), [1] * 5 + [2] * 15)
+
+        # Nothing is remembered after the reset.
+        estimator.clear()
+        self.assertEqual(estimator.estimate(other), expected)
+        self.assertEqual(self._get_files_read(other), [2] * 5 + [3] * 15)
+
+
+def _report_transaction_progress(channel, count):
+    for i in range(count):
+        channel.set_progress("install", "package-%d.x86_64 (%d/%d)" % (i, i + 1, count))
+        channel.log("Installed: package-%d" % i)
+
+    channel.send("post", None)
+    channel.log("Post installation setup phase started.")
+    channel.send("done", None)
+    channel.send("quit", "DNF quit")
+
+
+class TransactionProgressChannelTestCase(unittest.TestCase):
+
+    def progress_test(self):
+        """Test the last progress message."""
+        channel = dnfpayload.TransactionProgressChannel(interval=10)
+        self.assertIsNone(channel.get_progress(force=True))
+
+        channel.set_progress("install", "a.x86_64 (1/2)")
+        channel.set_progress("install", "b.x86_64 (2/2)")
+        self.assertEqual(channel.get_progress(), ("install", "b.x86_64 (2/2)"))
+        self.assertIsNone(channel.get_progress(force=True))
+
+        # The updates are limited by the interval.
+        channel.set_progress("verify", "a.x86_64 (1/2)")
+        self.assertIsNone(channel.get_progress())
+        self.assertEqual(channel.get_progress(force=True), ("verify", "a.x86_64 (1/2)"))
+
+        # Long messages are truncated.
+        channel.set_progress("install", "x" * 10000)
+        token, msg = channel.get_progress(force=True)
+        self.assertEqual(token, "install")
+        self.assertLess(len(msg), dnfpayload.TRANSACTION_PROGRESS_SIZE)
+
+    def process_test(self):
+        """Test the progress of a child process."""
+        channel = dnfpayload.TransactionProgressChannel(interval=10, batch_size=50)
+        process = multiprocessing.Process(target=_report_transaction_progress,
+                                          args=(channel, 1000))
+        process.start()
+
+        events = []
+        while True:
+            event = channel.receive()
+            if event:
+                events.append(event)
+            if event and event[0] == "quit":
+                break
+
+        process.join()
+
+        # The log lines are sent in batches before the other events.
+        tokens = [token for token, _msg in events]
+        self.assertEqual(tokens, ["log"] * 21 + ["post", "log", "done", "quit"])
+
+        lines = [line for token, msg in events if token == "log" for line in msg]
+        self.assertEqual(lines[:-1], ["Installed: package-%d" % i for i in range(1000)])
+        self.assertEqual(lines[-1], "Post installation setup phase started.")
+
+        # Only the last progress message is kept.
+        self.assertEqual(channel.get_progress(),
+                         ("install", "package-999.x86_64 (1000/1000)"))
+
+
+class DNFPayloadSelectionCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.payload = dnfpayload.DNFPayload.__new__(dnfpayload.DNFPayload)
+        self.payload.tx_id = None
+        self.payload.data = Mock()
+        self.payload.data.packages = Packages()
+        self.payload.data.module.dataList.return_value = []
+        self.payload.requirements = PayloadRequirements()
+        self.payload._repos_lock = threading.RLock()
+        self.payload._resolved_selection = None
+
+        repo = Mock()
+        repo.id = "anaconda"
+        self.payload._base = Mock()
+        self.payload._base.repos.iter_enabled.return_value = [repo]
+        self.payload._base.transaction = []
+
+    def _check(self):
+        with patch.object(dnfpayload.DNFPayload, "_process_module_command") as process_modules, \
+                patch.object(dnfpayload.DNFPayload, "_apply_selections"), \
+                patch.object(dnfpayload.DNFPayload, "kernel_packages", ["kernel"]), \
+                patch.object(dnfpayload.DNFPayload, "space_required", Size("1 GiB")):
+            self.payload.check_software_selection()
+            return process_modules.called
+
+    def cache_test(self):
+        """Test the cache of the resolved software selection."""
+        # The first check resolves the selection.
+        self.assertTrue(self._check())
+        self.assertEqual(self.payload._base.resolve.call_count, 1)
+        self.assertEqual(self.payload.tx_id, 1)
+
+        # Nothing has changed.
+        self.assertFalse(self._check())
+        self.assertEqual(self.payload._base.resolve.call_count, 1)
+        self.assertEqual(self.payload.tx_id, 2)
+
+        # The packages have changed.
+        self.payload.data.packages.packageList.append("vim")
+        self.assertTrue(self._check())
+        self.assertFalse(self._check())
+
+        # The requirements have changed.
+        self.payload.requirements.add_packages(["chrony"], "reason")
+        self.assertTrue(self._check())
+        self.assertFalse(self._check())
+
+        # The metadata were reloaded.
+        self.payload._base.sack = Mock()
+        self.assertTrue(self._check())
+        self.assertFalse(self._check())
+
+        # The enabled repositories have changed.
+        self.payload._base.repos.iter_enabled.return_value = []
+        self.assertTrue(self._check())
+        self.assertFalse(self._check())
+
+        self.assertEqual(self.payload._base.resolve.call_count, 5)
+
+    def cache_error_test(self):
+        """Test that a failed resolve is not cached."""
+        self.payload._base.resolve.side_effect = dnfpayload.dnf.exceptions.DepsolveError("Error!")
+
+        with self.assertRaises(dnfpayload.DependencyError):
+            self._check()
+
+        with self.assertRaises(dnfpayload.DependencyError):
+            self._check()
+
+        self.assertEqual(self.payload._base.resolve.call_count, 2)
+
+
+class FakeComps(object):
+    """Fake comps metadata."""
+
+    def __init__(self, environments=(), groups=()):
+        self.environments = list(environments)
+        self.groups = list(groups)
+        self.environment_by_pattern = Mock(return_value=None)
+        self.group_by_pattern = Mock(return_value=None)
+
+    def groups_iter(self):
+        return iter(self.groups)
+
+
+def _create_environment(env_id, options):
+    env = Mock(id=env_id, ui_name=env_id.title(), ui_description="%s environment" % env_id)
+    env.name = env_id.title()
+    env.option_ids = []
+
+    for name, default in options:
+        option = Mock(default=default)
+        option.name = name
+        env.option_ids.append(option)
+
+    return env
+
+
+def _create_group(grp_id, visible=True, lang_only=None):
+    grp = Mock(id=grp_id, visible=visible, lang_only=lang_only,
+               ui_name=grp_id.title(), ui_description="%s group" % grp_id)
+    grp.name = grp_id.title()
+    return grp
+
+
+def _create_comps():
+    return FakeComps(
+        environments=[
+            _create_environment("server", [("web", True), ("mail", False)]),
+            _create_environment("workstation", [("office", True), ("web", False)]),
+            _create_environment("minimal", []),
+        ],
+        groups=[
+            _create_group("core", visible=False),
+            _create_group("web"),
+            _create_group("mail"),
+            _create_group("office"),
+            _create_group("tools"),
+            _create_group("czech-support", lang_only="cs_CZ"),
+            _create_group("czech-fonts", lang_only="cs"),
+            _create_group("french-support", lang_only="fr"),
+        ]
+    )
+
+
+class CompsIndexTestCase(unittest.TestCase):
+
+    def index_test(self):
+        """Test the comps index."""
+        comps = _create_comps()
+        index = CompsIndex(comps)
+
+        self.assertEqual(index.comps, comps)
+        self.assertEqual(index.environments, ["server", "workstation", "minimal"])
+        self.assertEqual(index.groups, ["core", "web", "mail", "office", "tools",
+                                        "czech-support", "czech-fonts", "french-support"])
+
+        self.assertEqual(dict(index.get_options("server")), {"web": True, "mail": False})
+        self.assertEqual(list(index.get_options("workstation")), ["office", "web"])
+        self.assertEqual(dict(index.get_options("minimal")), {})
+        self.assertEqual(dict(index.get_options("unknown")), {})
+
+        self.assertEqual(index.get_environments_of_group("web"), ["server", "workstation"])
+        self.assertEqual(index.get_environments_of_group("tools"), [])
+        self.assertEqual(index.get_environments_of_group("unknown"), [])
+
+        self.assertEqual(dict(index.get_lang_only_groups()), {
+            "cs_CZ": ["czech-support"],
+            "cs": ["czech-fonts"],
+            "fr": ["french-support"],
+        })
+
+    def lookup_test(self):
+        """Test the lookups of the comps index."""
+        comps = _create_comps()
+        index = CompsIndex(comps)
+
+        self.assertEqual(index.get_environment("server").id, "server")
+        self.assertEqual(index.get_environment("Workstation").id, "workstation")
+        self.assertEqual(index.get_group("web").id, "web")
+        self.assertEqual(index.get_group("Office").id, "office")
+        comps.environment_by_pattern.assert_not_called()
+        comps.group_by_pattern.assert_not_called()
+
+        # Other patterns are handled by the comps object.
+        self.assertIsNone(index.get_environment("serv*"))
+        comps.environment_by_pattern.assert_called_once_with("serv*")
+
+        comps.group_by_pattern.return_value = comps.groups[1]
+        self.assertEqual(index.get_group("w?b").id, "web")
+        comps.group_by_pattern.assert_called_once_with("w?b")
+
+    @patch("pyanaconda.payload.dnfpayload.LOCALIZATION")
+    def payload_test(self, localization):
+        """Test the comps index of the DNF payload."""
+        payload = dnfpayload.DNFPayload.__new__(dnfpayload.DNFPayload)
+        payload._base = Mock()
+        payload._base.comps = _create_comps()
+        payload._comps_index = None
+
+        self.assertEqual(payload.environments, ["server", "workstation", "minimal"])
+        self.assertEqual(payload.environment_id("Server"), "server")
+        self.assertEqual(payload.environment_description("server"),
+                         ("Server", "server environment"))
+        self.assertEqual(payload.group_description("mail"), ("Mail", "mail group"))
+        self.assertEqual(payload.group_id("Tools"), "tools")
+
+        self.assertTrue(payload.environment_has_option("server", "mail"))
+        self.assertFalse(payload.environment_has_option("server", "office"))
+        self.assertTrue(payload.environment_option_is_default("server", "web"))
+        self.assertFalse(payload.environment_option_is_default("server", "mail"))
+        self.assertFalse(payload.environment_option_is_default("minimal", "web"))
+
+        with self.assertRaises(dnfpayload.NoSuchGroup):
+            payload.environment_description("unknown")
+
+        with self.assertRaises(dnfpayload.NoSuchGroup):
+            payload.group_id("unknown")
+
+        payload._refresh_environment_addons()
+        self.assertEqual(payload.environment_addons, {
+            "server": (["web", "mail"], ["office", "tools", "czech-support",
+                                         "czech-fonts", "french-support"]),
+            "workstation": (["web", "office"], ["mail", "tools", "czech-support",
+                                                "czech-fonts", "french-support"]),
+            "minimal": ([], ["web", "mail", "office", "tools", "czech-support",
+                             "czech-fonts", "french-support"]),
+        })
+
+        proxy = localization.get_proxy.return_value
+        proxy.Language = "cs_CZ.UTF-8"
+        proxy.LanguageSupport = ["en_US.UTF-8"]
+        self.assertEqual(set(payload.language_groups()), {"czech-support", "czech-fonts"})
+
+        # The index is created again for new comps metadata.
+        index = payload.comps_index
+        self.assertIs(payload.comps_index, index)
+
+        payload._base.comps = FakeComps()
+        self.assertIsNot(payload.comps_index, index)
+        self.assertEqual(payload.environments, [])
+
+    def descriptions_test(self):
+        """Test the cached descriptions of the comps index."""
+        comps = _create_comps()
+        index = CompsIndex(comps)
+        server = comps.environments[0]
+        web = comps.groups[1]
+
+        self.assertEqual(index.get_environment_description(server, "C"),
+                         ("Server", "server environment"))
+        self.assertEqual(index.get_group_description(web, "C"), ("Web", "web group"))
+
+        # The descriptions are cached for the language.
+        server.ui_name = "Changed"
+        web.ui_name = "Changed"
+        self.assertEqual(index.get_environment_description(server, "C")[0], "Server")
+        self.assertEqual(index.get_group_description(web, "C")[0], "Web")
+
+        # Other languages are translated again.
+        self.assertEqual(index.get_environment_description(server, "cs_CZ.UTF-8")[0], "Changed")
+        self.assertEqual(index.get_group_description(web, "cs_CZ.UTF-8")[0], "Changed")
+
+        # All descriptions can be cached at once.
+        index.load_descriptions("fr_FR.UTF-8")
+        server.ui_name = "Server"
+        self.assertEqual(index.get_environment_description(server, "fr_FR.UTF-8")[0], "Changed")
+        self.assertEqual(index.get_group_description(comps.groups[-1], "fr_FR.UTF-8"),
+                         ("French-Support", "french-support group"))
+
+        # The current language is used by default.
+        index.load_descriptions()
+        self.assertEqual(index.get_environment_description(server),
+                         index.get_environment_description(server, get_comps_language()))
+
+    def payload_descriptions_test(self):
+        """Test the cached descriptions of the DNF payload."""
+        payload = dnfpayload.DNFPayload.__new__(dnfpayload.DNFPayload)
+        payload._base = Mock(comps=None)
+        payload._comps_index = None
+
+        # There are no comps metadata to translate.
+        payload.load_descriptions()
+        self.assertIsNone(payload._comps_index)
+
+        comps = payload._base.comps = _create_comps()
+        payload.load_descriptions()
+
+        # The spokes read the cached strings.
+        for item in comps.environments + comps.groups:
+            item.ui_name = "Changed"
+
+        self.assertEqual(payload.environment_description("server"),
+                         ("Server", "server environment"))
+        self.assertEqual(payload.group_description("web"), ("Web", "web group"))
+
+
+class StagedPackage(object):
+    """A package with its content."""
+
+    def __init__(self, name, pkgdir):
+        self.content = ("content of %s" % name).encode()
+        self.location = "Packages/%s.rpm" % name
+        self.downloadsize = len(self.content)
+        self._pkgdir = pkgdir
+
+    def returnIdSum(self):
+        return "SHA256", hashlib.sha256(self.content).hexdigest()
+
+    def localPkg(self):
+        return os.path.join(self._pkgdir, os.path.basename(self.location))
+
+    def download(self):
+        os.makedirs(self._pkgdir, exist_ok=True)
+        with open(self.localPkg(), "wb") as f:
+            f.write(self.content)
+
+
+class PackageCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+        self._pkgdir = os.path.join(self._tmpdir, "download")
+        self._packages = [StagedPackage("package-%d" % i, self._pkgdir) for i in range(5)]
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+    def _read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def cache_test(self):
+        """Test the reuse of downloaded packages."""
+        cache = PackageCache(os.path.join(self._tmpdir, "cache"))
+        self.assertEqual(cache.stage(self._packages), self._packages)
+
+        for pkg in self._packages:
+            pkg.download()
+
+        cache.collect(self._packages, self._pkgdir)
+        shutil.rmtree(self._pkgdir)
+
+        self.assertEqual(cache.stage(self._packages), [])
+        self.assertEqual(cache.cached_size, sum(pkg.downloadsize for pkg in self._packages))
+
+        for pkg in self._packages:
+            self.assertEqual(self._read(pkg.localPkg()), pkg.content)
+
+        # The packages are addressed by their content.
+        shutil.rmtree(self._pkgdir)
+        changed = StagedPackage("package-0", self._pkgdir)
+        changed.content = b"new content"
+        self.assertEqual(cache.stage([changed]), [changed])
+        self.assertEqual(cache.cached_size, 0)
+
+        cache.clear()
+        self.assertFalse(os.path.exists(cache.path))
+        self.assertEqual(cache.stage(self._packages), self._packages)
+
+    def verify_test(self):
+        """Test the verification of packages left by a failed attempt."""
+        cache = PackageCache(os.path.join(self._tmpdir, "cache"))
+
+        for pkg in self._packages:
+            pkg.download()
+
+        # A partially downloaded package.
+        with open(self._packages[0].localPkg(), "wb") as f:
+            f.write(b"content")
+
+        cache.collect(self._packages, self._pkgdir, verify=True)
+        shutil.rmtree(self._pkgdir)
+
+        self.assertEqual(cache.stage(self._packages), self._packages[:1])
+        self.assertEqual(cache.cached_size, sum(pkg.downloadsize for pkg in self._packages[1:]))
+
+    def corrupted_test(self):
+        """Test the unverified packages in the cache."""
+        path = os.path.join(self._tmpdir, "cache")
+        pkg = self._packages[0]
+        pkg.download()
+
+        PackageCache(path).collect([pkg], self._pkgdir, verify=True)
+        os.unlink(pkg.localPkg())
+
+        # A new cache doesn't trust the existing entry.
+        cache = PackageCache(path)
+        cache_path = cache.lookup(pkg)
+
+        with open(cache_path, "wb") as f:
+            f.write(b"content")
+
+        cache = PackageCache(path)
+        self.assertIsNone(cache.lookup(pkg))
+        self.assertFalse(os.path.exists(cache_path))
+        self.assertEqual(cache.stage([pkg]), [pkg])
+
+        # The corrupted entry is replaced.
+        with open(cache_path, "wb") as f:
+            f.write(b"content")
+
+        pkg.download()
+        self.assertTrue(PackageCache(path).add(pkg, pkg.localPkg()))
+
+        with open(cache_path, "rb") as f:
+            self.assertEqual(f.read(), pkg.content)
+
+    def directories_test(self):
+        """Test the packages from local directories."""
+        directory = os.path.join(self._tmpdir, "media")
+        os.makedirs(os.path.join(directory, "Packages", "p"))
+
+        for pkg in self._packages[:3]:
+            path = os.path.join(directory, "Packages", "p", os.path.basename(pkg.location))
+            with open(path, "wb") as f:
+                f.write(pkg.content)
+
+        # A package with the same name, but a different content.
+        with open(os.path.join(directory, os.path.basename(self._packages[3].location)), "wb") as f:
+            f.write(b"other content")
+
+        cache = PackageCache(directories=[directory])
+        self.assertEqual(cache.stage(self._packages), self._packages[3:])
+
+        for pkg in self._packages[:3]:
+            self.assertEqual(self._read(pkg.localPkg()), pkg.content)
+
+        # The local directories are never modified.
+        self.assertFalse(cache.add(self._packages[0], self._packages[0].localPkg()))
+
+    def media_test(self):
+        """Test that the packages from the installation media are not cached."""
+        cache = PackageCache(os.path.join(self._tmpdir, "cache"))
+        media = [StagedPackage("package-%d" % i, os.path.join(self._tmpdir, "media"))
+                 for i in range(5)]
+
+        for pkg in media:
+            pkg.download()
+
+        cache.collect(media, self._pkgdir, verify=True)
+        self.assertFalse(os.path.exists(cache.path))
+        self.assertEqual(cache.stage(self._packages), self._packages)
+
+    @patch("pyanaconda.payload.package_cache.os.link", side_effect=OSError("Cross-device link"))
+    def copy_test(self, link):
+        """Test the cache on file systems without hard links."""
+        cache = PackageCache(os.path.join(self._tmpdir, "cache"))
+
+        for pkg in self._packages:
+            pkg.download()
+
+        cache.collect(self._packages, self._pkgdir)
+        shutil.rmtree(self._pkgdir)
+
+        self.assertEqual(cache.stage(self._packages), [])
+        self.assertTrue(link.called)
+
+        for pkg in self._packages:
+            self.assertEqual(self._read(pkg.localPkg()), pkg.content)
+
+
+class RemotePackage(object):
+    """A package in a remote repository."""
+
+    def __init__(self, name, reponame, size):
+        self.name = name
+        self.reponame = reponame
+        self.downloadsize = size
+        self.location = "Packages/%d/%s.rpm" % (size, name)
+
+    def __repr__(self):
+        return "%s@%s" % (self.name, self.reponame)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    block_on_close = False
+
+
+class _MirrorRequestHandler(BaseHTTPRequestHandler):
+    """Send a package of the requested size with the server's latency."""
+
+    def do_GET(self):
+        size = int(self.path.split("/")[-2])
+        self.send_response(200)
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+
+        for i in range(0, size, 8192):
+            time.sleep(self.server.latency)
+            self.wfile.write(b"x" * min(8192, size - i))
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class RecordedProgress(object):
+    """A progress that records the downloaded packages."""
+
+    def __init__(self):
+        self.total = None
+        self.finished = []
+
+    def start(self, total_files, total_size):
+        self.total = (total_files, total_size)
+
+    def progress(self, payload, done):
+        pass
+
+    def end(self, payload, status, msg):
+        self.finished.append(payload.pkg.name)
+
+
+class DownloadSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._servers = {}
+
+    def tearDown(self):
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def _start_mirror(self, name, latency):
+        server = _ThreadingHTTPServer(("127.0.0.1", 0), _MirrorRequestHandler)
+        server.latency = latency
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._servers[name] = server
+
+    def _download(self, packages, progress):
+        """Download the packages like DNF does."""
+        progress.start(len(packages), sum(pkg.downloadsize for pkg in packages))
+
+        def fetch(pkg):
+            payload = Mock(pkg=pkg, download_size=pkg.downloadsize)
+            url = "http://127.0.0.1:%d/%s" % (self._servers[pkg.reponame].server_port,
+                                              pkg.location)
+            done = 0
+
+            with urlopen(url, timeout=10) as response:
+                for chunk in iter(lambda: response.read(8192), b""):
+                    done += len(chunk)
+                    progress.progress(payload, done)
+
+            progress.end(payload, None, "")
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(fetch, packages))
+
+    def transfer_rate_test(self):
+        """Test the transfer rate."""
+        now = [0]
+        rate = TransferRate(window=10, clock=lambda: now[0])
+        self.assertEqual(rate.rate, 0)
+        self.assertIsNone(rate.get_eta(100))
+
+        for i in range(1, 31):
+            now[0] = i
+            rate.update(i * 100)
+
+        self.assertEqual(rate.rate, 100)
+        self.assertEqual(rate.get_eta(1000), 10)
+
+        # The rate follows the recent transfers.
+        for i in range(31, 41):
+            now[0] = i
+            rate.update(3000 + (i - 30) * 10)
+
+        self.assertLess(rate.rate, 20)
+
+    @patch("pyanaconda.payload.dnfpayload.progressQ")
+    def download_progress_test(self, progressQ):
+        """Test the progress of the whole download."""
+        progress = dnfpayload.DownloadProgress()
+        first, second = Mock(download_size=100), Mock(download_size=200)
+
+        with patch.object(progress.rate, "update", wraps=progress.rate.update) as update:
+            progress.start(2, 300)
+            update.assert_called_once_with(0)
+
+            for done in range(0, 101, 10):
+                progress.progress(first, done)
+                progress.progress(second, 2 * done)
+
+            # The rate is measured only with the paced messages.
+            self.assertEqual(progress.downloaded, 300)
+            update.assert_called_once_with(0)
+            progressQ.send_message.assert_not_called()
+
+            progress.last_time = 0
+            progress.end(second, dnfpayload.dnf.callback.STATUS_OK, "")
+            self.assertEqual(progress.downloaded, 300)
+            update.assert_called_with(300)
+            self.assertEqual(update.call_count, 2)
+            progressQ.send_message.assert_called_once()
+
+    def schedule_test(self):
+        """Test the distribution of packages to the sources."""
+        scheduler = DownloadScheduler(Mock(), batch_size=20)
+        scheduler.add_measurement(RemotePackage("a", "fast", 1000), 1000, 1)
+        scheduler.add_measurement(RemotePackage("b", "slow", 100), 100, 1)
+
+        self.assertEqual(scheduler.get_throughput("fast"), 1000)
+        self.assertEqual(scheduler.get_throughput("slow"), 100)
+        self.assertIsNone(scheduler.get_throughput("unknown"))
+
+        alternatives = {}
+        packages = []
+        for i in range(11):
+            pkg = RemotePackage("p%d" % i, "slow", 100)
+            alternatives[pkg] = [pkg, RemotePackage("p%d" % i, "fast", 100)]
+            packages.append(pkg)
+
+        batch = scheduler._create_batch(packages, alternatives)
+        self.assertEqual([pkg.name for pkg in batch], ["p%d" % i for i in range(11)])
+        self.assertEqual(sum(pkg.reponame == "slow" for pkg in batch), 1)
+
+        # Unknown sources are tried.
+        pkg = RemotePackage("new", "slow", 100)
+        alternatives = {pkg: [pkg, RemotePackage("new", "unknown", 100)]}
+        self.assertEqual(scheduler._create_batch([pkg], alternatives)[0].reponame, "unknown")
+
+    def mirrors_test(self):
+        """Test the download from mirrors with different latencies."""
+        self._start_mirror("fast", 0)
+        self._start_mirror("slow", 0.05)
+
+        packages = []
+        alternatives = {}
+
+        for i in range(30):
+            size = 8192 * (1 + i % 4)
+            pkg = RemotePackage("package-%d" % i, "slow", size)
+            alternatives[pkg] = [pkg, RemotePackage(pkg.name, "fast", size)]
+            packages.append(pkg)
+
+        progress = RecordedProgress()
+        scheduler = DownloadScheduler(self._download, progress, batch_size=6)
+
+        scheduler.download(packages, alternatives.get)
+        downloaded = scheduler.downloaded
+
+        total_size = sum(pkg.downloadsize for pkg in packages)
+        self.assertEqual(progress.total, (30, total_size))
+        self.assertEqual(sorted(progress.finished), sorted(pkg.name for pkg in packages))
+        self.assertEqual(sum(downloaded.values()), total_size)
+        self.assertGreater(downloaded["fast"], downloaded.get("slow", 0))
+        self.assertGreater(scheduler.get_throughput("fast"), scheduler.get_throughput("slow"))
+
+    def error_test(self):
+        """Test a failed download of a batch."""
+        download = Mock(side_effect=[OSError("Failed!"), None])
+        packages = [RemotePackage("p%d" % i, "repo", 100 * i) for i in range(4)]
+        scheduler = DownloadScheduler(download, batch_size=2)
+
+        with self.assertRaises(OSError):
+            scheduler.download(packages)
+
+        # All batches are downloaded, the largest packages first.
+        self.assertEqual(download.call_count, 2)
+        self.assertEqual(download.call_args_list[0][0][0], packages[:1:-1])
+        self.assertEqual(download.call_args_list[1][0][0], packages[1::-1])
+
+
+class _ProbeRequestHandler(BaseHTTPRequestHandler):
+    """Respond with the configured delay and status of the path."""
+
+    def do_GET(self):
+        delay, status = self.server.routes.get(self.path, (0, 404))
+        self.server.requests.append(self.path)
+        time.sleep(delay)
+
+        body = b"content of " + self.path.encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class URLProbeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._server = _ThreadingHTTPServer(("127.0.0.1", 0), _ProbeRequestHandler)
+        self._server.routes = {}
+        self._server.requests = []
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _url(self, path):
+        return "http://127.0.0.1:%d%s" % (self._server.server_port, path)
+
+    def _race(self, paths, deadline=5, extra_paths=()):
+        probe = URLProbe(deadline=deadline)
+        start = time.monotonic()
+        result = probe.race([self._url(p) for p in paths], [self._url(p) for p in extra_paths])
+        return probe, result, time.monotonic() - start
+
+    def supported_test(self):
+        """Test the supported URLs."""
+        self.assertTrue(is_probe_supported("http://example.com/repo"))
+        self.assertTrue(is_probe_supported("file:///run/install/repo"))
+        self.assertFalse(is_probe_supported("nfs:server:/repo"))
+        self.assertFalse(is_probe_supported(None))
+
+    def priority_test(self):
+        """Test that the preferred URL wins the race."""
+        self._server.routes = {"/slow": (0.3, 200), "/fast": (0, 200)}
+        probe, result, _duration = self._race(["/slow", "/fast"])
+
+        self.assertEqual(result.url, self._url("/slow"))
+        self.assertEqual(result.response.text, "content of /slow")
+        self.assertGreaterEqual(result.latency, 0.3)
+        result.response.close()
+
+        self.assertEqual(sorted(r.url for r in probe.results),
+                         [self._url("/fast"), self._url("/slow")])
+
+    def failover_test(self):
+        """Test that an unreachable URL costs only the deadline."""
+        self._server.routes = {"/hanging": (3, 200), "/missing": (0, 404), "/valid": (0, 200)}
+        _probe, result, duration = self._race(["/hanging", "/missing", "/valid"], deadline=0.5)
+
+        self.assertEqual(result.url, self._url("/valid"))
+        self.assertLess(duration, 2)
+        result.response.close()
+
+    def invalid_test(self):
+        """Test a race without valid responses."""
+        self._server.routes = {"/error": (0, 500)}
+        probe, result, _duration = self._race(["/error", "/missing"])
+
+        self.assertIsNone(result)
+        self.assertEqual({r.url: r.status_code for r in probe.results},
+                         {self._url("/error"): 500, self._url("/missing"): 404})
+
+        # Unreachable servers are recorded with their errors.
+        probe = URLProbe(deadline=1)
+        self.assertIsNone(probe.race(["http://127.0.0.1:1/repo"]))
+        self.assertIsNotNone(probe.results[0].error)
+
+    def slow_test(self):
+        """Test the normal timeout if no URL responds before the deadline."""
+        self._server.routes = {"/slow": (1, 200), "/missing": (0, 404)}
+        _probe, result, duration = self._race(["/missing", "/slow"], deadline=0.2)
+
+        self.assertEqual(result.url, self._url("/slow"))
+        self.assertGreaterEqual(duration, 1)
+        result.response.close()
+
+    @patch("pyanaconda.payload.probe.util.requests_session")
+    def ftp_test(self, requests_session):
+        """Test the probe of FTP URLs."""
+        shared = Mock()
+        sessions = {}
+
+        def get(url, session, **kwargs):
+            response = Mock(status_code=404 if url.endswith("/.treeinfo") else 200)
+            sessions[url] = (session, kwargs)
+            return response
+
+        def create_session():
+            session = Mock()
+            session.get.side_effect = lambda url, **kwargs: get(url, session=session, **kwargs)
+            return session
+
+        requests_session.side_effect = [shared] + [create_session() for _i in range(2)]
+
+        probe = URLProbe()
+        result = probe.race(["ftp://server/tree/.treeinfo", "ftp://server/tree/treeinfo"])
+        self.assertEqual(result.url, "ftp://server/tree/treeinfo")
+
+        # Every FTP request has its own session and a simple timeout.
+        shared.get.assert_not_called()
+        self.assertEqual(len({id(session) for session, _kwargs in sessions.values()}), 2)
+
+        for _session, kwargs in sessions.values():
+            self.assertIsInstance(kwargs["timeout"], int)
+
+    def error_test(self):
+        """Test unexpected errors of the requests."""
+        session = Mock()
+        session.get.side_effect = TypeError("Invalid timeout!")
+
+        probe = URLProbe(session=session)
+        self.assertIsNone(probe.race(["http://server/.treeinfo", "http://server/treeinfo"]))
+        self.assertEqual(len(probe.results), 2)
+        self.assertIn("Invalid timeout!", probe.results[0].error)
+        self.assertIsNone(probe.results[0].status_code)
+
+    def extra_urls_test(self):
+        """Test the URLs probed for diagnostics."""
+        self._server.routes = {"/base": (0, 200), "/addon": (0.2, 200)}
+        probe, result, duration = self._race(["/base"], extra_paths=["/addon", "/base"])
+
+        self.assertEqual(result.url, self._url("/base"))
+        self.assertLess(duration, 0.2)
+        result.response.close()
+
+        # The race doesn't wait for the extra URLs.
+        time.sleep(0.5)
+        self.assertEqual(sorted(r.url for r in probe.results),
+                         [self._url("/addon"), self._url("/base")])
+
+    def treeinfo_test(self):
+        """Test the download of the treeinfo files."""
+        self._server.routes = {"/tree/treeinfo": (0, 200)}
+        metadata = InstallTreeMetadata()
+        self.assertTrue(metadata.load_url(self._url("/tree"), {}, True, None, {}))
+        self.assertEqual(sorted(self._server.requests), ["/tree/.treeinfo", "/tree/treeinfo"])
+
+        # Don't try again if the files don't exist.
+        self._server.requests = []
+        self.assertFalse(metadata.load_url(self._url("/none"), {}, True, None, {}))
+        self.assertEqual(len(self._server.requests), 2)
+
+    def base_repo_test(self):
+        """Test the failover of the base repository."""
+        payload = dnfpayload.DNFPayload.__new__(dnfpayload.DNFPayload)
+        payload.data = Mock()
+        payload.data.repo.dataList.return_value = []
+        payload._install_tree_metadata = None
+        payload._get_install_tree_request_args = Mock(return_value={})
+
+        self._server.routes = {"/tree/BaseOS/repodata/repomd.xml": (0, 200),
+                               "/tree/repodata/repomd.xml": (0, 200)}
+        self.assertEqual(payload._probe_base_repo(self._url("/tree"), self._url("/tree/BaseOS")),
+                         self._url("/tree/BaseOS"))
+
+        del self._server.routes["/tree/BaseOS/repodata/repomd.xml"]
+        self.assertEqual(payload._probe_base_repo(self._url("/tree"), self._url("/tree/BaseOS")),
+                         self._url("/tree"))
+
+        # Keep the location if nothing responds.
+        self._server.routes = {}
+        self.assertEqual(payload._probe_base_repo(self._url("/tree"), self._url("/tree/BaseOS")),
+                         self._url("/tree/BaseOS"))
+
+        # Other locations are not probed.
+        self.assertEqual(payload._probe_base_repo("nfs:server:/tree", "nfs:server:/tree/BaseOS"),
+                         "nfs:server:/tree/BaseOS")
+
 
 class PayloadRequirementsTestCase(unittest.TestCase):
 
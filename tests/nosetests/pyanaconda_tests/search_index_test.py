@@ -0,0 +1,97 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import unittest
+
+from pyanaconda.ui.lib.search import SearchIndex, fold_search_text
+
+
+class CountingDict(dict):
+    """A dictionary that counts its item lookups."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super().__getitem__(key)
+
+
+class SearchIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add("cs", ["Čeština", "Czech", "cs"])
+        self.index.add("es", ["Español", "Spanish", "es"])
+        self.index.add("pt_BR", ["Português (Brasil)", "Portuguese (Brazil)", "pt_BR"])
+        self.index.add("ja", ["日本語", "Japanese", "ja"])
+
+    def fold_test(self):
+        """Test folding of the searched text."""
+        self.assertEqual(fold_search_text("Čeština"), "cestina")
+        self.assertEqual(fold_search_text("Português"), "portugues")
+        self.assertEqual(fold_search_text("日本語"), "日本語")
+
+    def substring_search_test(self):
+        """Test the substring search."""
+        self.assertEqual(self.index.search(""), {"cs", "es", "pt_BR", "ja"})
+        self.assertEqual(self.index.search("  "), {"cs", "es", "pt_BR", "ja"})
+        self.assertEqual(self.index.search("čeŠ"), {"cs"})
+        self.assertEqual(self.index.search("cest"), {"cs"})
+        self.assertEqual(self.index.search("ESPAÑ"), {"es"})
+        self.assertEqual(self.index.search("espan"), {"es"})
+        self.assertEqual(self.index.search("bra"), {"pt_BR"})
+        self.assertEqual(self.index.search("pt_br"), {"pt_BR"})
+        self.assertEqual(self.index.search("本"), {"ja"})
+        self.assertEqual(self.index.search("ese"), {"pt_BR", "ja"})
+        self.assertEqual(self.index.search("span"), {"es"})
+        self.assertEqual(self.index.search("xyz"), set())
+
+    def prefix_search_test(self):
+        """Test the prefix search."""
+        self.assertEqual(self.index.search("ese", prefix=True), set())
+        self.assertEqual(self.index.search("cz", prefix=True), {"cs"})
+        self.assertEqual(self.index.search("bra", prefix=True), set())
+        self.assertEqual(self.index.search("(bra", prefix=True), {"pt_BR"})
+        self.assertEqual(self.index.search("portuguese (br", prefix=True), {"pt_BR"})
+
+    def refined_search_test(self):
+        """Test that a refined query searches only the previous matches."""
+        self.assertEqual(self.index.search("e"), {"cs", "es", "pt_BR", "ja"})
+
+        self.index._terms = CountingDict(self.index._terms)
+        self.assertEqual(self.index.search("es"), {"cs", "es", "pt_BR", "ja"})
+        self.assertEqual(self.index.search("ese"), {"pt_BR", "ja"})
+        self.assertEqual(self.index.search("eses"), set())
+        self.assertEqual(self.index.search("eses"), set())
+        self.assertEqual(self.index._terms.lookups, 4 + 4 + 2)
+
+        # A different query searches everything again.
+        self.assertEqual(self.index.search("span"), {"es"})
+        self.assertEqual(self.index.search("cz"), {"cs"})
+
+    def update_test(self):
+        """Test updates of the index."""
+        self.assertEqual(self.index.search("fr"), set())
+        self.index.add("fr", ["Français", "French", "fr"])
+        self.assertEqual(self.index.search("fr"), {"fr"})
+        self.assertEqual(self.index.search("franc"), {"fr"})
+
+        self.index.clear()
+        self.assertEqual(self.index.search("fr"), set())
+        self.assertEqual(self.index.keys, set())
@@ -38,6 +38,52 @@ class TimezonesListings(unittest.TestCase):
                 self.assertTrue(timezone.is_valid_timezone(region + "/" + zone))
 
 
+    def frozen_regions_test(self):
+        """Check that the regions and timezones can't be modified by callers."""
+        regions = timezone.get_all_regions_and_timezones()
+        self.assertIn("Prague", regions["Europe"])
+        self.assertEqual(regions["Etc"], set(timezone.ETC_ZONES))
+        self.assertEqual(list(regions.keys())[-1], "Etc")
+
+        regions.clear()
+        self.assertIn("Europe", timezone.get_all_regions_and_timezones())
+
+        with self.assertRaises(AttributeError):
+            timezone.get_all_regions_and_timezones()["Europe"].add("Nowhere")
+
+
+class TimezoneIndexTestCase(unittest.TestCase):
+    def timezone_index_test(self):
+        """Check the timezone index."""
+        index = timezone.TimezoneIndex(["Europe/Prague", "America/Argentina/Salta", "UTC"],
+                                       ["GMT+1", "UTC"])
+
+        self.assertEqual(list(index.regions.keys()), ["Europe", "America", "Etc"])
+        self.assertEqual(index.regions["America"], {"Argentina/Salta"})
+        self.assertEqual(index.regions["Etc"], {"GMT+1", "UTC"})
+
+        self.assertTrue(index.is_valid("Europe/Prague"))
+        self.assertTrue(index.is_valid("America/Argentina/Salta"))
+        self.assertTrue(index.is_valid("UTC"))
+        self.assertTrue(index.is_valid("Etc/GMT+1"))
+        self.assertFalse(index.is_valid("GMT+1"))
+        self.assertFalse(index.is_valid("Europe/Nowhere"))
+        self.assertFalse(index.is_valid(""))
+
+    @patch("pyanaconda.timezone.langtable.list_timezones", return_value=["Europe/Prague"])
+    def territory_timezones_test(self, list_timezones):
+        """Check that the timezones of territories are cached."""
+        index = timezone.TimezoneIndex([], [])
+
+        self.assertEqual(index.get_territory_timezones("CZ"), ("Europe/Prague", ))
+        self.assertEqual(index.get_territory_timezones("CZ"), ("Europe/Prague", ))
+        list_timezones.assert_called_once_with(territoryId="CZ")
+
+    def shared_index_test(self):
+        """Check that the timezone index is built only once."""
+        self.assertIs(timezone.get_timezone_index(), timezone.get_timezone_index())
+
+
 class TerritoryTimezones(unittest.TestCase):
     def string_valid_territory_zone_test(self):
         """Check if the returned value is string for a valid territory."""
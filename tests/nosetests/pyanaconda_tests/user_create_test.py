@@ -18,6 +18,7 @@
 #
 
 from pyanaconda.core import users
+from pyanaconda.modules.users.installation import CreateUsersTask, CreateGroupsTask
 import unittest
 import tempfile
 import shutil
@@ -26,6 +27,8 @@ import crypt
 import platform
 import glob
 
+from unittest.mock import patch
+
 @unittest.skipIf(os.geteuid() != 0, "user creation must be run as root")
 class UserCreateTest(unittest.TestCase):
     def setUp(self):
@@ -342,3 +345,317 @@ class UserCreateTest(unittest.TestCase):
         grp_fields = self._readFields("/etc/group", "test_group")
         self.assertIsNotNone(grp_fields)
         self.assertEqual(grp_fields[2], "1047")
+
+
+def _create_root():
+    """Create a temporary root with empty account files."""
+    root = tempfile.mkdtemp()
+    os.mkdir(root + "/etc")
+
+    for name in ("passwd", "group", "shadow", "gshadow", "subuid", "subgid"):
+        open(root + "/etc/" + name, "w").close()
+
+    os.chmod(root + "/etc/shadow", 0o400)
+
+    # Copy over enough of libnss for UID and GID lookups to work
+    with open(root + "/etc/nsswitch.conf", "w") as f:
+        f.write("passwd: files\n")
+        f.write("shadow: files\n")
+        f.write("group: files\n")
+        f.write("initgroups: files\n")
+    if platform.architecture()[0].startswith("64"):
+        libdir = "/lib64"
+    else:
+        libdir = "/lib"
+
+    os.mkdir(root + libdir)
+    for lib in glob.glob(libdir + "/libnss_files*"):
+        shutil.copy(lib, root + lib)
+
+    with open(root + "/etc/login.defs", "w") as f:
+        f.write("# Test settings\n")
+        f.write("PASS_MAX_DAYS\t99999\n")
+        f.write("PASS_WARN_AGE 7\n")
+        f.write("UMASK 022\n")
+        f.write("HOME_MODE 0700\n")
+
+    os.makedirs(root + "/etc/skel")
+    with open(root + "/etc/skel/.bashrc", "w") as f:
+        f.write("# .bashrc\n")
+    os.chmod(root + "/etc/skel/.bashrc", 0o600)
+    os.symlink("/etc/skel/.bashrc", root + "/etc/skel/.bashrc_link")
+
+    return root
+
+
+def _read_tree(path):
+    """Return a description of the directory tree."""
+    tree = {}
+
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in ["."] + dirnames + filenames:
+            full_path = os.path.normpath(os.path.join(dirpath, name))
+            stats = os.lstat(full_path)
+
+            if os.path.islink(full_path):
+                content = os.readlink(full_path)
+            elif os.path.isfile(full_path):
+                with open(full_path) as f:
+                    content = f.read()
+            else:
+                content = None
+
+            tree[os.path.relpath(full_path, path)] = \
+                (stats.st_mode, stats.st_uid, stats.st_gid, content)
+
+    return tree
+
+
+@unittest.skipIf(os.geteuid() != 0, "user creation must be run as root")
+class AccountsTransactionTest(unittest.TestCase):
+    def setUp(self):
+        self.tool_root = _create_root()
+        self.bulk_root = _create_root()
+        self.password = crypt.crypt("password", crypt.METHOD_SHA512)
+
+    def tearDown(self):
+        shutil.rmtree(self.tool_root)
+        shutil.rmtree(self.bulk_root)
+
+    def _read(self, root, path):
+        with open(root + path) as f:
+            return f.read()
+
+    def _create_accounts(self, create_group, create_user):
+        create_group("admins")
+        create_group("staff", gid=5000)
+
+        create_user("alice", password=self.password, is_crypted=True, gecos="Alice",
+                    groups=["admins", "staff"])
+        create_user("bob", uid=1500, gid=5000, groups=["admins"])
+        create_user("carol", gid=6000, groups=["devel(6000)", "admins"])
+        create_user("dave", password="", lock=True, shell="/bin/zsh",
+                    homedir="/srv/users/dave")
+        create_user("eve", lock=True)
+
+        with self.assertRaises(ValueError):
+            create_user("alice")
+
+        with self.assertRaises(ValueError):
+            create_user("frank", uid=1500)
+
+        with self.assertRaises(ValueError):
+            create_user("frank", groups=["staff(5001)"])
+
+        with self.assertRaises(ValueError):
+            create_group("staff")
+
+        with self.assertRaises(ValueError):
+            create_group("others", gid=6000)
+
+    def _create_accounts_with_tools(self):
+        root = self.tool_root
+
+        self._create_accounts(
+            lambda *args, **kwargs: users.create_group(*args, root=root, **kwargs),
+            lambda *args, **kwargs: users.create_user(*args, root=root, **kwargs),
+        )
+
+    def _create_accounts_in_transaction(self):
+        # Use the marker of the local useradd for new accounts without a password.
+        marker = self._read(self.tool_root, "/etc/shadow").split("eve:")[1].split(":")[0]
+
+        with patch("pyanaconda.core.users.util.execWithRedirect") as exec_mock, \
+                patch("pyanaconda.core.users.util.restorecon") as restorecon_mock, \
+                patch("pyanaconda.core.users.NEW_ACCOUNT_PASSWORD", marker):
+            with users.AccountsTransaction(self.bulk_root) as transaction:
+                self._create_accounts(transaction.create_group, transaction.create_user)
+
+                # Nothing is written before the commit.
+                self.assertEqual(self._read(self.bulk_root, "/etc/passwd"), "")
+                self.assertFalse(os.path.exists(self.bulk_root + "/home/alice"))
+
+        exec_mock.assert_not_called()
+        restorecon_mock.assert_called_once()
+        return restorecon_mock.call_args[0][0]
+
+    def bulk_creation_test(self):
+        """Create accounts in a transaction."""
+        self._create_accounts_with_tools()
+        restorecon_args = self._create_accounts_in_transaction()
+
+        for name in ("passwd", "group", "shadow", "gshadow", "subuid", "subgid"):
+            self.assertEqual(self._read(self.tool_root, "/etc/" + name),
+                             self._read(self.bulk_root, "/etc/" + name),
+                             msg="/etc/%s differs" % name)
+
+            tool_stats = os.stat(self.tool_root + "/etc/" + name)
+            bulk_stats = os.stat(self.bulk_root + "/etc/" + name)
+            self.assertEqual(tool_stats.st_mode, bulk_stats.st_mode)
+
+        for home in ("/home/alice", "/home/bob", "/home/carol", "/home/eve", "/srv/users/dave"):
+            self.assertEqual(_read_tree(self.tool_root + home),
+                             _read_tree(self.bulk_root + home),
+                             msg="%s differs" % home)
+            self.assertIn(self.bulk_root + home, restorecon_args)
+
+        self.assertFalse(os.path.exists(self.bulk_root + "/etc/passwd.lock"))
+        self.assertTrue(os.path.exists(self.bulk_root + "/etc/passwd-"))
+
+    def bulk_reuse_home_test(self):
+        """Create an account with an existing home directory in a transaction."""
+        os.makedirs(self.bulk_root + "/home/test_user")
+        os.chown(self.bulk_root + "/home/test_user", 500, 500)
+
+        with patch("pyanaconda.core.users.util.restorecon") as mock:
+            with users.AccountsTransaction(self.bulk_root) as transaction:
+                transaction.create_user("test_user", uid=1000, gid=1000)
+
+        mock.assert_called_once_with([self.bulk_root + "/etc/passwd",
+                                                    self.bulk_root + "/etc/shadow",
+                                                    self.bulk_root + "/etc/group",
+                                                    self.bulk_root + "/etc/gshadow",
+                                                    self.bulk_root + "/etc/subuid",
+                                                    self.bulk_root + "/etc/subgid",
+                                                    self.bulk_root + "/home/test_user"])
+
+        stat_fields = os.stat(self.bulk_root + "/home/test_user")
+        self.assertEqual(stat_fields.st_uid, 1000)
+        self.assertEqual(stat_fields.st_gid, 1000)
+        self.assertEqual(os.listdir(self.bulk_root + "/home/test_user"), [])
+
+    def bulk_skel_test(self):
+        """Copy a nested skeleton directory in a transaction."""
+        os.makedirs(self.bulk_root + "/etc/skel/.config/app")
+        os.chmod(self.bulk_root + "/etc/skel/.config", 0o750)
+        with open(self.bulk_root + "/etc/skel/.config/app/settings", "w") as f:
+            f.write("key=value\n")
+
+        with patch("pyanaconda.core.users.util.restorecon"):
+            with users.AccountsTransaction(self.bulk_root) as transaction:
+                transaction.create_user("test_user", uid=1000, gid=1000)
+
+        tree = _read_tree(self.bulk_root + "/home/test_user")
+        self.assertEqual(tree["."], (0o40700, 1000, 1000, None))
+        self.assertEqual(tree[".config"], (0o40750, 1000, 1000, None))
+        self.assertEqual(tree[".config/app/settings"], (0o100644, 1000, 1000, "key=value\n"))
+        self.assertEqual(tree[".bashrc_link"][3], "/home/test_user/.bashrc")
+
+    def bulk_abort_test(self):
+        """Abort a transaction."""
+        with self.assertRaises(RuntimeError):
+            with users.AccountsTransaction(self.bulk_root) as transaction:
+                transaction.create_user("test_user")
+                raise RuntimeError()
+
+        self.assertEqual(self._read(self.bulk_root, "/etc/passwd"), "")
+        self.assertFalse(os.path.exists(self.bulk_root + "/etc/passwd.lock"))
+
+    def bulk_locked_files_test(self):
+        """Don't start a transaction if the files are locked."""
+        open(self.bulk_root + "/etc/group.lock", "w").close()
+
+        with self.assertRaises(OSError):
+            with users.AccountsTransaction(self.bulk_root):
+                pass
+
+        self.assertFalse(os.path.exists(self.bulk_root + "/etc/passwd.lock"))
+
+    def empty_tasks_test(self):
+        """Don't touch the account files without users and groups."""
+        empty_root = tempfile.mkdtemp()
+
+        try:
+            CreateUsersTask(empty_root, []).run()
+            CreateGroupsTask(empty_root, []).run()
+            self.assertEqual(os.listdir(empty_root), [])
+        finally:
+            shutil.rmtree(empty_root)
+
+
+class AccountsDatabaseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        os.mkdir(self.tmpdir + "/etc")
+        self._write("passwd", "root:x:0:0:root:/root:/bin/bash\n"
+                              "user:x:1000:1000:User:/home/user:/bin/bash\n")
+        self._write("group", "root:x:0:\n"
+                             "wheel:x:10:user\n"
+                             "user:x:1000:\n")
+        self._write("shadow", "root:*:16489:0:99999:7:::\n"
+                              "user:!!::0:99999:7:::\n")
+        self.database = users.AccountsDatabase()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        users.accounts_database.invalidate()
+
+    def _write(self, name, content):
+        with open(self.tmpdir + "/etc/" + name, "w") as f:
+            f.write(content)
+
+    def lookup_test(self):
+        """Look up entries in the database."""
+        self.assertEqual(self.database.get_by_name(self.tmpdir, "passwd", "user"),
+                         ["user", "x", "1000", "1000", "User", "/home/user", "/bin/bash"])
+        self.assertEqual(self.database.get_by_name(self.tmpdir, "group", "wheel"),
+                         ["wheel", "x", "10", "user"])
+        self.assertEqual(self.database.get_by_id(self.tmpdir, "group", 1000)[0], "user")
+        self.assertEqual(self.database.get_by_id(self.tmpdir, "passwd", "0")[0], "root")
+        self.assertIsNone(self.database.get_by_name(self.tmpdir, "passwd", "nobody"))
+        self.assertIsNone(self.database.get_by_id(self.tmpdir, "group", 47))
+
+        with self.assertRaises(FileNotFoundError):
+            self.database.get_by_name(self.tmpdir, "gshadow", "user")
+
+        # The returned fields are copies.
+        self.database.get_by_name(self.tmpdir, "group", "wheel")[3] = "other"
+        self.assertEqual(self.database.get_by_name(self.tmpdir, "group", "wheel")[3], "user")
+
+    def helpers_test(self):
+        """Look up entries with the helper functions."""
+        self.assertEqual(users._getpwnam("user", self.tmpdir)[5], "/home/user")
+        self.assertEqual(users._getgrnam("wheel", self.tmpdir)[2], "10")
+        self.assertEqual(users._getgrgid(10, self.tmpdir)[0], "wheel")
+        self.assertEqual(users._getspnam("user", self.tmpdir)[1], "!!")
+        self.assertTrue(users.check_user_exists("root", root=self.tmpdir))
+        self.assertFalse(users.check_user_exists("nobody", root=self.tmpdir))
+
+    def cache_test(self):
+        """Reuse the loaded files until they change."""
+        with patch.object(users.AccountsDatabase, "_load_file",
+                          wraps=users.AccountsDatabase._load_file) as load_file:
+            for _i in range(10):
+                self.database.get_by_name(self.tmpdir, "passwd", "user")
+                self.database.get_by_id(self.tmpdir, "passwd", 1000)
+
+            self.assertEqual(load_file.call_count, 1)
+
+            # Modify the file.
+            self._write("passwd", "user:x:1001:1001:User:/home/user:/bin/zsh\n")
+            self.assertEqual(self.database.get_by_name(self.tmpdir, "passwd", "user")[2], "1001")
+            self.assertEqual(load_file.call_count, 2)
+
+            # Invalidate the database.
+            self.database.invalidate(self.tmpdir + "/")
+            self.database.get_by_name(self.tmpdir, "passwd", "user")
+            self.assertEqual(load_file.call_count, 3)
+
+            # Invalidate another root.
+            self.database.invalidate("/other")
+            self.database.get_by_name(self.tmpdir, "passwd", "user")
+            self.assertEqual(load_file.call_count, 3)
+
+            self.database.invalidate()
+            self.database.get_by_name(self.tmpdir, "passwd", "user")
+            self.assertEqual(load_file.call_count, 4)
+
+    def transaction_invalidation_test(self):
+        """Invalidate the database after a transaction."""
+        self.assertIsNone(users._getgrnam("test_group", self.tmpdir))
+
+        with users.AccountsTransaction(self.tmpdir) as transaction:
+            transaction.create_group("test_group", gid=5000)
+
+        self.assertEqual(users._getgrnam("test_group", self.tmpdir)[2], "5000")
+        self.assertEqual(users._getgrgid(5000, self.tmpdir)[0], "test_group")
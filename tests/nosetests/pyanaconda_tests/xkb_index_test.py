@@ -0,0 +1,103 @@
+#
+# Copyright (C) 2019  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import os
+import tempfile
+import unittest
+
+from pyanaconda.xkb_index import LayoutInfo, XkbRegistryIndex, get_registry_stamp
+
+
+class XkbRegistryIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._rules_dir = os.path.join(self._tmp_dir.name, "rules")
+        self._cache_path = os.path.join(self._tmp_dir.name, "cache", "xkb-index.json")
+
+        os.makedirs(self._rules_dir)
+        self._write_rules_file("evdev.xml", "<xkbConfigRegistry/>")
+        self._write_rules_file("evdev.lst", "! model")
+
+        self._index = XkbRegistryIndex(
+            [("cz", LayoutInfo("Czech", "Czech")),
+             ("cz (qwerty)", LayoutInfo("Czech", "Czech (QWERTY)")),
+             ("us", LayoutInfo("English", "English (US)"))],
+            {"grp:alt_shift_toggle": "Alt+Shift"}
+        )
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _write_rules_file(self, name, content):
+        with open(os.path.join(self._rules_dir, name), "w") as f:
+            f.write(content)
+
+    def registry_stamp_test(self):
+        """Test the stamp of the registry files."""
+        stamp = get_registry_stamp(self._rules_dir)
+        self.assertEqual([item[0] for item in stamp], ["evdev.xml"])
+        self.assertEqual(get_registry_stamp(self._rules_dir), stamp)
+
+        self._write_rules_file("evdev.xml", "<xkbConfigRegistry></xkbConfigRegistry>")
+        self.assertNotEqual(get_registry_stamp(self._rules_dir), stamp)
+
+        self.assertEqual(get_registry_stamp("/nonexistent"), [])
+
+    def save_load_test(self):
+        """Test saving and loading of the index."""
+        stamp = get_registry_stamp(self._rules_dir)
+        self.assertIsNone(XkbRegistryIndex.load(self._cache_path, stamp))
+
+        self._index.save(self._cache_path, stamp)
+        index = XkbRegistryIndex.load(self._cache_path, stamp)
+
+        self.assertEqual(list(index.layouts.keys()), ["cz", "cz (qwerty)", "us"])
+        self.assertEqual(index.layouts["cz (qwerty)"], LayoutInfo("Czech", "Czech (QWERTY)"))
+        self.assertEqual(index.switching_options, {"grp:alt_shift_toggle": "Alt+Shift"})
+
+    def invalid_cache_test(self):
+        """Test that an invalid cached index is not used."""
+        stamp = get_registry_stamp(self._rules_dir)
+        self._index.save(self._cache_path, stamp)
+
+        # The registry has changed.
+        self._write_rules_file("base.xml", "<xkbConfigRegistry/>")
+        self.assertIsNone(XkbRegistryIndex.load(self._cache_path,
+                                                get_registry_stamp(self._rules_dir)))
+
+        # There is no registry.
+        self._index.save(self._cache_path, [])
+        self.assertIsNone(XkbRegistryIndex.load(self._cache_path, []))
+
+        # The file is broken.
+        with open(self._cache_path, "w") as f:
+            f.write("{broken")
+
+        self.assertIsNone(XkbRegistryIndex.load(self._cache_path, stamp))
+
+    def load_large_test(self):
+        """Test loading of an index of the registry size."""
+        layouts = [("l{} (v{})".format(i, i), LayoutInfo("Language", "Description {}".format(i)))
+                   for i in range(1000)]
+        options = {"grp:option{}".format(i): "Option {}".format(i) for i in range(50)}
+        stamp = get_registry_stamp(self._rules_dir)
+        XkbRegistryIndex(layouts, options).save(self._cache_path, stamp)
+
+        index = XkbRegistryIndex.load(self._cache_path, stamp)
+        self.assertEqual(len(index.layouts), 1000)
+        self.assertEqual(len(index.switching_options), 50)